@@ -29,24 +29,87 @@ import gevent.monkey
 gevent.monkey.patch_all()
 
 
+from model_storage.workers import (  # noqa: E402
+    Watchdog,
+    cpu_limit,
+    jittered,
+    memory_limit,
+    recycled,
+    worker_count,
+)
+
+
 _config = os.environ["ENVIRONMENT"]
+_memory = memory_limit()
 
 bind = "0.0.0.0:8000"
 worker_class = "gevent"
 timeout = 20
 accesslog = "-"
 access_log_format = '''%(t)s "%(r)s" %(s)s %(b)s %(L)s "%(f)s"'''
+# Replace workers after a number of requests to undo heap fragmentation, with
+# up to 10% jitter such that workers are not replaced all at once.
+max_requests = int(os.environ.get("MAX_REQUESTS", 5000))
+max_requests_jitter = max_requests // 10
 
 
 if _config == "production":
     # Our resource policy is that each web service is granted at least a single
-    # vCPU when available. The number of workers is then a guess that having two
-    # workers I/O bound and a third processing a request will utilize available
-    # resources well, but that guess needs to be tested and benchmarked.
-    workers = 3
+    # vCPU when available. The number of workers per CPU is a guess that having
+    # two workers I/O bound and a third processing a request will utilize
+    # available resources well, but that guess needs to be tested and
+    # benchmarked. Under a memory limit, each worker is granted at least
+    # `WORKER_MEMORY` bytes.
+    workers = int(os.environ.get("WORKERS", 0)) or worker_count(
+        cpu_limit(),
+        _memory,
+        int(os.environ.get("WORKERS_PER_CPU", 3)),
+        int(os.environ.get("WORKER_MEMORY", 512 * 2**20)),
+    )
     preload_app = True
 else:
     # FIXME: The number of workers is up for debate. At least for testing more
     # than one worker could make sense.
     workers = 1
     reload = True
+
+# Recycle a worker whose resident memory exceeds its share of the memory
+# limit, leaving some headroom for the master process and in-flight requests.
+if "WORKER_MAX_RSS" in os.environ:
+    _max_rss = int(os.environ["WORKER_MAX_RSS"])
+elif _memory is not None:
+    _max_rss = int(0.8 * _memory / workers)
+else:
+    _max_rss = 2**30
+_rss_interval = int(os.environ.get("WORKER_RSS_INTERVAL", 10))
+
+
+def post_fork(server, worker):
+    """Warm up the caches of a worker before it accepts any requests."""
+    from model_storage.models import db
+    from model_storage.warmup import warm_up
+    from model_storage.wsgi import app
+
+    # With `preload_app`, the engine was created in the master process and its
+    # connections must not be shared with the workers.
+    db.get_engine(app).dispose()
+    warm_up(app, db)
+
+
+def post_worker_init(worker):
+    """Watch the memory use of the worker."""
+    watchdog = Watchdog(worker, jittered(_max_rss, 0.1), _rss_interval)
+    gevent.spawn(watchdog.run, gevent.sleep)
+
+
+def worker_exit(server, worker):
+    """Log and count why the worker exits."""
+    recycled(worker)
+
+
+def child_exit(server, worker):
+    """Remove the live gauges of an exited worker from the metrics."""
+    if "prometheus_multiproc_dir" in os.environ:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
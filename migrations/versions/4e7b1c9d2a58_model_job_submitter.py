@@ -0,0 +1,24 @@
+"""model job submitter
+
+Revision ID: 4e7b1c9d2a58
+Revises: d3a7f5c1e902
+Create Date: 2026-10-19 22:04:17.226093
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4e7b1c9d2a58'
+down_revision = 'd3a7f5c1e902'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('model_job', sa.Column('submitter', sa.String(length=256), nullable=True))
+
+
+def downgrade():
+    op.drop_column('model_job', 'submitter')
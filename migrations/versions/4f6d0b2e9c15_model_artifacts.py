@@ -0,0 +1,32 @@
+"""model artifacts
+
+Revision ID: 4f6d0b2e9c15
+Revises: e2b85f0c3a71
+Create Date: 2026-10-19 17:21:09.631442
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4f6d0b2e9c15'
+down_revision = 'e2b85f0c3a71'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'model_artifact',
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('format', sa.String(length=64), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.Column('created', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['content_hash'], ['model_content.hash'], ),
+        sa.PrimaryKeyConstraint('content_hash', 'format')
+    )
+
+
+def downgrade():
+    op.drop_table('model_artifact')
@@ -0,0 +1,49 @@
+"""element index and content hash
+
+Revision ID: 5d1b2c8e4f3a
+Revises: 2538b67922e2
+Create Date: 2026-10-19 10:12:41.203318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from model_storage import elements
+
+
+# revision identifiers, used by Alembic.
+revision = '5d1b2c8e4f3a'
+down_revision = '2538b67922e2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('model', sa.Column('element_index', postgresql.JSONB(), nullable=True))
+    op.add_column('model', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    # Index the existing models one at a time to keep memory usage low.
+    model = sa.sql.table(
+        'model',
+        sa.sql.column('id', sa.Integer),
+        sa.sql.column('model_serialized', postgresql.JSONB),
+        sa.sql.column('element_index', postgresql.JSONB),
+        sa.sql.column('content_hash', sa.String),
+    )
+    connection = op.get_bind()
+    ids = [row.id for row in connection.execute(sa.select([model.c.id]))]
+    for id in ids:
+        document = connection.execute(
+            sa.select([model.c.model_serialized]).where(model.c.id == id)
+        ).scalar()
+        index = elements.index_model(document)
+        connection.execute(
+            model.update().where(model.c.id == id).values(
+                element_index=index, content_hash=elements.content_hash(index)
+            )
+        )
+
+
+def downgrade():
+    op.drop_column('model', 'content_hash')
+    op.drop_column('model', 'element_index')
@@ -0,0 +1,42 @@
+"""model jobs
+
+Revision ID: 5d1e9a7c3b60
+Revises: 8a3c5e7f1d24
+Create Date: 2026-10-19 19:12:40.518306
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '5d1e9a7c3b60'
+down_revision = '8a3c5e7f1d24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'model_job',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('status', sa.Enum('queued', 'running', 'succeeded', 'failed', name='model_job_status'), nullable=False),
+        sa.Column('body', sa.LargeBinary(), nullable=True),
+        sa.Column('claims', postgresql.JSONB(), nullable=False),
+        sa.Column('model_id', sa.Integer(), nullable=True),
+        sa.Column('errors', postgresql.JSONB(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('created', sa.DateTime(), nullable=False),
+        sa.Column('started', sa.DateTime(), nullable=True),
+        sa.Column('finished', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['model_id'], ['model.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_model_job_status', 'model_job', ['status', 'created'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_model_job_status', table_name='model_job')
+    op.drop_table('model_job')
+    sa.Enum(name='model_job_status').drop(op.get_bind(), checkfirst=False)
@@ -0,0 +1,28 @@
+"""external contents
+
+Revision ID: 8a3c5e7f1d24
+Revises: 4f6d0b2e9c15
+Create Date: 2026-10-19 18:02:55.174093
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a3c5e7f1d24'
+down_revision = '4f6d0b2e9c15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Documents stay in the database until they are moved with
+    # `flask externalize-contents`.
+    op.add_column('model_content', sa.Column('external', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.alter_column('model_content', 'external', server_default=None)
+
+
+def downgrade():
+    # Documents in the blob store must be moved back before downgrading.
+    op.drop_column('model_content', 'external')
@@ -0,0 +1,140 @@
+"""partition models by project
+
+Revision ID: 9c4f2a6d8e17
+Revises: 5d1e9a7c3b60
+Create Date: 2026-10-19 19:48:03.270945
+
+"""
+import logging
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4f2a6d8e17'
+down_revision = '5d1e9a7c3b60'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+HASH_PARTITIONS = 16
+COLUMNS = (
+    'id, created, updated, name, parent_id, organism_id, project_id, '
+    'default_biomass_reaction, preferred_map_id, ec_model, content_hash, '
+    'version'
+)
+COLUMN_DEFINITIONS = """
+    id integer NOT NULL DEFAULT nextval('model_id_seq'),
+    created timestamp without time zone NOT NULL,
+    updated timestamp without time zone,
+    name varchar(256) NOT NULL,
+    parent_id integer,
+    organism_id integer NOT NULL,
+    project_id integer,
+    default_biomass_reaction varchar(256) NOT NULL,
+    preferred_map_id integer,
+    ec_model boolean NOT NULL,
+    content_hash varchar(64) NOT NULL
+        CONSTRAINT model_content_hash_fkey REFERENCES model_content (hash),
+    version integer NOT NULL
+"""
+# Partitioned tables can not be referenced by foreign keys, so this replaces
+# the `ON DELETE` actions of the references to models. Rows moved to another
+# partition are deleted and inserted again; they are recognized since
+# after-row triggers run at the end of the statement.
+CASCADE_FUNCTION = """
+CREATE FUNCTION model_delete_cascade() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF coalesce(current_setting('model_storage.moving_partition', true), '')
+            = 'on'
+            OR EXISTS (SELECT 1 FROM model WHERE id = OLD.id) THEN
+        RETURN NULL;
+    END IF;
+    DELETE FROM model_version WHERE model_id = OLD.id;
+    UPDATE model SET parent_id = NULL WHERE parent_id = OLD.id;
+    UPDATE model_job SET model_id = NULL WHERE model_id = OLD.id;
+    RETURN NULL;
+END
+$$
+"""
+
+
+def is_partitioned():
+    return op.get_bind().scalar(
+        "SELECT relkind FROM pg_class WHERE oid = 'model'::regclass"
+    ) == 'p'
+
+
+def upgrade():
+    version = int(op.get_bind().scalar('SHOW server_version_num'))
+    if version < 110000:
+        # The model table stays as it is; the application works with both.
+        logger.warning(
+            'Not partitioning the model table, which requires PostgreSQL 11 '
+            'or later.'
+        )
+        return
+    op.drop_constraint('model_version_model_id_fkey', 'model_version', type_='foreignkey')
+    op.drop_constraint('model_job_model_id_fkey', 'model_job', type_='foreignkey')
+    op.drop_constraint('model_parent_id_fkey', 'model', type_='foreignkey')
+    op.drop_index('ix_model_parent_id', table_name='model')
+    op.rename_table('model', 'model_unpartitioned')
+    op.execute(
+        f'CREATE TABLE model ({COLUMN_DEFINITIONS}) PARTITION BY LIST (project_id)'
+    )
+    op.execute('CREATE TABLE model_public PARTITION OF model FOR VALUES IN (NULL)')
+    op.execute(
+        'CREATE TABLE model_projects PARTITION OF model DEFAULT '
+        'PARTITION BY HASH (project_id)'
+    )
+    partitions = ['model_public']
+    for remainder in range(HASH_PARTITIONS):
+        partitions.append(f'model_projects_{remainder}')
+        op.execute(
+            f'CREATE TABLE model_projects_{remainder} PARTITION OF '
+            f'model_projects FOR VALUES WITH (MODULUS {HASH_PARTITIONS}, '
+            f'REMAINDER {remainder})'
+        )
+    op.execute(
+        f'INSERT INTO model ({COLUMNS}) '
+        f'SELECT {COLUMNS} FROM model_unpartitioned'
+    )
+    # IDs are unique through their sequence; a primary key can only be
+    # declared per partition since it must otherwise contain the project ID.
+    for partition in partitions:
+        op.execute(f'ALTER TABLE {partition} ADD PRIMARY KEY (id)')
+    op.create_index('ix_model_parent_id', 'model', ['parent_id'], unique=False)
+    op.create_index('ix_model_project_id', 'model', ['project_id'], unique=False)
+    op.execute('ALTER SEQUENCE model_id_seq OWNED BY model.id')
+    op.drop_table('model_unpartitioned')
+    op.execute(CASCADE_FUNCTION)
+    op.execute(
+        'CREATE TRIGGER model_delete_cascade AFTER DELETE ON model '
+        'FOR EACH ROW EXECUTE PROCEDURE model_delete_cascade()'
+    )
+    op.execute('ANALYZE model')
+
+
+def downgrade():
+    if not is_partitioned():
+        return
+    op.execute('DROP TRIGGER model_delete_cascade ON model')
+    op.execute('DROP FUNCTION model_delete_cascade()')
+    op.rename_table('model', 'model_partitioned')
+    op.execute(
+        f'CREATE TABLE model ({COLUMN_DEFINITIONS}, '
+        f'CONSTRAINT model_pkey PRIMARY KEY (id))'
+    )
+    op.execute(
+        f'INSERT INTO model ({COLUMNS}) '
+        f'SELECT {COLUMNS} FROM model_partitioned'
+    )
+    op.execute('ALTER SEQUENCE model_id_seq OWNED BY model.id')
+    # Also drops all partitions, including those of single projects.
+    op.drop_table('model_partitioned')
+    op.create_index('ix_model_parent_id', 'model', ['parent_id'], unique=False)
+    op.create_foreign_key('model_parent_id_fkey', 'model', 'model', ['parent_id'], ['id'], ondelete='SET NULL')
+    op.create_foreign_key('model_version_model_id_fkey', 'model_version', 'model', ['model_id'], ['id'], ondelete='CASCADE')
+    op.create_foreign_key('model_job_model_id_fkey', 'model_job', 'model', ['model_id'], ['id'], ondelete='SET NULL')
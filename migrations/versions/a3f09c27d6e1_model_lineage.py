@@ -0,0 +1,42 @@
+"""model lineage
+
+Revision ID: a3f09c27d6e1
+Revises: 5d1b2c8e4f3a
+Create Date: 2026-10-19 13:40:02.518874
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3f09c27d6e1'
+down_revision = '5d1b2c8e4f3a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('model', sa.Column('parent_id', sa.Integer(), nullable=True))
+    op.add_column('model', sa.Column('modifications', postgresql.JSONB(), nullable=True))
+    op.create_foreign_key('model_parent_id_fkey', 'model', 'model', ['parent_id'], ['id'])
+    op.create_index(op.f('ix_model_parent_id'), 'model', ['parent_id'], unique=False)
+    # Create the column with nullable=True, update existing rows with 0, then
+    # reset nullable to False.
+    op.add_column('model', sa.Column('lineage_depth', sa.Integer(), nullable=True))
+    model = sa.sql.table('model', sa.sql.column('lineage_depth'))
+    op.execute(model.update().values(lineage_depth=0))
+    op.alter_column('model', 'lineage_depth', nullable=False)
+    op.alter_column('model', 'model_serialized', existing_type=postgresql.JSONB(), nullable=True)
+
+
+def downgrade():
+    # Derived models can not be represented without materializing them.
+    op.execute('DELETE FROM model WHERE model_serialized IS NULL')
+    op.alter_column('model', 'model_serialized', existing_type=postgresql.JSONB(), nullable=False)
+    op.drop_column('model', 'lineage_depth')
+    op.drop_index(op.f('ix_model_parent_id'), table_name='model')
+    op.drop_constraint('model_parent_id_fkey', 'model', type_='foreignkey')
+    op.drop_column('model', 'modifications')
+    op.drop_column('model', 'parent_id')
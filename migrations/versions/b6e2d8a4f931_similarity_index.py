@@ -0,0 +1,38 @@
+"""similarity index
+
+Revision ID: b6e2d8a4f931
+Revises: 9c4f2a6d8e17
+Create Date: 2026-10-19 20:31:17.904522
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6e2d8a4f931'
+down_revision = '9c4f2a6d8e17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Signatures of existing contents are computed with
+    # `flask index-similarity`.
+    op.add_column('model_content', sa.Column('signature', postgresql.ARRAY(sa.BigInteger()), nullable=True))
+    op.create_table(
+        'model_content_band',
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('band', sa.SmallInteger(), nullable=False),
+        sa.Column('bucket', sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['content_hash'], ['model_content.hash'], ),
+        sa.PrimaryKeyConstraint('content_hash', 'band')
+    )
+    op.create_index('ix_model_content_band_bucket', 'model_content_band', ['band', 'bucket'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_model_content_band_bucket', table_name='model_content_band')
+    op.drop_table('model_content_band')
+    op.drop_column('model_content', 'signature')
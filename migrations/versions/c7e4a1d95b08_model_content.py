@@ -0,0 +1,111 @@
+"""model content and versions
+
+Revision ID: c7e4a1d95b08
+Revises: a3f09c27d6e1
+Create Date: 2026-10-19 15:12:47.203118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e4a1d95b08'
+down_revision = 'a3f09c27d6e1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'model_content',
+        sa.Column('hash', sa.String(length=64), nullable=False),
+        sa.Column('document', postgresql.JSONB(), nullable=True),
+        sa.Column('parent_hash', sa.String(length=64), nullable=True),
+        sa.Column('modifications', postgresql.JSONB(), nullable=True),
+        sa.Column('depth', sa.Integer(), nullable=False),
+        sa.Column('element_index', postgresql.JSONB(), nullable=False),
+        sa.Column('created', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['parent_hash'], ['model_content.hash'], ),
+        sa.PrimaryKeyConstraint('hash')
+    )
+    op.create_table(
+        'model_version',
+        sa.Column('model_id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('created', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['content_hash'], ['model_content.hash'], ),
+        sa.ForeignKeyConstraint(['model_id'], ['model.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('model_id', 'version')
+    )
+    # Identical models are stored once. Derived contents are inserted in order
+    # of their depth in one statement, such that their parents exist when the
+    # foreign key is checked.
+    op.execute(
+        'INSERT INTO model_content (hash, document, depth, element_index, created) '
+        'SELECT DISTINCT ON (content_hash) content_hash, model_serialized, 0, element_index, now() '
+        'FROM model WHERE model_serialized IS NOT NULL '
+        'ON CONFLICT DO NOTHING'
+    )
+    op.execute(
+        'INSERT INTO model_content (hash, parent_hash, modifications, depth, element_index, created) '
+        'SELECT child.content_hash, parent.content_hash, child.modifications, '
+        'child.lineage_depth, child.element_index, now() '
+        'FROM model AS child JOIN model AS parent ON parent.id = child.parent_id '
+        'WHERE child.model_serialized IS NULL '
+        'ORDER BY child.lineage_depth '
+        'ON CONFLICT DO NOTHING'
+    )
+    op.execute(
+        'INSERT INTO model_version (model_id, version, content_hash, created) '
+        'SELECT id, 1, content_hash, coalesce(updated, created) FROM model'
+    )
+    # Create the column with nullable=True, update existing rows with 1, then
+    # reset nullable to False.
+    op.add_column('model', sa.Column('version', sa.Integer(), nullable=True))
+    model = sa.sql.table('model', sa.sql.column('version'))
+    op.execute(model.update().values(version=1))
+    op.alter_column('model', 'version', nullable=False)
+    op.alter_column('model', 'content_hash', existing_type=sa.String(length=64), nullable=False)
+    op.create_foreign_key('model_content_hash_fkey', 'model', 'model_content', ['content_hash'], ['hash'])
+    # Contents no longer depend on the model they were derived from.
+    op.drop_constraint('model_parent_id_fkey', 'model', type_='foreignkey')
+    op.create_foreign_key('model_parent_id_fkey', 'model', 'model', ['parent_id'], ['id'], ondelete='SET NULL')
+    op.drop_column('model', 'lineage_depth')
+    op.drop_column('model', 'modifications')
+    op.drop_column('model', 'element_index')
+    op.drop_column('model', 'model_serialized')
+
+
+def downgrade():
+    op.add_column('model', sa.Column('model_serialized', postgresql.JSONB(), nullable=True))
+    op.add_column('model', sa.Column('element_index', postgresql.JSONB(), nullable=True))
+    op.add_column('model', sa.Column('modifications', postgresql.JSONB(), nullable=True))
+    op.add_column('model', sa.Column('lineage_depth', sa.Integer(), nullable=True))
+    op.execute(
+        'UPDATE model SET model_serialized = model_content.document, '
+        'element_index = model_content.element_index, '
+        'modifications = model_content.modifications, '
+        'lineage_depth = model_content.depth '
+        'FROM model_content WHERE model_content.hash = model.content_hash'
+    )
+    # Only overlays whose parent is still the current version of the parent
+    # model can be represented; other derived models are dropped.
+    op.execute(
+        'DELETE FROM model USING model_content WHERE '
+        'model_content.hash = model.content_hash AND '
+        'model_content.parent_hash IS NOT NULL AND NOT EXISTS ('
+        'SELECT 1 FROM model AS parent WHERE parent.id = model.parent_id '
+        'AND parent.content_hash = model_content.parent_hash)'
+    )
+    op.execute('UPDATE model SET parent_id = NULL WHERE modifications IS NULL')
+    op.alter_column('model', 'lineage_depth', nullable=False)
+    op.drop_constraint('model_parent_id_fkey', 'model', type_='foreignkey')
+    op.create_foreign_key('model_parent_id_fkey', 'model', 'model', ['parent_id'], ['id'])
+    op.drop_constraint('model_content_hash_fkey', 'model', type_='foreignkey')
+    op.alter_column('model', 'content_hash', existing_type=sa.String(length=64), nullable=True)
+    op.drop_column('model', 'version')
+    op.drop_table('model_version')
+    op.drop_table('model_content')
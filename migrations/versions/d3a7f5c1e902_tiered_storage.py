@@ -0,0 +1,27 @@
+"""tiered storage
+
+Revision ID: d3a7f5c1e902
+Revises: b6e2d8a4f931
+Create Date: 2026-10-19 21:12:40.318604
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a7f5c1e902'
+down_revision = 'b6e2d8a4f931'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('model', sa.Column('accessed', sa.DateTime(), nullable=True))
+    op.add_column('model_content', sa.Column('archived', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.alter_column('model_content', 'archived', server_default=None)
+
+
+def downgrade():
+    op.drop_column('model_content', 'archived')
+    op.drop_column('model', 'accessed')
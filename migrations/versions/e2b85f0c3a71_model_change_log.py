@@ -0,0 +1,41 @@
+"""model change log
+
+Revision ID: e2b85f0c3a71
+Revises: c7e4a1d95b08
+Create Date: 2026-10-19 16:04:31.885210
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b85f0c3a71'
+down_revision = 'c7e4a1d95b08'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'model_change',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('model_id', sa.Integer(), nullable=False),
+        sa.Column('project_id', sa.Integer(), nullable=True),
+        sa.Column('action', sa.Enum('created', 'updated', 'deleted', name='model_change_action'), nullable=False),
+        sa.Column('created', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_model_change_project_id'), 'model_change', ['project_id'], unique=False)
+    # Existing models appear as created, such that mirrors can start from the
+    # beginning of the log.
+    op.execute(
+        "INSERT INTO model_change (model_id, project_id, action, created) "
+        "SELECT id, project_id, 'created', created FROM model ORDER BY id"
+    )
+
+
+def downgrade():
+    op.drop_index(op.f('ix_model_change_project_id'), table_name='model_change')
+    op.drop_table('model_change')
+    sa.Enum(name='model_change_action').drop(op.get_bind(), checkfirst=False)
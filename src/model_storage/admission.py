@@ -0,0 +1,139 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Limit the number of concurrent requests per worker.
+
+Gevent workers accept any number of connections, such that a burst of heavy
+requests slows down all of them together. Requests are therefore divided into
+classes (cheap listings, heavy reads and writes), each with a maximum number
+of requests being served and a bounded number of waiting requests. Requests
+beyond that are rejected right away with 503 and ``Retry-After``.
+"""
+
+import threading
+
+from flask import current_app, g, request
+from werkzeug.exceptions import ServiceUnavailable
+
+from .metrics import (
+    ADMISSION_IN_FLIGHT,
+    ADMISSION_QUEUE_DEPTH,
+    ADMISSION_REJECTIONS,
+)
+from .replicas import SAFE_METHODS
+
+
+LISTING = frozenset(["Models", "ModelChanges", "ModelVersions", "IndvModelJob"])
+# Long-lived event streams and operational endpoints are never limited.
+EXEMPT = frozenset(["ModelEvents", "metrics"])
+
+
+def classify(endpoint, method):
+    """Return the class of a request or None if it is not limited."""
+    if endpoint is None or endpoint in EXEMPT or method == "OPTIONS":
+        return None
+    if endpoint.startswith("flask-apispec"):
+        return None
+    if method not in SAFE_METHODS:
+        return "write"
+    if endpoint in LISTING:
+        return "listing"
+    return "read"
+
+
+class Limiter:
+    """Admit a limited number of concurrent requests of one class."""
+
+    def __init__(self, name, concurrency, queue_size, timeout):
+        self.name = name
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.waiting = 0
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Wait for a free slot.
+
+        :return: None if admitted, otherwise the reason for the rejection
+        """
+        if self._slots.acquire(blocking=False):
+            ADMISSION_IN_FLIGHT.labels(self.name).inc()
+            return None
+        with self._lock:
+            if self.waiting >= self.queue_size:
+                return "queue_full"
+            self.waiting += 1
+        ADMISSION_QUEUE_DEPTH.labels(self.name).inc()
+        try:
+            admitted = self._slots.acquire(timeout=self.timeout)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+            ADMISSION_QUEUE_DEPTH.labels(self.name).dec()
+        if not admitted:
+            return "timeout"
+        ADMISSION_IN_FLIGHT.labels(self.name).inc()
+        return None
+
+    def release(self):
+        ADMISSION_IN_FLIGHT.labels(self.name).dec()
+        self._slots.release()
+
+
+def init_app(app):
+    """Create the limiters and admit every request before it is handled."""
+    limiters = {
+        name: Limiter(
+            name,
+            limits["concurrency"],
+            limits["queue"],
+            app.config["ADMISSION_TIMEOUT"],
+        )
+        for name, limits in app.config["ADMISSION_LIMITS"].items()
+    }
+    app.extensions["admission"] = limiters
+
+    @app.before_request
+    def admit():
+        limiter = limiters.get(classify(request.endpoint, request.method))
+        if limiter is None:
+            return
+        reason = limiter.acquire()
+        if reason is not None:
+            ADMISSION_REJECTIONS.labels(limiter.name, reason).inc()
+            raise ServiceUnavailable(
+                "The service is busy, please retry later.",
+                retry_after=current_app.config["ADMISSION_RETRY_AFTER"],
+            )
+        g.admitted = limiter
+
+    @app.after_request
+    def release_on_close(response):
+        # Streamed bodies are still being generated after the request is torn
+        # down, so the slot is held until the server closes the response.
+        limiter = g.pop("admitted", None)
+        if limiter is not None:
+            response.call_on_close(limiter.release)
+        return response
+
+    @app.teardown_request
+    def release(exception):
+        # Requests that failed without a response.
+        limiter = g.pop("admitted", None)
+        if limiter is not None:
+            limiter.release()
@@ -19,13 +19,33 @@ import json
 import logging
 import logging.config
 
+import click
 from flask import Flask
 from flask_cors import CORS
 from flask_migrate import Migrate
 from raven.contrib.flask import Sentry
 from werkzeug.middleware.proxy_fix import ProxyFix
 
-from . import errorhandlers, jwt, resources
+from . import (
+    admission,
+    blobs,
+    bulk,
+    cache,
+    cdn,
+    compression,
+    errorhandlers,
+    events,
+    formats,
+    jobs,
+    jwt,
+    listings,
+    metrics,
+    partitions,
+    queries,
+    replicas,
+    resources,
+    tiers,
+)
 from .models import Model
 from .settings import current_config
 
@@ -42,6 +62,14 @@ def init_app(application, db):
     logging.config.dictConfig(application.config["LOGGING"])
     db.init_app(application)
     Migrate(application, db)
+    replicas.init_app(application, db)
+    cache.init_app(application)
+    blobs.init_app(application)
+    tiers.init_app(application, db)
+    cdn.init_app(application)
+    events.init_app(application, db)
+    listings.init_app(application)
+    formats.init_app(application)
 
     # Configure Sentry
     if application.config["SENTRY_DSN"]:
@@ -54,10 +82,14 @@ def init_app(application, db):
 
     # Add routes and resources.
     resources.init_app(application)
+    metrics.init_app(application)
 
     # Add CORS information for all resources.
     CORS(application)
 
+    # Shed load before doing any work on a request.
+    admission.init_app(application)
+
     # Add JWT middleware
     jwt.init_app(application)
 
@@ -70,6 +102,7 @@ def init_app(application, db):
     # We require this in order to serve the HTML version of the OpenAPI docs
     # via https.
     application.wsgi_app = ProxyFix(application.wsgi_app)
+    compression.init_app(application)
 
     # Add Flask CLI command to install fixtures in the database
     app.logger.debug("Registering CLI commands")
@@ -83,4 +116,139 @@ def init_app(application, db):
             db.session.add(model)
         db.session.commit()
 
+    @application.cli.command("import-models")
+    @click.argument("path", type=click.Path(exists=True))
+    @click.option("--organism-id", type=int, help="Unless in the manifest.")
+    @click.option("--project-id", type=int, help="Omit for public models.")
+    @click.option("--biomass-reaction", help="Defaults to the objective.")
+    @click.option("--ec-model", is_flag=True)
+    @click.option("--processes", type=int, help="Defaults to the CPU count.")
+    @click.option("--batch-size", type=int, default=50, show_default=True)
+    @click.option(
+        "--state",
+        type=click.Path(dir_okay=False),
+        help="Records the imported files; defaults to PATH.imported.",
+    )
+    def import_models(
+        path,
+        organism_id,
+        project_id,
+        biomass_reaction,
+        ec_model,
+        processes,
+        batch_size,
+        state,
+    ):
+        """Import a directory or archive of cobra JSON and SBML models."""
+        defaults = {
+            "organism_id": organism_id,
+            "project_id": project_id,
+            "ec_model": ec_model,
+        }
+        if biomass_reaction is not None:
+            defaults["default_biomass_reaction"] = biomass_reaction
+        stored, failed = bulk.import_models(
+            db,
+            path,
+            defaults,
+            processes=processes,
+            batch_size=batch_size,
+            state_path=state,
+            echo=click.echo,
+        )
+        for name, error in failed.items():
+            click.echo(f"Failed to import '{name}': {error}", err=True)
+        if failed:
+            raise click.ClickException(
+                f"Imported {stored} models, {len(failed)} failed."
+            )
+
+    @application.cli.command("export-models")
+    @click.argument("destination", type=click.Path())
+    @click.option(
+        "--project-id",
+        "project_ids",
+        type=int,
+        multiple=True,
+        help="Repeatable.",
+    )
+    @click.option("--batch-size", type=int, default=100, show_default=True)
+    def export_models(destination, project_ids, batch_size):
+        """Export models to a directory or a tar archive."""
+        bulk.export_models(
+            db,
+            destination,
+            project_ids=list(project_ids) or None,
+            batch_size=batch_size,
+            echo=click.echo,
+        )
+
+    @application.cli.command("externalize-contents")
+    @click.option("--batch-size", type=int, default=100, show_default=True)
+    def externalize_contents(batch_size):
+        """Move serialized models from the database to the blob store."""
+        store = application.extensions["blobs"]
+        if store is None:
+            raise click.ClickException("No BLOB_STORAGE_URL is configured.")
+        bulk.externalize_contents(
+            db, store, batch_size=batch_size, echo=click.echo
+        )
+
+    @application.cli.command("archive-contents")
+    @click.option("--batch-size", type=int, default=100, show_default=True)
+    def archive_contents(batch_size):
+        """Move the documents of models not read recently to the archive."""
+        store = application.extensions["archive"]
+        if store is None:
+            raise click.ClickException("No ARCHIVE_STORAGE_URL is configured.")
+        tiers.archive_contents(
+            db,
+            store,
+            application.config["ARCHIVE_AFTER"],
+            batch_size=batch_size,
+            echo=click.echo,
+        )
+
+    @application.cli.command("benchmark-queries")
+    @click.option("--project-id", type=int, multiple=True)
+    @click.option("--model-id", type=int, required=True)
+    @click.option("--iterations", type=int, default=1000, show_default=True)
+    def benchmark_queries(project_id, model_id, iterations):
+        """Compare the hot queries built through the ORM with statements."""
+        queries.benchmark(
+            project_id, model_id, iterations=iterations, echo=click.echo
+        )
+
+    @application.cli.command("index-similarity")
+    @click.option("--batch-size", type=int, default=100, show_default=True)
+    def index_similarity(batch_size):
+        """Compute the similarity signatures of existing model contents."""
+        bulk.index_contents(db, batch_size=batch_size, echo=click.echo)
+
+    @application.cli.command("partition-project")
+    @click.argument("project_id", type=int)
+    def partition_project(project_id):
+        """Move the models of a project into a partition of their own."""
+        with db.engine.begin() as connection:
+            try:
+                created = partitions.partition_project(connection, project_id)
+            except ValueError as error:
+                raise click.ClickException(str(error))
+        if not created:
+            click.echo(f"Project {project_id} has a partition already.")
+
+    @application.cli.command("delete-project")
+    @click.argument("project_id", type=int)
+    @click.confirmation_option(prompt="Delete all models of the project?")
+    def delete_project(project_id):
+        """Delete all models of a project."""
+        with db.engine.begin() as connection:
+            count = partitions.delete_project(connection, project_id)
+        click.echo(f"Deleted {count} models of project {project_id}.")
+
+    @application.cli.command("process-jobs")
+    def process_jobs():
+        """Create models queued for asynchronous creation."""
+        jobs.run(application)
+
     app.logger.info("App initialization complete")
@@ -0,0 +1,225 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Serve the model storage API asynchronously.
+
+The read endpoints ``GET /models`` and ``GET /models/<id>`` are served natively
+on top of asyncpg, such that a single process can hold many concurrent, slow
+clients. Everything else (writes, the OpenAPI docs, any error for unknown
+routes and representations other than private, uncompressed JSON) is delegated
+to the regular Flask application, which guarantees an identical API contract.
+"""
+
+import json
+import logging
+
+import asyncpg
+from jose import jwt as jose_jwt
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.wsgi import WSGIMiddleware
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header, parse_etags
+
+from . import formats, listings
+from .jwt import decode_authorization
+from .resources import VARY
+from .schemas import Model as ModelSchema
+
+
+logger = logging.getLogger(__name__)
+
+# asyncpg keeps a per-connection cache of prepared statements; issuing the
+# queries below through `fetch` therefore only parses and plans them once.
+LIST_MODELS = """
+    SELECT id, name, organism_id, project_id, preferred_map_id,
+           default_biomass_reaction, ec_model, parent_id
+    FROM model
+    WHERE project_id = ANY($1::integer[]) OR project_id IS NULL
+"""
+GET_MODEL = """
+    SELECT id, name, organism_id, project_id, preferred_map_id,
+           default_biomass_reaction, ec_model, parent_id, parent_hash,
+           external, archived, document::text AS model_serialized
+    FROM model JOIN model_content ON model_content.hash = model.content_hash
+    WHERE id = $1 AND (project_id = ANY($2::integer[]) OR project_id IS NULL)
+"""
+
+metadata_schema = ModelSchema(exclude=("model_serialized", "modifications"))
+listing_schema = ModelSchema(
+    many=True, exclude=("model_serialized", "modifications")
+)
+
+
+def error(message, status_code):
+    """Return an error response in the format of the Flask error handlers."""
+    return JSONResponse({"message": message}, status_code=status_code)
+
+
+def claims_or_error(request):
+    """Return the JWT claims of the request or an error response."""
+    try:
+        _, claims = decode_authorization(
+            request.headers.get("Authorization"),
+            request.app.state.config["JWT_PUBLIC_KEY"],
+        )
+    except (
+        jose_jwt.JWTError,
+        jose_jwt.ExpiredSignatureError,
+        jose_jwt.JWTClaimsError,
+    ) as e:
+        return None, error(f"JWT authentication failed: {e}", 401)
+    return claims, None
+
+
+async def list_models(request):
+    """List all available models, with an ETag like `resources.Models.get`."""
+    claims, failure = claims_or_error(request)
+    if failure is not None:
+        return failure
+    async with request.app.state.pool.acquire() as connection:
+        rows = await connection.fetch(LIST_MODELS, list(claims["prj"]))
+    # Rendered like the Flask app, such that both answer with the same tag.
+    body = json.dumps(listing_schema.dump([dict(row) for row in rows])).encode(
+        "utf-8"
+    )
+    tag = listings.etag(body)
+    headers = {"Cache-Control": "private, no-cache", "ETag": f'"{tag}"'}
+    if parse_etags(request.headers.get("If-None-Match")).contains(tag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+def is_plain_json(request):
+    """Return whether the client asks for uncompressed JSON."""
+    best = parse_accept_header(
+        request.headers.get("Accept"), MIMEAccept
+    ).best_match(
+        [
+            "application/json",
+            formats.SBML_MIMETYPES[0],
+            formats.PICKLE_MIMETYPE,
+        ]
+    )
+    encodings = parse_accept_header(request.headers.get("Accept-Encoding"))
+    return best in (None, "application/json") and not encodings["gzip"] > 0
+
+
+async def get_model(request):
+    """Return a model by ID, streaming the serialized model as it is."""
+    if not is_plain_json(request):
+        # SBML, pickles and compressed responses are served by the Flask app.
+        return request.app.state.fallback
+    claims, failure = claims_or_error(request)
+    if failure is not None:
+        return failure
+    id = request.path_params["id"]
+    async with request.app.state.pool.acquire() as connection:
+        row = await connection.fetchrow(GET_MODEL, id, list(claims["prj"]))
+    if row is None:
+        return error(f"Cannot find any model with ID {id}.", 404)
+    if (
+        row["project_id"] is None
+        or row["parent_hash"] is not None
+        or row["external"]
+        or row["archived"]
+    ):
+        # Public models with their caching headers and contents stored as
+        # modifications, in the blob store or in the archive are served by
+        # the Flask app.
+        return request.app.state.fallback
+    accesses = request.app.state.accesses
+    accesses.record_read(id, "database")
+    # Flushing writes to the database with SQLAlchemy, which blocks.
+    await run_in_threadpool(accesses.flush)
+    row = dict(row)
+    del row["parent_hash"]
+    del row["external"]
+    del row["archived"]
+    document = row.pop("model_serialized")
+    # The model is passed on as the text Postgres renders it in and is never
+    # decoded; only the small metadata envelope is serialized here.
+    envelope = json.dumps(dict(metadata_schema.dump(row), modifications=None))
+    head = f'{envelope[:-1]}, "model_serialized": '
+    return StreamingResponse(
+        chunked(
+            head,
+            document,
+            "}",
+            request.app.state.config["ASGI_STREAM_CHUNK_SIZE"],
+        ),
+        media_type="application/json",
+        headers={"Vary": VARY},
+    )
+
+
+async def chunked(head, body, tail, chunk_size):
+    """Yield a response body in chunks, giving slow clients back-pressure."""
+    yield head.encode()
+    for start in range(0, len(body), chunk_size):
+        yield body[start : start + chunk_size].encode()
+    yield tail.encode()
+
+
+async def handle_uncaught_error(request, exc):
+    """Mirror `errorhandlers.handle_uncaught_error`."""
+    logger.error("Uncaught exception", exc_info=exc)
+    return error("Internal server error", 500)
+
+
+def create_app(flask_app):
+    """
+    Create the ASGI application around an initialized Flask application.
+
+    Any route or method not served natively is answered by the Flask
+    application.
+    """
+    config = flask_app.config
+    fallback = WSGIMiddleware(flask_app)
+
+    async def open_pool():
+        # The pool can only be created once the event loop is running.
+        app.state.pool = await asyncpg.create_pool(
+            dsn=config["SQLALCHEMY_DATABASE_URI"],
+            min_size=1,
+            max_size=config["ASGI_DB_POOL_SIZE"],
+        )
+
+    async def close_pool():
+        await app.state.pool.close()
+
+    app = Starlette(
+        routes=[
+            Route("/models", list_models, methods=["GET"]),
+            Route("/models/{id:int}", get_model, methods=["GET"]),
+            Mount("/", fallback),
+        ],
+        exception_handlers={Exception: handle_uncaught_error},
+        on_startup=[open_pool],
+        on_shutdown=[close_pool],
+    )
+    app.state.config = config
+    app.state.fallback = fallback
+    app.state.accesses = flask_app.extensions["accesses"]
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=config["CORS_ORIGINS"],
+        allow_methods=["*"],
+    )
+    return app
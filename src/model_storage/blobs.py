@@ -0,0 +1,194 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Store serialized models outside of the database.
+
+Documents are stored gzip compressed under their content hash, such that
+Postgres only keeps their metadata and element index. A store is configured
+by ``BLOB_STORAGE_URL``: ``file:///path/to/directory`` uses the local
+filesystem, ``s3://bucket/prefix`` any S3 compatible service through boto3.
+Without a URL, documents are stored in the database.
+"""
+
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import zlib
+from contextlib import closing
+from urllib.parse import urlparse
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+class FilesystemStore:
+    """Keep blobs as files in a directory, e.g., on a shared volume."""
+
+    def __init__(self, root, suffix=".json.gz"):
+        self.root = root
+        self.suffix = suffix
+
+    def path(self, key):
+        return os.path.join(self.root, key[:2], f"{key}{self.suffix}")
+
+    def exists(self, key):
+        return os.path.isfile(self.path(key))
+
+    def put(self, key, file_):
+        """Store the content of a binary file object atomically."""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(path), delete=False
+        ) as partial:
+            shutil.copyfileobj(file_, partial, CHUNK_SIZE)
+        os.replace(partial.name, path)
+
+    def open(self, key):
+        """Return a binary file object of a stored blob."""
+        return open(self.path(key), "rb")
+
+
+class S3Store:
+    """
+    Keep blobs as objects in an S3 compatible bucket.
+
+    Only ``head_object``, ``put_object`` and ``get_object`` of the client are
+    used, such that a local stand-in can replace it.
+    """
+
+    def __init__(
+        self, client, bucket, prefix="", suffix=".json.gz", encoding="gzip"
+    ):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.suffix = suffix
+        self.encoding = encoding
+
+    def path(self, key):
+        return f"{self.prefix}{key}{self.suffix}"
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.path(key))
+        except Exception as error:
+            code = getattr(error, "response", {}).get("Error", {}).get("Code")
+            if code in ("404", "NoSuchKey"):
+                return False
+            raise
+        return True
+
+    def put(self, key, file_):
+        options = {}
+        if self.encoding:
+            options["ContentEncoding"] = self.encoding
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=self.path(key),
+            Body=file_,
+            ContentType="application/json",
+            **options,
+        )
+
+    def open(self, key):
+        return self.client.get_object(Bucket=self.bucket, Key=self.path(key))[
+            "Body"
+        ]
+
+
+def store_document(store, key, document):
+    """Compress and store a serialized model unless it is stored already."""
+    store_text(store, key, json.dumps(document))
+
+
+def store_text(store, key, text):
+    """Compress and store the JSON text of a model unless stored already."""
+    if store.exists(key):
+        return
+    with tempfile.SpooledTemporaryFile(max_size=8 * CHUNK_SIZE) as buffer:
+        with gzip.GzipFile(fileobj=buffer, mode="wb") as compressed:
+            compressed.write(text.encode("utf-8"))
+        buffer.seek(0)
+        store.put(key, buffer)
+
+
+def store_file(store, key, path):
+    """Compress and store a serialized model file without loading it."""
+    if store.exists(key):
+        return
+    with tempfile.TemporaryFile() as buffer:
+        with gzip.GzipFile(fileobj=buffer, mode="wb") as compressed:
+            with open(path, "rb") as file_:
+                shutil.copyfileobj(file_, compressed, CHUNK_SIZE)
+        buffer.seek(0)
+        store.put(key, buffer)
+
+
+def load_document(store, key):
+    """Return a stored serialized model."""
+    with closing(store.open(key)) as file_:
+        return json.loads(gzip.decompress(file_.read()))
+
+
+def read_blob(store, key):
+    """Yield the compressed content of a stored model in chunks."""
+    with closing(store.open(key)) as file_:
+        yield from iter(lambda: file_.read(CHUNK_SIZE), b"")
+
+
+def stream_document(store, key):
+    """Yield the decompressed JSON text of a stored model in chunks."""
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    with closing(store.open(key)) as file_:
+        for chunk in iter(lambda: file_.read(CHUNK_SIZE), b""):
+            yield decompressor.decompress(chunk)
+    yield decompressor.flush()
+
+
+def create_store(url, suffix=".json.gz", encoding="gzip"):
+    """
+    Return the store configured by a URL or None.
+
+    :param suffix: Appended to the key of each blob
+    :param encoding: The content encoding declared for S3 objects, if any
+    """
+    if not url:
+        return None
+    parsed = urlparse(url)
+    if parsed.scheme == "file":
+        return FilesystemStore(parsed.path, suffix)
+    if parsed.scheme == "s3":
+        # Only required when S3 is configured.
+        import boto3
+
+        return S3Store(
+            boto3.client(
+                "s3", endpoint_url=os.environ.get("S3_ENDPOINT_URL") or None
+            ),
+            parsed.netloc,
+            parsed.path.lstrip("/"),
+            suffix,
+            encoding,
+        )
+    raise ValueError(f"Unsupported blob storage '{url}'.")
+
+
+def init_app(app):
+    """Create the configured blob store, if any."""
+    app.extensions["blobs"] = create_store(app.config["BLOB_STORAGE_URL"])
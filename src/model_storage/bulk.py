@@ -0,0 +1,454 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Import and export many models at once.
+
+Sources are directories or (optionally compressed) tar and zip archives of
+cobra JSON and SBML files. An optional ``models.jsonl`` manifest next to the
+files provides the metadata of each file, one JSON object with a ``file`` key
+per line, and is written by `export_models` such that exports can be imported
+into another environment as they are.
+"""
+
+import csv
+import io
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import tarfile
+import zipfile
+
+from cobra.io.dict import model_from_dict
+from flask import current_app
+from sqlalchemy import text
+from sqlalchemy.orm import undefer
+
+from . import blobs, elements, formats, similarity, tiers
+from .models import ModelChange, ModelContent, ModelContentBand
+
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "models.jsonl"
+METADATA = (
+    "name",
+    "organism_id",
+    "project_id",
+    "default_biomass_reaction",
+    "preferred_map_id",
+    "ec_model",
+)
+
+
+def read_sources(path, include=None):
+    """
+    Yield the name and content of every file in a directory or archive.
+
+    :param include: A predicate of the file names to read, or None for all
+    """
+    include = include or (lambda name: True)
+    if os.path.isdir(path):
+        for root, _, names in os.walk(path):
+            for name in sorted(names):
+                full_path = os.path.join(root, name)
+                relative = os.path.relpath(full_path, path)
+                if include(relative):
+                    with open(full_path, "rb") as file_:
+                        yield relative, file_.read()
+    elif zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and include(info.filename):
+                    yield info.filename, archive.read(info)
+    elif tarfile.is_tarfile(path):
+        with tarfile.open(path) as archive:
+            for member in archive:
+                if member.isfile() and include(member.name):
+                    yield member.name, archive.extractfile(member).read()
+    else:
+        raise ValueError(f"'{path}' is neither a directory nor an archive.")
+
+
+def prepare(source):
+    """
+    Parse and validate a model file in a worker process.
+
+    :param source: A tuple of the file name, its content and the metadata
+    :return: A tuple of the file name, the row to store and an error message
+    """
+    name, content, metadata = source
+    try:
+        document = formats.read_model(name, content)
+        metadata = dict(metadata)
+        if metadata.get("organism_id") is None:
+            raise ValueError("An organism ID is required.")
+        metadata.setdefault("name", document.get("id") or name)
+        metadata.setdefault(
+            "default_biomass_reaction", formats.objective_reaction(document)
+        )
+        model = model_from_dict(document)
+        if metadata["default_biomass_reaction"] not in model.reactions:
+            raise ValueError(
+                f"The biomass reaction "
+                f"'{metadata['default_biomass_reaction']}' does not exist in "
+                f"the model."
+            )
+        index = elements.index_model(document)
+    except Exception as error:
+        return name, None, str(error)
+    signature = similarity.signature(index)
+    row = dict(
+        metadata,
+        hash=elements.content_hash(index),
+        document=json.dumps(document),
+        element_index=json.dumps(index),
+        signature=pg_array(signature),
+        buckets=pg_array(similarity.buckets(signature)),
+    )
+    return name, row, None
+
+
+def pg_array(values):
+    """Format integers as a Postgres array literal."""
+    return "{" + ",".join(map(str, values)) + "}"
+
+
+def write_batch(connection, rows, store=None, skip_existing=False):
+    """
+    Store a batch of prepared models in a single transaction.
+
+    The rows are copied into a temporary table from which the contents,
+    models, their first versions and the change log are filled.
+
+    :param connection: A DBAPI (psycopg2) connection
+    :param store: The blob store for the documents, if any
+    :param skip_existing: Whether to skip models of which one with the same
+        name, project and content exists already
+    :return: The number of stored models
+    """
+    if store is not None:
+        for row in rows:
+            blobs.store_text(store, row["hash"], row.pop("document"))
+    columns = ("seq",) + METADATA
+    columns += ("hash", "document", "element_index", "signature", "buckets")
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for seq, row in enumerate(rows):
+        writer.writerow([seq] + [row.get(column) for column in columns[1:]])
+    buffer.seek(0)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE TEMPORARY TABLE import_batch ("
+            "seq integer, name text, organism_id integer, project_id integer, "
+            "default_biomass_reaction text, preferred_map_id integer, "
+            "ec_model boolean, hash text, document jsonb, element_index jsonb, "
+            "signature bigint[], buckets bigint[]"
+            ") ON COMMIT DROP"
+        )
+        cursor.copy_expert(
+            f"COPY import_batch ({', '.join(columns)}) FROM STDIN "
+            f"WITH (FORMAT csv)",
+            buffer,
+        )
+        cursor.execute(
+            "INSERT INTO model_content "
+            "(hash, document, external, depth, element_index, signature, "
+            "created) "
+            "SELECT DISTINCT ON (hash) hash, document, document IS NULL, 0, "
+            "element_index, signature, now() FROM import_batch "
+            "ON CONFLICT DO NOTHING"
+        )
+        cursor.execute(
+            "INSERT INTO model_content_band (content_hash, band, bucket) "
+            "SELECT DISTINCT ON (hash, band) hash, band - 1, bucket "
+            "FROM import_batch, "
+            "unnest(buckets) WITH ORDINALITY AS bands(bucket, band) "
+            "ON CONFLICT DO NOTHING"
+        )
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", (ModelChange.LOCK,))
+        cursor.execute(
+            "WITH inserted AS ("
+            "  INSERT INTO model (name, organism_id, project_id, "
+            "  default_biomass_reaction, preferred_map_id, ec_model, "
+            "  content_hash, version, created) "
+            "  SELECT name, organism_id, project_id, default_biomass_reaction, "
+            "  preferred_map_id, coalesce(ec_model, false), hash, 1, now() "
+            "  FROM import_batch WHERE NOT (%s AND EXISTS ("
+            "    SELECT 1 FROM model WHERE model.name = import_batch.name "
+            "    AND model.content_hash = import_batch.hash "
+            "    AND model.project_id IS NOT DISTINCT FROM "
+            "    import_batch.project_id"
+            "  )) ORDER BY seq "
+            "  RETURNING id, project_id, content_hash, created"
+            "), versions AS ("
+            "  INSERT INTO model_version "
+            "  (model_id, version, content_hash, created) "
+            "  SELECT id, 1, content_hash, created FROM inserted"
+            "), changes AS ("
+            "  INSERT INTO model_change "
+            "  (model_id, project_id, action, created) "
+            "  SELECT id, project_id, 'created', created FROM inserted "
+            "  ORDER BY id RETURNING id, model_id, project_id, action"
+            ") "
+            "SELECT pg_notify(%s, json_build_object('cursor', id, "
+            "'model_id', model_id, 'project_id', project_id, "
+            "'action', action)::text) FROM changes",
+            (skip_existing, ModelChange.CHANNEL),
+        )
+        return cursor.rowcount
+
+
+def import_models(
+    db,
+    path,
+    defaults,
+    processes=None,
+    batch_size=50,
+    state_path=None,
+    echo=print,
+):
+    """
+    Validate models in parallel and store them in batches.
+
+    The names of stored files are appended to a state file after every batch,
+    such that an interrupted import is resumed by running it again. Since the
+    last batch may have been committed without being recorded, a resumed
+    import skips models that exist with the same name, project and content.
+
+    :param defaults: Metadata for files that are not in the manifest
+    :return: The number of stored models and a mapping of failed files to
+        their errors
+    """
+    state_path = state_path or f"{path.rstrip(os.sep)}.imported"
+    done = set()
+    resuming = os.path.exists(state_path)
+    if resuming:
+        with open(state_path) as file_:
+            done = set(file_.read().splitlines())
+    else:
+        # Mark the import as started before the first batch is committed.
+        open(state_path, "w").close()
+    # Only the manifest and the names of the files to import are read up
+    # front; the models are read as the workers are ready for them.
+    manifest = {}
+    pending = set()
+
+    def include(name):
+        if os.path.basename(name) == MANIFEST:
+            return True
+        if formats.is_model_file(name) and name not in done:
+            pending.add(name)
+        return False
+
+    for _, content in read_sources(path, include):
+        for line in content.decode("utf-8").splitlines():
+            if line.strip():
+                entry = json.loads(line)
+                manifest[entry.pop("file")] = entry
+    total = len(pending)
+    sources = (
+        (name, content, {**defaults, **manifest.get(name, {})})
+        for name, content in read_sources(path, pending.__contains__)
+    )
+    echo(f"Importing {total} models, skipping {len(done)}.")
+
+    stored = 0
+    failed = {}
+    batch = []
+    names = []
+
+    def flush():
+        nonlocal stored
+        stored += write_batch(
+            db.session.connection().connection,
+            batch,
+            current_app.extensions["blobs"],
+            skip_existing=resuming,
+        )
+        db.session.commit()
+        with open(state_path, "a") as file_:
+            file_.writelines(f"{name}\n" for name in names)
+        echo(f"Stored {stored} of {total} models.")
+        batch.clear()
+        names.clear()
+
+    with multiprocessing.Pool(processes) as pool:
+        # The pool would consume all sources at once, so they are passed on
+        # in windows of one batch to bound the models held in memory.
+        while True:
+            window = list(itertools.islice(sources, batch_size))
+            if not window:
+                break
+            for name, row, error in pool.imap(prepare, window):
+                if error is not None:
+                    logger.error(f"Skipping '{name}': {error}")
+                    failed[name] = error
+                    continue
+                batch.append(row)
+                names.append(name)
+                if len(batch) >= batch_size:
+                    flush()
+        if batch:
+            flush()
+    return stored, failed
+
+
+def export_models(
+    db, destination, project_ids=None, batch_size=100, echo=print
+):
+    """
+    Write models and a manifest to a directory or a tar archive.
+
+    Rows are streamed from a server-side cursor, such that only a batch of
+    models is held in memory. Documents are written as Postgres renders them,
+    except for contents stored as modifications, which are materialized.
+
+    :param destination: A directory, or a tar archive if it ends with
+        ``.tar``, ``.tar.gz`` or ``.tgz``
+    :param project_ids: Only export the models of these projects, or all
+        models if None
+    :return: The number of exported models
+    """
+    query = (
+        "SELECT model.id, name, organism_id, project_id, "
+        "default_biomass_reaction, preferred_map_id, ec_model, "
+        "model_content.hash, model_content.parent_hash, "
+        "model_content.external, model_content.archived, "
+        "model_content.document::text AS document "
+        "FROM model "
+        "JOIN model_content ON model_content.hash = model.content_hash"
+    )
+    if project_ids is not None:
+        query += " WHERE model.project_id = ANY(:project_ids)"
+    query += " ORDER BY model.id"
+    if destination.endswith((".tar", ".tar.gz", ".tgz")):
+        mode = "w" if destination.endswith(".tar") else "w:gz"
+        archive = tarfile.open(destination, mode)
+
+        def write(name, content):
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+
+    else:
+        archive = None
+        os.makedirs(destination, exist_ok=True)
+
+        def write(name, content):
+            with open(os.path.join(destination, name), "wb") as file_:
+                file_.write(content)
+
+    store = current_app.extensions["blobs"]
+    cold_store = current_app.extensions["archive"]
+    exported = 0
+    manifest = io.StringIO()
+    try:
+        result = (
+            db.session.connection()
+            .execution_options(stream_results=True)
+            .execute(text(query), {"project_ids": project_ids})
+        )
+        while True:
+            rows = result.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                if row.parent_hash is not None:
+                    document = json.dumps(
+                        ModelContent.query.get(row.hash).materialize()
+                    ).encode("utf-8")
+                elif row.external:
+                    document = b"".join(blobs.stream_document(store, row.hash))
+                elif row.archived:
+                    document = tiers.read_text(cold_store, row.hash).encode(
+                        "utf-8"
+                    )
+                else:
+                    document = row.document.encode("utf-8")
+                name = f"{row.id}.json"
+                write(name, document)
+                entry = {key: row[key] for key in METADATA}
+                manifest.write(json.dumps(dict(entry, file=name)) + "\n")
+            exported += len(rows)
+            echo(f"Exported {exported} models.")
+        write(MANIFEST, manifest.getvalue().encode("utf-8"))
+    finally:
+        if archive is not None:
+            archive.close()
+        db.session.rollback()
+    return exported
+
+
+def externalize_contents(db, store, batch_size=100, echo=print):
+    """
+    Move full documents from the database to the blob store.
+
+    Each batch is committed on its own, such that the move can be interrupted
+    and resumed at any time.
+
+    :return: The number of moved documents
+    """
+    moved = 0
+    while True:
+        rows = db.session.execute(
+            text(
+                "SELECT hash, document::text AS document FROM model_content "
+                "WHERE document IS NOT NULL AND NOT external LIMIT :limit"
+            ),
+            {"limit": batch_size},
+        ).fetchall()
+        if not rows:
+            break
+        for row in rows:
+            blobs.store_text(store, row.hash, row.document)
+        db.session.execute(
+            text(
+                "UPDATE model_content SET document = NULL, external = true "
+                "WHERE hash = ANY(:hashes)"
+            ),
+            {"hashes": [row.hash for row in rows]},
+        )
+        db.session.commit()
+        moved += len(rows)
+        echo(f"Moved {moved} documents to the blob store.")
+    return moved
+
+
+def index_contents(db, batch_size=100, echo=print):
+    """
+    Compute the similarity signatures of contents stored without one.
+
+    :return: The number of indexed contents
+    """
+    indexed = 0
+    while True:
+        contents = (
+            ModelContent.query.options(undefer(ModelContent.element_index))
+            .filter(ModelContent.signature.is_(None))
+            .limit(batch_size)
+            .all()
+        )
+        if not contents:
+            break
+        for content in contents:
+            content.signature = similarity.signature(content.element_index)
+            ModelContentBand.insert(content.hash, content.signature)
+        db.session.commit()
+        indexed += len(contents)
+        echo(f"Indexed {indexed} contents.")
+    return indexed
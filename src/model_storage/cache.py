@@ -0,0 +1,114 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Provide in-process caches shared by all requests of a worker."""
+
+import threading
+from collections import OrderedDict
+
+from .metrics import COALESCED_REQUESTS
+
+
+class LRUCache:
+    """
+    Keep the most recently used entries up to a maximum number.
+
+    Only cache values that are immutable for the given key, e.g., because the
+    key contains a content hash, as entries are never invalidated.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the cached value for the key, marking it as recently used."""
+        with self._lock:
+            try:
+                self._entries.move_to_end(key)
+            except KeyError:
+                return default
+            return self._entries[key]
+
+    def set(self, key, value):
+        """Cache the value, evicting the least recently used entry if full."""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class SingleFlight:
+    """
+    Share the result of a call among concurrent callers with the same key.
+
+    The first caller computes the result while later callers wait for it
+    instead of repeating the work. Results are not kept once all callers have
+    been served, such that keys should identify immutable results.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, function, kind="default"):
+        """Return the result of the function, or of a call in flight."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            COALESCED_REQUESTS.labels(kind).inc()
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = function()
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def init_app(app):
+    """Create the caches with their configured sizes."""
+    app.extensions["caches"] = {
+        "diff": LRUCache(app.config["DIFF_CACHE_SIZE"]),
+        "documents": LRUCache(app.config["DOCUMENT_CACHE_SIZE"]),
+    }
+    app.extensions["flights"] = SingleFlight()
@@ -0,0 +1,117 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Let shared caches, such as a CDN or reverse proxy, serve public models.
+
+Responses for public models do not depend on the JWT claims of the client, so
+they are marked as cacheable by anyone and tagged with a surrogate key per
+model. When a public model changes, its key is purged by sending it to
+``CACHE_PURGE_URL`` in the ``Surrogate-Key`` header once the change is
+committed.
+"""
+
+import logging
+import threading
+
+import requests
+from sqlalchemy import event, inspect
+
+from .models import Model
+from .replicas import RoutingSession
+
+
+logger = logging.getLogger(__name__)
+
+SURROGATE_KEY = "Surrogate-Key"
+PENDING = "cdn_purge"
+
+
+def surrogate_key(model_id):
+    return f"model-{model_id}"
+
+
+def etag(model, representation):
+    """
+    Return a weak entity tag of a representation of the model.
+
+    The tag changes with the representation, such as ``sbml`` or the gzip
+    encoded ``json.gz``, with any new version and with any change of the
+    metadata, to the microsecond.
+    """
+    modified = model.updated or model.created
+    return (
+        f"{model.content_hash[:16]}-{model.version}-"
+        f"{modified.strftime('%Y%m%d%H%M%S%f')}-{representation}"
+    )
+
+
+def public_headers(model, max_age, representation):
+    """Return the caching headers of a response for a public model."""
+    return {
+        "Cache-Control": f"public, max-age={max_age}",
+        "ETag": f'W/"{etag(model, representation)}"',
+        SURROGATE_KEY: surrogate_key(model.id),
+    }
+
+
+class Purger:
+    """Purge surrogate keys in the background."""
+
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+
+    def purge(self, keys):
+        threading.Thread(
+            target=self._purge, args=(" ".join(sorted(keys)),), daemon=True
+        ).start()
+
+    def _purge(self, keys):
+        try:
+            response = requests.post(
+                self.url, headers={SURROGATE_KEY: keys}, timeout=self.timeout
+            )
+            response.raise_for_status()
+        except requests.RequestException as error:
+            logger.error(f"Failed to purge '{keys}' from the cache: {error}")
+
+
+def init_app(app):
+    """Purge public models from shared caches when they change."""
+    if not app.config["CACHE_PURGE_URL"]:
+        return
+    purger = Purger(app.config["CACHE_PURGE_URL"])
+
+    @event.listens_for(Model, "after_update")
+    @event.listens_for(Model, "after_delete")
+    def schedule_purge(mapper, connection, target):
+        state = inspect(target)
+        if target.project_id is None or None in (
+            state.attrs.project_id.history.deleted
+        ):
+            state.session.info.setdefault(PENDING, set()).add(
+                surrogate_key(target.id)
+            )
+
+    @event.listens_for(RoutingSession, "after_commit")
+    def purge(session):
+        keys = session.info.pop(PENDING, None)
+        if keys:
+            purger.purge(keys)
+
+    @event.listens_for(RoutingSession, "after_rollback")
+    def discard(session):
+        session.info.pop(PENDING, None)
@@ -0,0 +1,122 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compress responses ahead of time and accept compressed requests.
+
+Serialized models are compressed once when they are stored, either by the
+blob store or as a ``json.gz`` artifact, and sent as they are to clients that
+accept gzip. Since a gzip stream may consist of several members, a response
+is the compressed metadata envelope around the pre-compressed document.
+"""
+
+import gzip
+import json
+import zlib
+
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge
+
+
+FORMAT = "json.gz"
+
+
+def compress(data):
+    """Return the data as a single gzip member."""
+    return gzip.compress(data, compresslevel=6)
+
+
+def compress_document(document):
+    """Return the compressed JSON text of a serialized model."""
+    return compress(json.dumps(document).encode("utf-8"))
+
+
+def accepts_gzip(request):
+    """Return whether the client accepts gzip encoded responses."""
+    return request.accept_encodings["gzip"] > 0
+
+
+class GzipInput:
+    """
+    Decode a gzip stream, refusing to read more than ``limit`` decoded bytes.
+
+    A stream that is not valid gzip or ends early is rejected with 400.
+    """
+
+    def __init__(self, stream, limit):
+        self.stream = gzip.GzipFile(fileobj=stream, mode="rb")
+        self.limit = limit
+        self.consumed = 0
+
+    def _count(self, data):
+        self.consumed += len(data)
+        if self.consumed > self.limit:
+            raise RequestEntityTooLarge(
+                f"The decompressed request body exceeds {self.limit} bytes."
+            )
+        return data
+
+    def _size(self, size):
+        # Read at most one byte past the limit to detect that it is exceeded.
+        remaining = self.limit - self.consumed + 1
+        if size is None or size < 0:
+            return remaining
+        return min(size, remaining)
+
+    def _decode(self, read, size):
+        try:
+            data = read(self._size(size))
+        except (OSError, EOFError, zlib.error) as error:
+            raise BadRequest(f"The request body is not valid gzip: {error}")
+        return self._count(data)
+
+    def read(self, size=-1):
+        return self._decode(self.stream.read, size)
+
+    def readline(self, size=-1):
+        return self._decode(self.stream.readline, size)
+
+    def __iter__(self):
+        return iter(self.readline, b"")
+
+
+class DecompressRequests:
+    """
+    Decode request bodies sent with ``Content-Encoding: gzip``.
+
+    Reading more than ``MAX_DECOMPRESSED_LENGTH`` decoded bytes responds with
+    413, so that a small compressed body cannot exhaust the memory of a
+    worker. Bodies that cannot be decoded are answered with 400.
+    """
+
+    def __init__(self, app, config):
+        self.app = app
+        self.config = config
+
+    def __call__(self, environ, start_response):
+        if environ.get("HTTP_CONTENT_ENCODING", "").lower() == "gzip":
+            environ["wsgi.input"] = GzipInput(
+                environ["wsgi.input"], self.config["MAX_DECOMPRESSED_LENGTH"]
+            )
+            # The length of the decoded body is unknown, so the input is read
+            # until it ends.
+            environ["wsgi.input_terminated"] = True
+            environ.pop("CONTENT_LENGTH", None)
+            del environ["HTTP_CONTENT_ENCODING"]
+        return self.app(environ, start_response)
+
+
+def init_app(app):
+    """Accept compressed request bodies."""
+    app.wsgi_app = DecompressRequests(app.wsgi_app, app.config)
@@ -0,0 +1,222 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Index the elements of serialized models.
+
+The index of a model maps each of its collections (reactions, metabolites and
+genes) to a mapping of element identifiers to a digest of the element. Any
+other top-level entry of the serialized model is recorded under
+``attributes``. Comparing two indices is much cheaper than comparing two
+models, and the hash of an index identifies the content of a model.
+"""
+
+import hashlib
+import json
+import re
+
+from marshmallow import ValidationError
+
+
+COLLECTIONS = ("reactions", "metabolites", "genes")
+GPR_TOKENS = re.compile(r"[()\s]+")
+GPR_OPERATORS = frozenset(["and", "or", "AND", "OR", ""])
+
+
+def canonical(value):
+    """Serialize a JSON compatible value in a deterministic way."""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+
+def digest(value):
+    """Return a short digest of a JSON compatible value."""
+    return hashlib.blake2b(
+        canonical(value).encode(), digest_size=16
+    ).hexdigest()
+
+
+def index_model(document):
+    """Return the element index of a serialized model."""
+    index = {
+        collection: {
+            element["id"]: digest(element)
+            for element in document.get(collection, [])
+        }
+        for collection in COLLECTIONS
+    }
+    index["attributes"] = {
+        key: digest(value)
+        for key, value in document.items()
+        if key not in COLLECTIONS
+    }
+    return index
+
+
+def content_hash(index):
+    """Return the hash identifying the content of an indexed model."""
+    return hashlib.sha256(canonical(index).encode()).hexdigest()
+
+
+def gene_ids(rule):
+    """Return the IDs of the genes referred to by a gene-reaction rule."""
+    return set(GPR_TOKENS.split(rule)) - GPR_OPERATORS
+
+
+def references(reaction):
+    """
+    Return the IDs of the metabolites and genes a reaction refers to.
+
+    :raises ValidationError: If the stoichiometry is not an object or the
+        gene-reaction rule is not a string
+    """
+    metabolites = reaction.get("metabolites", {})
+    if not isinstance(metabolites, dict):
+        raise ValidationError(
+            f"The metabolites of reaction '{reaction.get('id')}' must be an "
+            f"object."
+        )
+    rule = reaction.get("gene_reaction_rule", "")
+    if not isinstance(rule, str):
+        raise ValidationError(
+            f"The gene-reaction rule of reaction '{reaction.get('id')}' must "
+            f"be a string."
+        )
+    return set(metabolites), gene_ids(rule)
+
+
+def check_references(reaction_id, metabolites, genes, index):
+    """Verify that a reaction only refers to elements present in the index."""
+    missing = set(metabolites) - index["metabolites"].keys()
+    if missing:
+        raise ValidationError(
+            f"Reaction '{reaction_id}' refers to unknown metabolites "
+            f"{sorted(missing)}."
+        )
+    missing = set(genes) - index["genes"].keys()
+    if missing:
+        raise ValidationError(
+            f"Reaction '{reaction_id}' refers to unknown genes "
+            f"{sorted(missing)}."
+        )
+
+
+def check_bounds(reaction):
+    """Verify that the lower bound of a reaction does not exceed its upper."""
+    lower = reaction.get("lower_bound", 0)
+    upper = reaction.get("upper_bound", 0)
+    if not all(
+        isinstance(bound, (int, float)) and not isinstance(bound, bool)
+        for bound in (lower, upper)
+    ):
+        raise ValidationError(
+            f"The bounds of reaction '{reaction.get('id')}' must be numbers."
+        )
+    if lower > upper:
+        raise ValidationError(
+            f"The lower bound of reaction '{reaction['id']}' exceeds its "
+            f"upper bound."
+        )
+
+
+def validate_update(old_index, document, biomass_reaction):
+    """
+    Validate a new version of a model against the index of the old version.
+
+    Elements that are unchanged were validated with the old version already,
+    so only added and changed reactions are checked, together with unchanged
+    reactions that refer to removed metabolites or genes.
+
+    :return: The element index of the new version
+    """
+    if not isinstance(document, dict):
+        raise ValidationError("The model must be a JSON object.")
+    for collection in COLLECTIONS:
+        if not isinstance(document.get(collection, []), list):
+            raise ValidationError(f"The {collection} must be a list.")
+        if not all(
+            isinstance(element, dict) and "id" in element
+            for element in document.get(collection, [])
+        ):
+            raise ValidationError(f"All {collection} require an 'id'.")
+    index = index_model(document)
+    for collection in COLLECTIONS:
+        if len(index[collection]) != len(document.get(collection, [])):
+            raise ValidationError(f"Duplicate {collection} entries.")
+    differences = compare(old_index, index)
+    modified = set(differences["reactions"]["added"]).union(
+        differences["reactions"]["changed"]
+    )
+    removed = set(differences["metabolites"]["removed"]).union(
+        differences["genes"]["removed"]
+    )
+    for reaction in document.get("reactions", []):
+        metabolites, genes = references(reaction)
+        if reaction["id"] in modified:
+            check_bounds(reaction)
+        elif removed.isdisjoint(metabolites) and removed.isdisjoint(genes):
+            continue
+        check_references(reaction["id"], metabolites, genes, index)
+    if biomass_reaction not in index["reactions"]:
+        raise ValidationError(
+            f"The biomass reaction '{biomass_reaction}' does not exist in the "
+            f"corresponding model."
+        )
+    return index
+
+
+def compare(old_index, new_index):
+    """
+    Compare two element indices.
+
+    :return: A mapping of collections to the identifiers of elements that were
+        added, removed or changed between the old and the new model
+    """
+    result = {}
+    for collection in COLLECTIONS:
+        old = old_index[collection]
+        new = new_index[collection]
+        result[collection] = {
+            "added": sorted(new.keys() - old.keys()),
+            "removed": sorted(old.keys() - new.keys()),
+            "changed": sorted(
+                key for key in old.keys() & new.keys() if old[key] != new[key]
+            ),
+        }
+    return result
+
+
+def changes(old, new):
+    """
+    Describe the changes between two versions of the same element.
+
+    Each changed field maps to a pair of its old and new value. Reaction
+    stoichiometries are compared per metabolite instead, such that only the
+    changed coefficients are reported.
+    """
+    result = {}
+    for key in sorted(old.keys() | new.keys()):
+        if old.get(key) == new.get(key):
+            continue
+        if key == "metabolites":
+            before = old.get(key, {})
+            after = new.get(key, {})
+            result[key] = {
+                metabolite: [before.get(metabolite), after.get(metabolite)]
+                for metabolite in sorted(before.keys() | after.keys())
+                if before.get(metabolite) != after.get(metabolite)
+            }
+        else:
+            result[key] = [old.get(key), new.get(key)]
+    return result
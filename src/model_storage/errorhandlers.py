@@ -66,6 +66,10 @@ def handle_http_error(error):
     else:
         response = jsonify({"message": error.description})
         response.status_code = error.code
+        # Keep headers such as `Allow` or `Retry-After`.
+        for key, value in error.get_headers():
+            if key != "Content-Type":
+                response.headers[key] = value
         return response
 
 
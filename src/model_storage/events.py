@@ -0,0 +1,191 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Push changes of models to clients as server-sent events.
+
+Each worker holds a single connection listening for the notifications sent by
+`models.ModelChange.record` and fans them out to all subscribed clients. With
+gevent workers, an idle client only costs a greenlet and a small queue.
+"""
+
+import json
+import logging
+import queue
+import select
+import threading
+import time
+
+from .models import ModelChange
+
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """Receive the changes of models in the given projects."""
+
+    def __init__(self, projects, maxsize):
+        self.projects = projects
+        self.queue = queue.Queue(maxsize)
+
+    def visible(self, change):
+        return change["project_id"] is None or change["project_id"] in (
+            self.projects
+        )
+
+
+class Broadcaster:
+    """
+    Distribute database notifications to subscriptions.
+
+    The listener is started on first use, such that it runs in each worker
+    rather than in a preloading master process. A subscription that falls
+    behind is closed; its client resumes with ``Last-Event-ID``. Watchers are
+    called without arguments for every change and whenever the connection is
+    established or lost, since changes may have been missed in between.
+    """
+
+    def __init__(self, engine, queue_size, poll_interval=5):
+        self.engine = engine
+        self.queue_size = queue_size
+        self.poll_interval = poll_interval
+        self.subscriptions = set()
+        self.watchers = []
+        self.connected = False
+        self._lock = threading.Lock()
+        self._listener = None
+
+    def start(self):
+        """Start listening for notifications unless already listening."""
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(
+                    target=self.listen,
+                    name="model-change-listener",
+                    daemon=True,
+                )
+                self._listener.start()
+
+    def subscribe(self, projects):
+        subscription = Subscription(projects, self.queue_size)
+        with self._lock:
+            self.subscriptions.add(subscription)
+        self.start()
+        return subscription
+
+    def watch(self, callback):
+        self.watchers.append(callback)
+
+    def notify_watchers(self):
+        for callback in self.watchers:
+            callback()
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self.subscriptions.discard(subscription)
+
+    def publish(self, change):
+        self.notify_watchers()
+        with self._lock:
+            subscriptions = list(self.subscriptions)
+        for subscription in subscriptions:
+            if not subscription.visible(change):
+                continue
+            try:
+                subscription.queue.put_nowait(change)
+            except queue.Full:
+                self.unsubscribe(subscription)
+                # Make room for the end of stream marker.
+                try:
+                    subscription.queue.get_nowait()
+                except queue.Empty:
+                    pass
+                subscription.queue.put_nowait(None)
+
+    def listen(self):
+        """Forward notifications, reconnecting after any error."""
+        while True:
+            try:
+                self._listen()
+            except Exception as error:
+                logger.error(f"Listening for model changes failed: {error}")
+                time.sleep(self.poll_interval)
+
+    def _listen(self):
+        # Take a connection out of the pool for good.
+        connection = self.engine.raw_connection()
+        connection.detach()
+        connection = connection.connection
+        try:
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {ModelChange.CHANNEL}")
+            self.connected = True
+            self.notify_watchers()
+            while True:
+                select.select([connection], [], [], self.poll_interval)
+                connection.poll()
+                while connection.notifies:
+                    notification = connection.notifies.pop(0)
+                    self.publish(json.loads(notification.payload))
+        finally:
+            self.connected = False
+            self.notify_watchers()
+            connection.close()
+
+
+def format_event(change):
+    """Format a change as a server-sent event identified by its cursor."""
+    data = json.dumps(
+        {key: change[key] for key in ("cursor", "model_id", "action")}
+    )
+    return f"id: {change['cursor']}\nevent: change\ndata: {data}\n\n"
+
+
+def stream(broadcaster, subscription, backlog, last_id, keepalive):
+    """
+    Yield the backlog of changes followed by live changes.
+
+    The subscription is taken before the backlog is loaded, such that changes
+    committed in between are received twice but never missed; duplicates are
+    recognized by their cursor.
+    """
+    try:
+        yield f"retry: {keepalive * 1000}\n\n"
+        for change in backlog:
+            yield format_event(change)
+            last_id = change["cursor"]
+        while True:
+            try:
+                change = subscription.queue.get(timeout=keepalive)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+            if change is None:
+                return
+            if last_id is not None and change["cursor"] <= last_id:
+                continue
+            yield format_event(change)
+            last_id = change["cursor"]
+    finally:
+        broadcaster.unsubscribe(subscription)
+
+
+def init_app(app, db):
+    """Create the broadcaster of the application."""
+    app.extensions["events"] = Broadcaster(
+        db.get_engine(app), app.config["EVENTS_QUEUE_SIZE"]
+    )
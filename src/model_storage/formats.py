@@ -0,0 +1,139 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Convert between serialized models and the file formats of cobrapy."""
+
+import gzip
+import io
+import json
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import cobra
+import optlang
+from cobra.io import model_to_dict, read_sbml_model, write_sbml_model
+from cobra.io.dict import model_from_dict
+
+
+SBML_MIMETYPES = ("application/sbml+xml", "application/xml", "text/xml")
+PICKLE_MIMETYPE = "application/vnd.cobra.model+pickle"
+# Pickles of cobra models can only be loaded with compatible versions of
+# cobrapy and optlang; consumers declare theirs in these request headers.
+PICKLE_VERSIONS = {
+    "X-Cobra-Version": cobra.__version__,
+    "X-Optlang-Version": optlang.__version__,
+}
+JSON_SUFFIXES = (".json",)
+SBML_SUFFIXES = (".xml", ".sbml")
+
+
+def is_model_file(name):
+    """Return whether a file name denotes a cobra JSON or SBML model."""
+    if name.endswith(".gz"):
+        name = name[: -len(".gz")]
+    return name.endswith(JSON_SUFFIXES + SBML_SUFFIXES)
+
+
+def read_model(name, content):
+    """
+    Return the serialized model of a cobra JSON or SBML file.
+
+    :param name: The file name, which determines the format
+    :param content: The (optionally gzip compressed) bytes of the file
+    """
+    if name.endswith(".gz"):
+        name = name[: -len(".gz")]
+        content = gzip.decompress(content)
+    if name.endswith(JSON_SUFFIXES):
+        return json.loads(content)
+    if name.endswith(SBML_SUFFIXES):
+        return sbml_to_document(content)
+    raise ValueError(f"Unknown model format of '{name}'.")
+
+
+def sbml_to_document(content):
+    """Return the serialized model of an SBML document."""
+    return model_to_dict(read_sbml_model(content.decode("utf-8")))
+
+
+def document_to_sbml(document):
+    """Return a serialized model as an SBML document."""
+    buffer = io.StringIO()
+    write_sbml_model(model_from_dict(document), buffer)
+    return buffer.getvalue().encode("utf-8")
+
+
+def document_to_pickle(document):
+    """Return a serialized model as a pickled cobra model."""
+    return pickle.dumps(model_from_dict(document), protocol=4)
+
+
+def pickle_format():
+    """Return the artifact format of pickles made with the current versions."""
+    return "pickle-" + "-".join(PICKLE_VERSIONS.values())
+
+
+def is_pickle_compatible(headers):
+    """Return whether the request headers declare compatible versions."""
+    return all(
+        release(headers.get(header, "")) == release(version)
+        for header, version in PICKLE_VERSIONS.items()
+    )
+
+
+def release(version):
+    """Return the major and minor part of a version."""
+    return version.split(".")[:2]
+
+
+def objective_reaction(document):
+    """Return the ID of the first reaction in the objective, if any."""
+    for reaction in document.get("reactions", []):
+        if reaction.get("objective_coefficient"):
+            return reaction["id"]
+    return None
+
+
+class ConversionPool:
+    """
+    Run slow conversions with cobrapy in separate processes.
+
+    Waiting for a result only blocks the calling greenlet, while the
+    conversion itself does not compete with request handling for the GIL. The
+    executor is created on first use in each process, such that it is never
+    inherited from a preloading gunicorn master.
+    """
+
+    def __init__(self, processes):
+        self.processes = processes
+        self._executor = None
+        self._pid = None
+
+    def run(self, function, *args):
+        """Return the result of the function; run inline without processes."""
+        if not self.processes:
+            return function(*args)
+        if self._pid != os.getpid():
+            self._executor = ProcessPoolExecutor(self.processes)
+            self._pid = os.getpid()
+        return self._executor.submit(function, *args).result()
+
+
+def init_app(app):
+    """Create the conversion pool with its configured size."""
+    app.extensions["conversions"] = ConversionPool(
+        app.config["CONVERSION_PROCESSES"]
+    )
@@ -0,0 +1,199 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Create models asynchronously in a separate worker process.
+
+Jobs are queued in the ``model_job`` table by `resources.ModelJobs` and
+processed by ``flask process-jobs``. Any number of such workers may run, since
+each job is claimed with ``FOR UPDATE SKIP LOCKED``. A worker keeps its job
+locked until the result is committed, so only a job whose worker died is
+queued again after ``JOB_TIMEOUT`` seconds, up to ``JOB_MAX_ATTEMPTS`` times.
+"""
+
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+
+from flask import g
+from marshmallow import ValidationError
+from werkzeug.exceptions import HTTPException
+
+from . import resources
+from .models import ModelJob, db
+from .schemas import Model as ModelSchema
+
+
+logger = logging.getLogger(__name__)
+
+
+def claim():
+    """
+    Mark the oldest queued job as running and return it, or None.
+
+    The job stays locked in the transaction of the session until it is
+    finished.
+    """
+    job = (
+        ModelJob.query.filter(ModelJob.status == "queued")
+        .order_by(ModelJob.created)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if job is None:
+        db.session.rollback()
+        return None
+    job.status = "running"
+    job.started = datetime.utcnow()
+    job.attempts += 1
+    db.session.commit()
+    return (
+        ModelJob.query.filter(ModelJob.id == job.id)
+        .with_for_update()
+        .populate_existing()
+        .one()
+    )
+
+
+def execute(job):
+    """
+    Create the model of a job with the JWT claims of its client.
+
+    :return: The ID of the new model and None, or None and the errors in the
+        format of the corresponding API responses
+    """
+    g.jwt_valid = True
+    g.jwt_claims = {
+        "prj": {int(project): level for project, level in job.claims.items()}
+    }
+    try:
+        body = json.loads(job.body)
+    except ValueError as error:
+        return None, {"message": f"The body is not valid JSON: {error}"}
+    # Roll back only the model, keeping the job locked.
+    savepoint = db.session.begin_nested()
+    try:
+        payload = ModelSchema(exclude=("id",)).load(body)
+        model = resources.create_model(payload)
+        db.session.flush()
+    except ValidationError as error:
+        errors = error.messages
+    except HTTPException as error:
+        errors = getattr(error, "data", {}).get("messages") or {
+            "message": error.description
+        }
+    else:
+        savepoint.commit()
+        return model.id, None
+    savepoint.rollback()
+    return None, errors
+
+
+def finish(job, attempt, model_id, errors):
+    """
+    Record the result of a job and discard its body.
+
+    :param attempt: The attempt of the job that produced the result
+    :return: Whether the result was recorded; it is discarded along with the
+        created model if the job has meanwhile been queued again or failed
+    """
+    current = (
+        ModelJob.query.filter(
+            ModelJob.id == job.id,
+            ModelJob.status == "running",
+            ModelJob.attempts == attempt,
+        )
+        .with_for_update()
+        .populate_existing()
+        .first()
+    )
+    if current is None:
+        db.session.rollback()
+        return False
+    job.status = "failed" if errors else "succeeded"
+    job.model_id = model_id
+    job.errors = errors
+    job.body = None
+    job.finished = datetime.utcnow()
+    db.session.commit()
+    return True
+
+
+def run_once(app):
+    """Process the oldest queued job; return whether there was any."""
+    with app.test_request_context():
+        job = claim()
+        if job is None:
+            return False
+        logger.info(f"Processing model job {job.id}.")
+        if finish(job, job.attempts, *execute(job)):
+            logger.info(f"Model job {job.id} {job.status}.")
+        else:
+            logger.warning(f"Discarded the outdated result of job {job.id}.")
+    return True
+
+
+def maintain(timeout, max_attempts, retention):
+    """Queue stale jobs again, or fail them, and remove old finished jobs."""
+    now = datetime.utcnow()
+    # Jobs that are still locked are running in a live worker.
+    stale_ids = (
+        db.session.query(ModelJob.id)
+        .filter(
+            ModelJob.status == "running",
+            ModelJob.started < now - timedelta(seconds=timeout),
+        )
+        .with_for_update(skip_locked=True)
+    )
+    stale = ModelJob.query.filter(
+        ModelJob.status == "running",
+        ModelJob.id.in_([id for id, in stale_ids]),
+    )
+    stale.filter(ModelJob.attempts >= max_attempts).update(
+        {
+            "status": "failed",
+            "body": None,
+            "errors": {"message": "The job did not finish in time."},
+            "finished": now,
+        },
+        synchronize_session=False,
+    )
+    stale.update({"status": "queued"}, synchronize_session=False)
+    ModelJob.query.filter(
+        ModelJob.finished < now - timedelta(seconds=retention)
+    ).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def run(app):
+    """Process jobs until interrupted."""
+    config = app.config
+    while True:
+        with app.app_context():
+            maintain(
+                config["JOB_TIMEOUT"],
+                config["JOB_MAX_ATTEMPTS"],
+                config["JOB_RETENTION"],
+            )
+        while True:
+            try:
+                if not run_once(app):
+                    break
+            except Exception:
+                # The job is queued again once it is stale.
+                logger.exception("Processing a model job failed.")
+                break
+        time.sleep(config["JOB_POLL_INTERVAL"])
@@ -30,32 +30,16 @@ def init_app(app):
 
     @app.before_request
     def decode_jwt():
-        if "Authorization" not in request.headers:
-            logger.debug("No JWT provided")
-            g.jwt_valid = False
-            g.jwt_claims = {"prj": {}}
+        view = app.view_functions.get(request.endpoint)
+        if getattr(getattr(view, "view_class", None), "jwt_exempt", False):
+            # Resources that only serve public data never look at tokens.
+            g.jwt_valid, g.jwt_claims = False, {"prj": {}}
             return
-
-        auth = request.headers["Authorization"]
-        if not auth.startswith("Bearer "):
-            g.jwt_valid = False
-            g.jwt_claims = {"prj": {}}
-            return
-
         try:
-            _, token = auth.split(" ", 1)
-            g.jwt_claims = jwt.decode(
-                token,
+            g.jwt_valid, g.jwt_claims = decode_authorization(
+                request.headers.get("Authorization"),
                 app.config["JWT_PUBLIC_KEY"],
-                app.config["JWT_PUBLIC_KEY"]["alg"],
             )
-            # JSON object names can only be strings. Map project ids to ints for
-            # easier handling
-            g.jwt_claims["prj"] = {
-                int(key): value for key, value in g.jwt_claims["prj"].items()
-            }
-            g.jwt_valid = True
-            logger.debug(f"JWT claims accepted: {g.jwt_claims}")
         except (
             jwt.JWTError,
             jwt.ExpiredSignatureError,
@@ -64,6 +48,34 @@ def init_app(app):
             abort(401, f"JWT authentication failed: {e}")
 
 
+def decode_authorization(authorization, public_key):
+    """
+    Decode the value of an `Authorization` header into JWT claims.
+
+    Kept independent of the Flask request context so that it can be shared with
+    the ASGI entry point.
+
+    :param authorization: The header value, or None if it was not provided
+    :param public_key: The JWK used to verify the token signature
+    :return: A tuple of whether a valid JWT was provided and its claims
+    :raises jwt.JWTError: If the token is given but cannot be verified
+    """
+    if authorization is None:
+        logger.debug("No JWT provided")
+        return False, {"prj": {}}
+
+    if not authorization.startswith("Bearer "):
+        return False, {"prj": {}}
+
+    _, token = authorization.split(" ", 1)
+    claims = jwt.decode(token, public_key, public_key["alg"])
+    # JSON object names can only be strings. Map project ids to ints for
+    # easier handling
+    claims["prj"] = {int(key): value for key, value in claims["prj"].items()}
+    logger.debug(f"JWT claims accepted: {claims}")
+    return True, claims
+
+
 def jwt_required(function):
     """
     Require JWT to be provided.
@@ -0,0 +1,170 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Store model contents as modifications of a parent content.
+
+Modifications map each collection (reactions, metabolites and genes) to the
+elements to add or replace by their ID, or to None for elements to remove.
+Other top-level entries of the serialized model are modified through
+``attributes`` in the same way, for example::
+
+    {
+        "reactions": {"PFK": None, "NEW": {"id": "NEW", ...}},
+        "attributes": {"id": "e_coli_core_pfk_ko"},
+    }
+"""
+
+from flask import current_app
+from marshmallow import ValidationError
+
+from . import elements
+
+
+SECTIONS = elements.COLLECTIONS + ("attributes",)
+
+
+def check(modifications):
+    """Verify the structure of modifications."""
+    if not isinstance(modifications, dict):
+        raise ValidationError("The modifications must be a JSON object.")
+    unknown = modifications.keys() - set(SECTIONS)
+    if unknown:
+        raise ValidationError(f"Unknown modifications {sorted(unknown)}.")
+    for section in SECTIONS:
+        if not isinstance(modifications.get(section, {}), dict):
+            raise ValidationError(
+                f"The {section} modifications must be a JSON object."
+            )
+    for collection in elements.COLLECTIONS:
+        for id, element in modifications.get(collection, {}).items():
+            if element is not None and (
+                not isinstance(element, dict) or element.get("id") != id
+            ):
+                raise ValidationError(
+                    f"The {collection} modification '{id}' must be null or an "
+                    f"element with the same ID."
+                )
+
+
+def compose(*overlays):
+    """Combine modifications such that later ones take precedence."""
+    result = {section: {} for section in SECTIONS}
+    for overlay in overlays:
+        for section in SECTIONS:
+            result[section].update(overlay.get(section, {}))
+    return {section: changes for section, changes in result.items() if changes}
+
+
+def apply(document, modifications):
+    """Return a new serialized model with the modifications applied."""
+    result = {
+        key: value
+        for key, value in document.items()
+        if key not in elements.COLLECTIONS
+    }
+    for key, value in modifications.get("attributes", {}).items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = value
+    for collection in elements.COLLECTIONS:
+        changes = modifications.get(collection, {})
+        existing = document.get(collection, [])
+        ids = {element["id"] for element in existing}
+        result[collection] = [
+            changes.get(element["id"], element)
+            for element in existing
+            if changes.get(element["id"], element) is not None
+        ] + [
+            element
+            for id, element in changes.items()
+            if element is not None and id not in ids
+        ]
+    return result
+
+
+def apply_to_index(index, modifications):
+    """Return the element index of a model with the modifications applied."""
+    result = {}
+    for section in SECTIONS:
+        result[section] = dict(index[section])
+        for id, element in modifications.get(section, {}).items():
+            if element is None:
+                result[section].pop(id, None)
+            else:
+                result[section][id] = elements.digest(element)
+    return result
+
+
+def derive(parent, modifications, biomass_reaction):
+    """
+    Return the values of a content derived from a parent content.
+
+    Validation only considers the modified elements, i.e., the bounds of
+    modified reactions and their references against the element index of the
+    parent, such that the cost of a write scales with the size of the
+    change. Chains of overlays deeper than ``LINEAGE_MAX_DEPTH`` are rebased
+    onto the closest fully stored ancestor, and overlays that modify a large
+    part of the model are stored in full instead.
+
+    :param parent: A `models.ModelContent`
+    :return: The column values of a `models.ModelContent`
+    """
+    check(modifications)
+    for reaction in filter(None, modifications.get("reactions", {}).values()):
+        elements.check_bounds(reaction)
+    index = apply_to_index(parent.element_index, modifications)
+    removed = any(
+        element is None
+        for collection in ("metabolites", "genes")
+        for element in modifications.get(collection, {}).values()
+    )
+    if removed:
+        # Unchanged reactions may refer to removed elements.
+        reactions = apply(parent.materialize(), modifications)["reactions"]
+    else:
+        reactions = filter(None, modifications.get("reactions", {}).values())
+    for reaction in reactions:
+        elements.check_references(
+            reaction["id"], *elements.references(reaction), index
+        )
+    if biomass_reaction not in index["reactions"]:
+        raise ValidationError(
+            f"The biomass reaction '{biomass_reaction}' does not exist in the "
+            f"corresponding model."
+        )
+
+    config = current_app.config
+    depth = parent.depth + 1
+    if depth > config["LINEAGE_MAX_DEPTH"]:
+        overlays = [modifications]
+        while parent.parent_hash is not None:
+            overlays.append(parent.modifications)
+            parent = parent.parent
+        modifications = compose(*reversed(overlays))
+        depth = 1
+    values = {"hash": elements.content_hash(index), "element_index": index}
+    size = sum(len(changes) for changes in modifications.values())
+    total = sum(len(index[section]) for section in SECTIONS)
+    if size > config["LINEAGE_COMPACTION_RATIO"] * total:
+        values.update(
+            document=apply(parent.materialize(), modifications), depth=0
+        )
+    else:
+        values.update(
+            parent_hash=parent.hash, modifications=modifications, depth=depth
+        )
+    return values
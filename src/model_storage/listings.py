@@ -0,0 +1,127 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Cache the rendered model listing per set of visible projects.
+
+Most clients see one of a few sets of projects, so the listing is rendered once
+per set. A version counter invalidates all cached listings; it is bumped when
+a model change is committed in this worker and whenever the notification of
+a change committed elsewhere arrives (see `events.Broadcaster`). Since changes
+would go unnoticed without notifications, nothing is cached while the worker
+is not listening for them. Listings rendered from a lagging read replica are
+bounded in age by ``LISTING_CACHE_MAX_AGE`` and kept apart from those of other
+replicas and the primary.
+"""
+
+import hashlib
+import threading
+import time
+
+from sqlalchemy import event, inspect
+
+from .cache import LRUCache
+from .models import Model
+from .replicas import RoutingSession
+
+
+CHANGED = "listing_changed"
+
+
+def etag(body):
+    """Return the entity tag of a rendered listing."""
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+class Listing:
+    """A rendered listing with its entity tag."""
+
+    def __init__(self, version, body):
+        self.version = version
+        self.body = body
+        self.etag = etag(body)
+        self.created = time.monotonic()
+
+
+class ListingCache:
+    """Keep listings by the set of visible projects."""
+
+    def __init__(self, broadcaster, maxsize, max_age):
+        self.broadcaster = broadcaster
+        self.max_age = max_age
+        self.version = 0
+        self._entries = LRUCache(maxsize) if maxsize > 0 else None
+        self._lock = threading.Lock()
+        broadcaster.watch(self.invalidate)
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+
+    def render(self, render):
+        """Return a listing rendered without the cache."""
+        return Listing(self.version, render())
+
+    def get(self, projects, render, replica=None):
+        """
+        Return the listing for the projects, rendering it if necessary.
+
+        :param projects: The IDs of the visible projects
+        :param render: A function returning the listing as bytes
+        :param replica: The bind key of the replica the listing is rendered
+            from, None for the primary
+        """
+        if self._entries is None:
+            return self.render(render)
+        self.broadcaster.start()
+        key = (frozenset(projects), replica)
+        listing = self._entries.get(key)
+        if (
+            listing is not None
+            and listing.version == self.version
+            and time.monotonic() - listing.created < self.max_age
+        ):
+            return listing
+        # Remember the version before querying, such that a change committed
+        # meanwhile invalidates the new entry.
+        listing = self.render(render)
+        if self.broadcaster.connected:
+            self._entries.set(key, listing)
+        return listing
+
+
+def init_app(app):
+    """Create the listing cache and invalidate it on local model changes."""
+    listings = ListingCache(
+        app.extensions["events"],
+        app.config["LISTING_CACHE_SIZE"],
+        app.config["LISTING_CACHE_MAX_AGE"],
+    )
+    app.extensions["listings"] = listings
+
+    @event.listens_for(Model, "after_insert")
+    @event.listens_for(Model, "after_update")
+    @event.listens_for(Model, "after_delete")
+    def schedule_invalidation(mapper, connection, target):
+        inspect(target).session.info[CHANGED] = True
+
+    @event.listens_for(RoutingSession, "after_commit")
+    def invalidate(session):
+        if session.info.pop(CHANGED, False):
+            listings.invalidate()
+
+    @event.listens_for(RoutingSession, "after_rollback")
+    def discard(session):
+        session.info.pop(CHANGED, None)
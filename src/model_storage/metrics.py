@@ -0,0 +1,101 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Collect and expose Prometheus metrics.
+
+When the environment variable ``prometheus_multiproc_dir`` is set, the metrics
+of all gunicorn workers are aggregated, otherwise only those of the worker
+answering the request are reported.
+"""
+
+import os
+
+from flask import make_response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.multiprocess import MultiProcessCollector
+
+
+QUERY_LATENCY = Histogram(
+    "model_storage_query_duration_seconds",
+    "Latency of database queries per engine.",
+    ["engine"],
+)
+COALESCED_REQUESTS = Counter(
+    "model_storage_coalesced_requests_total",
+    "Requests served with the result of an identical request in flight.",
+    ["kind"],
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "model_storage_admission_queue_depth",
+    "Requests waiting for admission per request class.",
+    ["request_class"],
+    multiprocess_mode="livesum",
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "model_storage_admission_in_flight",
+    "Admitted requests being served per request class.",
+    ["request_class"],
+    multiprocess_mode="livesum",
+)
+ADMISSION_REJECTIONS = Counter(
+    "model_storage_admission_rejections_total",
+    "Requests rejected per request class and reason.",
+    ["request_class", "reason"],
+)
+WORKER_RSS = Gauge(
+    "model_storage_worker_rss_bytes",
+    "Resident set size of each gunicorn worker.",
+    multiprocess_mode="all",
+)
+WORKER_RECYCLES = Counter(
+    "model_storage_worker_recycles_total",
+    "Exits of gunicorn workers by reason.",
+    ["reason"],
+)
+TIER_READS = Counter(
+    "model_storage_tier_reads_total",
+    "Reads of models per storage tier of their document.",
+    ["tier"],
+)
+TIER_MOVES = Counter(
+    "model_storage_tier_moves_total",
+    "Documents moved to or restored from the archive.",
+    ["direction"],
+)
+
+
+def init_app(app):
+    """Serve the metrics on the `/metrics` route."""
+
+    def metrics():
+        if "prometheus_multiproc_dir" in os.environ:
+            registry = CollectorRegistry()
+            MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        response = make_response(generate_latest(registry))
+        response.headers["Content-Type"] = CONTENT_TYPE_LATEST
+        return response
+
+    app.add_url_rule("/metrics", view_func=metrics)
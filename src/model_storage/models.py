@@ -13,13 +13,18 @@
 # limitations under the License.from datetime import datetime
 
 
+import json
 from datetime import datetime
 
-from flask_sqlalchemy import SQLAlchemy
+from flask import current_app
+from sqlalchemy import event, func, inspect
 from sqlalchemy.dialects import postgresql
 
+from . import blobs, compression, elements, lineage, similarity, tiers
+from .replicas import RoutingSQLAlchemy
 
-db = SQLAlchemy()
+
+db = RoutingSQLAlchemy()
 
 
 class TimestampMixin(object):
@@ -28,15 +33,408 @@ class TimestampMixin(object):
 
 
 class Model(TimestampMixin, db.Model):
+    """
+    A model and its metadata.
+
+    In production the table is partitioned by project, with one partition for
+    public models; see the `partitions` module. Partitioned tables can not be
+    referenced by foreign keys, so there the references to models are
+    maintained by a trigger instead.
+    """
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(256), nullable=False)
-    model_serialized = db.Column(postgresql.JSONB, nullable=False)
+    # The model this model was derived from, if any.
+    parent_id = db.Column(
+        db.Integer, db.ForeignKey("model.id", ondelete="SET NULL"), index=True
+    )
     organism_id = db.Column(db.Integer, nullable=False)
-    project_id = db.Column(db.Integer)
+    project_id = db.Column(db.Integer, index=True)
     default_biomass_reaction = db.Column(db.String(256), nullable=False)
     preferred_map_id = db.Column(db.Integer, nullable=True)
     ec_model = db.Column(db.Boolean, nullable=False)
+    # The current version of the serialized model.
+    content_hash = db.Column(
+        db.String(64), db.ForeignKey("model_content.hash"), nullable=False
+    )
+    version = db.Column(db.Integer, nullable=False)
+    # When the model was last read, recorded in batches; see the `tiers`
+    # module.
+    accessed = db.Column(db.DateTime)
+
+    content = db.relationship("ModelContent")
+    versions = db.relationship(
+        "ModelVersion",
+        lazy="dynamic",
+        order_by="ModelVersion.version",
+        passive_deletes=True,
+    )
 
     def __repr__(self):
         """Return a printable representation."""
         return f"<{self.__class__.__name__} {self.id}: {self.name}>"
+
+    @classmethod
+    def visible(cls, projects):
+        """
+        Filter the models that are public or belong to one of the projects.
+
+        Postgres only scans the partitions of the given projects and the
+        public partition, which requires the projects to be given as literals
+        rather than an array parameter.
+        """
+        if not projects:
+            return cls.project_id.is_(None)
+        return cls.project_id.in_(projects) | cls.project_id.is_(None)
+
+    @property
+    def model_serialized(self):
+        return self.content.materialize()
+
+    @model_serialized.setter
+    def model_serialized(self, document):
+        self.set_content(ModelContent.from_document(document))
+
+    @property
+    def modifications(self):
+        return self.content.modifications
+
+    def set_content(self, content):
+        """Make the given content the current version, unless it already is."""
+        if content.hash == self.content_hash:
+            return
+        self.content = content
+        self.version = (self.version or 0) + 1
+        self.versions.append(
+            ModelVersion(version=self.version, content=content)
+        )
+
+
+class ModelContent(db.Model):
+    """
+    An immutable serialized model identified by its content hash.
+
+    The content is either stored in full or as modifications of a parent
+    content; see the `lineage` module. Identical models are stored only once.
+    Full documents are kept in the blob store, if one is configured, instead
+    of the database; see the `blobs` module. Documents that have not been read
+    for a long time are moved to the archive; see the `tiers` module.
+    """
+
+    hash = db.Column(db.String(64), primary_key=True)
+    document = db.deferred(db.Column(postgresql.JSONB))
+    external = db.Column(db.Boolean, nullable=False, default=False)
+    archived = db.Column(db.Boolean, nullable=False, default=False)
+    parent_hash = db.Column(db.String(64), db.ForeignKey("model_content.hash"))
+    modifications = db.Column(postgresql.JSONB)
+    depth = db.Column(db.Integer, nullable=False, default=0)
+    element_index = db.deferred(db.Column(postgresql.JSONB, nullable=False))
+    # The MinHash signature of the element IDs; see the `similarity` module.
+    signature = db.deferred(db.Column(postgresql.ARRAY(db.BigInteger)))
+    created = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    parent = db.relationship("ModelContent", remote_side=[hash])
+
+    def __repr__(self):
+        """Return a printable representation."""
+        return f"<{self.__class__.__name__} {self.hash}>"
+
+    @classmethod
+    def get_or_create(cls, **values):
+        """
+        Return the content with the given hash, storing it if it is new.
+
+        Concurrent writers of the same content are resolved by the database.
+        A given document is moved to the blob store, if one is configured, or
+        otherwise compressed ahead of time; see the `compression` module.
+        The similarity signature is computed from the element index unless
+        given, and its bands are added to the similarity index.
+        """
+        store = current_app.extensions["blobs"]
+        document = values.get("document")
+        if store is not None and isinstance(document, dict):
+            blobs.store_document(store, values["hash"], values.pop("document"))
+            values["external"] = True
+        values.setdefault(
+            "signature", similarity.signature(values["element_index"])
+        )
+        db.session.execute(
+            postgresql.insert(cls.__table__)
+            .values(created=datetime.utcnow(), **values)
+            .on_conflict_do_nothing(index_elements=[cls.hash])
+        )
+        ModelContentBand.insert(values["hash"], values["signature"])
+        if "document" in values and isinstance(document, dict):
+            # Compress the document once for all responses.
+            db.session.execute(
+                postgresql.insert(ModelArtifact.__table__)
+                .values(
+                    content_hash=values["hash"],
+                    format=compression.FORMAT,
+                    data=compression.compress_document(document),
+                    created=datetime.utcnow(),
+                )
+                .on_conflict_do_nothing()
+            )
+        return cls.query.get(values["hash"])
+
+    @classmethod
+    def from_document(cls, document, index=None):
+        """Return the content of a full serialized model."""
+        if index is None:
+            index = elements.index_model(document)
+        return cls.get_or_create(
+            hash=elements.content_hash(index),
+            document=document,
+            element_index=index,
+            depth=0,
+        )
+
+    @classmethod
+    def has_element(cls, hash, collection, id):
+        """Look up an element in the index of a content without loading it."""
+        return (
+            db.session.query(cls.element_index[collection].has_key(id))
+            .filter(cls.hash == hash)
+            .scalar()
+        )
+
+    def materialize(self):
+        """
+        Return the full serialized model.
+
+        Materialized models are cached by their content hash, such that a
+        cached model is found without loading its document or touching any
+        of its ancestors.
+        """
+        cache = current_app.extensions["caches"]["documents"]
+        document = cache.get(self.hash)
+        if document is None:
+            if self.external:
+                document = blobs.load_document(
+                    current_app.extensions["blobs"], self.hash
+                )
+            elif self.archived:
+                document = tiers.load_document(
+                    current_app.extensions["archive"], self.hash
+                )
+            elif self.parent_hash is None:
+                document = self.document
+            else:
+                document = lineage.apply(
+                    self.parent.materialize(), self.modifications
+                )
+            cache.set(self.hash, document)
+        return document
+
+
+class ModelContentBand(db.Model):
+    """The bucket of one band of the signature of a content."""
+
+    content_hash = db.Column(
+        db.String(64), db.ForeignKey("model_content.hash"), primary_key=True
+    )
+    band = db.Column(db.SmallInteger, primary_key=True)
+    bucket = db.Column(db.BigInteger, nullable=False)
+
+    __table_args__ = (db.Index("ix_model_content_band_bucket", band, bucket),)
+
+    @classmethod
+    def insert(cls, content_hash, signature):
+        db.session.execute(
+            postgresql.insert(cls.__table__)
+            .values(
+                [
+                    {
+                        "content_hash": content_hash,
+                        "band": band,
+                        "bucket": bucket,
+                    }
+                    for band, bucket in enumerate(similarity.buckets(signature))
+                ]
+            )
+            .on_conflict_do_nothing()
+        )
+
+
+class ModelArtifact(db.Model):
+    """A model content converted to another format, e.g., SBML."""
+
+    content_hash = db.Column(
+        db.String(64), db.ForeignKey("model_content.hash"), primary_key=True
+    )
+    format = db.Column(db.String(64), primary_key=True)
+    data = db.Column(db.LargeBinary, nullable=False)
+    created = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    @classmethod
+    def load(cls, content_hash, format):
+        """Return the data of an artifact or None."""
+        return (
+            db.session.query(cls.data)
+            .filter(cls.content_hash == content_hash, cls.format == format)
+            .scalar()
+        )
+
+    @classmethod
+    def store(cls, content_hash, format, data):
+        """
+        Store an artifact unless it exists already.
+
+        Artifacts are usually generated while serving safe requests, which may
+        read from a replica and never commit. The artifact is therefore
+        inserted on its own through the primary, outside of the transaction of
+        the session, and concurrent requests storing the same artifact are
+        resolved by the database.
+        """
+        db.session().get_primary_bind(cls).execute(
+            postgresql.insert(cls.__table__)
+            .values(
+                content_hash=content_hash,
+                format=format,
+                data=data,
+                created=datetime.utcnow(),
+            )
+            .on_conflict_do_nothing()
+        )
+
+
+class ModelVersion(db.Model):
+    model_id = db.Column(
+        db.Integer,
+        db.ForeignKey("model.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    version = db.Column(db.Integer, primary_key=True)
+    content_hash = db.Column(
+        db.String(64), db.ForeignKey("model_content.hash"), nullable=False
+    )
+    created = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    content = db.relationship("ModelContent")
+
+    @property
+    def model_serialized(self):
+        return self.content.materialize()
+
+
+class ModelChange(db.Model):
+    """
+    An entry of the change log of models.
+
+    Entries are numbered in commit order, such that clients can mirror the
+    catalog by following the log from the last entry they have seen.
+    """
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    model_id = db.Column(db.Integer, nullable=False)
+    # The project of the model at the time of the change, used for filtering.
+    project_id = db.Column(db.Integer, index=True)
+    action = db.Column(
+        db.Enum("created", "updated", "deleted", name="model_change_action"),
+        nullable=False,
+    )
+    created = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    # Writers of the change log take this transaction level advisory lock,
+    # such that entries become visible in the order of their IDs.
+    LOCK = 0x6D6F64656C  # "model"
+
+    # Every change is also announced on this channel when it is committed;
+    # see the `events` module.
+    CHANNEL = "model_changes"
+
+    @classmethod
+    def record(cls, connection, model_id, project_id, action):
+        connection.execute(func.pg_advisory_xact_lock(cls.LOCK).select())
+        id = connection.execute(
+            cls.__table__.insert()
+            .values(
+                model_id=model_id,
+                project_id=project_id,
+                action=action,
+                created=datetime.utcnow(),
+            )
+            .returning(cls.id)
+        ).scalar()
+        payload = {
+            "cursor": id,
+            "model_id": model_id,
+            "project_id": project_id,
+            "action": action,
+        }
+        connection.execute(
+            func.pg_notify(cls.CHANNEL, json.dumps(payload)).select()
+        )
+
+
+class ModelJob(db.Model):
+    """
+    An asynchronous creation of a model; see the `jobs` module.
+
+    The raw request body is kept until the job has been processed. The JWT
+    claims of the client are recorded, such that its access to the target
+    project is verified when the job runs, and only the client that queued
+    the job may poll it.
+    """
+
+    id = db.Column(db.String(32), primary_key=True)
+    status = db.Column(
+        db.Enum(
+            "queued", "running", "succeeded", "failed", name="model_job_status"
+        ),
+        nullable=False,
+        default="queued",
+    )
+    body = db.deferred(db.Column(db.LargeBinary))
+    claims = db.Column(postgresql.JSONB, nullable=False)
+    # The subject of the client's JWT, if it has one.
+    submitter = db.Column(db.String(256))
+    model_id = db.Column(
+        db.Integer, db.ForeignKey("model.id", ondelete="SET NULL")
+    )
+    errors = db.Column(postgresql.JSONB)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    created = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started = db.Column(db.DateTime)
+    finished = db.Column(db.DateTime)
+
+    __table_args__ = (db.Index("ix_model_job_status", status, created),)
+
+    def submitted_by(self, claims):
+        """Return whether JWT claims identify the client that queued the job."""
+        if claims.get("sub") != self.submitter:
+            return False
+        if self.submitter is not None:
+            return True
+        # Without a subject, the client is identified by its project claims.
+        return self.claims == {
+            str(project): level for project, level in claims["prj"].items()
+        }
+
+
+@event.listens_for(Model, "after_insert")
+def record_creation(mapper, connection, target):
+    ModelChange.record(connection, target.id, target.project_id, "created")
+
+
+@event.listens_for(Model, "after_update")
+def record_update(mapper, connection, target):
+    state = inspect(target)
+    changed = [
+        attribute.key
+        for attribute in mapper.column_attrs
+        if state.attrs[attribute.key].history.has_changes()
+    ]
+    if not changed:
+        return
+    previous = state.attrs.project_id.history.deleted
+    if previous and previous[0] != target.project_id:
+        # Mirrors of the previous project must drop the model.
+        ModelChange.record(connection, target.id, previous[0], "deleted")
+    ModelChange.record(connection, target.id, target.project_id, "updated")
+
+
+@event.listens_for(Model, "after_delete")
+def record_deletion(mapper, connection, target):
+    ModelChange.record(connection, target.id, target.project_id, "deleted")
@@ -0,0 +1,146 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Manage the partitions of the model table.
+
+The migration ``9c4f2a6d8e17`` partitions the table by the project ID into
+``model_public`` for public models and a default partition ``model_projects``,
+itself split into hash partitions. Large projects can be moved into a
+partition of their own, such that deleting the project drops its partition
+instead of deleting rows from the shared partitions.
+"""
+
+from sqlalchemy import text
+
+from .models import ModelChange
+
+
+# Set while rows are moved between partitions, such that the trigger
+# maintaining references to models does not treat them as deleted.
+MOVING = "model_storage.moving_partition"
+
+
+def partition_name(project_id):
+    return f"model_project_{int(project_id)}"
+
+
+def is_partitioned(connection):
+    return (
+        connection.scalar(
+            text("SELECT relkind FROM pg_class WHERE oid = 'model'::regclass")
+        )
+        == "p"
+    )
+
+
+def has_partition(connection, project_id):
+    return connection.scalar(
+        text("SELECT to_regclass(:name) IS NOT NULL"),
+        name=partition_name(project_id),
+    )
+
+
+def partition_project(connection, project_id):
+    """
+    Move the models of a project into a partition of their own.
+
+    Writes of models are blocked until the transaction is committed.
+
+    :return: False if the project has a partition already
+    """
+    if not is_partitioned(connection):
+        raise ValueError("The model table is not partitioned.")
+    if has_partition(connection, project_id):
+        return False
+    name = partition_name(project_id)
+    connection.execute(text("LOCK TABLE model IN EXCLUSIVE MODE"))
+    connection.execute(
+        text(f"CREATE TABLE {name} (LIKE model INCLUDING DEFAULTS)")
+    )
+    connection.execute(text(f"SET LOCAL {MOVING} = 'on'"))
+    connection.execute(
+        text(
+            f"WITH moved AS (DELETE FROM model_projects "
+            f"WHERE project_id = :project_id RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ),
+        project_id=project_id,
+    )
+    connection.execute(text(f"SET LOCAL {MOVING} = 'off'"))
+    connection.execute(text(f"ALTER TABLE {name} ADD PRIMARY KEY (id)"))
+    connection.execute(
+        text(
+            f"ALTER TABLE model ATTACH PARTITION {name} "
+            f"FOR VALUES IN ({int(project_id)})"
+        )
+    )
+    return True
+
+
+def delete_project(connection, project_id):
+    """
+    Delete all models of a project, dropping its partition if it has one.
+
+    The deletions are recorded in the change log like any other.
+
+    :return: The number of deleted models
+    """
+    models = "SELECT id FROM model WHERE project_id = :project_id"
+    connection.execute(
+        text("SELECT pg_advisory_xact_lock(:lock)"), lock=ModelChange.LOCK
+    )
+    count = connection.scalar(
+        text(
+            f"WITH changes AS ("
+            f"  INSERT INTO model_change "
+            f"  (model_id, project_id, action, created) "
+            f"  SELECT id, :project_id, 'deleted', now() "
+            f"  FROM ({models}) AS deleted "
+            f"  ORDER BY id RETURNING id, model_id, project_id, action"
+            f"), notifications AS ("
+            f"  SELECT pg_notify(:channel, json_build_object('cursor', id, "
+            f"  'model_id', model_id, 'project_id', project_id, "
+            f"  'action', action)::text) FROM changes"
+            f") SELECT count(*) FROM notifications"
+        ),
+        project_id=project_id,
+        channel=ModelChange.CHANNEL,
+    )
+    connection.execute(
+        text(f"DELETE FROM model_version WHERE model_id IN ({models})"),
+        project_id=project_id,
+    )
+    connection.execute(
+        text(
+            f"UPDATE model SET parent_id = NULL WHERE parent_id IN ({models}) "
+            f"AND project_id IS DISTINCT FROM :project_id"
+        ),
+        project_id=project_id,
+    )
+    connection.execute(
+        text(
+            f"UPDATE model_job SET model_id = NULL WHERE model_id IN ({models})"
+        ),
+        project_id=project_id,
+    )
+    if is_partitioned(connection) and has_partition(connection, project_id):
+        connection.execute(text(f"DROP TABLE {partition_name(project_id)}"))
+    else:
+        connection.execute(
+            text("DELETE FROM model WHERE project_id = :project_id"),
+            project_id=project_id,
+        )
+    return count
@@ -0,0 +1,221 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Run the queries of every request as fixed, prepared statements.
+
+Building a query through the ORM and compiling it costs more CPU time than
+the database needs to answer it. The listing and the lookup of a single model
+are therefore written out once per number of visible projects. Their compiled
+form is cached by SQLAlchemy, and with ``PREPARED_STATEMENTS`` Postgres parses
+and plans them only once per connection. Behind a connection pooler in
+transaction mode, prepared statements must be disabled.
+
+The visible projects are bound as one parameter each rather than as a single
+array. Like the literal project IDs of `models.Model.visible`, such a list
+lets Postgres skip the partitions of other projects, even in the generic plan
+of a prepared statement; an array parameter would cost an index probe in
+every partition.
+"""
+
+import re
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import select, text
+from sqlalchemy.orm import load_only
+
+from .models import Model, db
+
+
+# Connections record the names of the statements prepared on them.
+PREPARED = "model_storage.prepared"
+
+_compiled_cache = {}
+
+
+class Statement:
+    """
+    A fixed SQL statement with named parameters.
+
+    :param name: The name of the prepared statement
+    :param sql: The statement with ``:name`` style parameters
+    :param types: The Postgres type of each parameter in order
+    """
+
+    def __init__(self, name, sql, **types):
+        self.name = name
+        self.text = text(sql)
+        positional = sql
+        for number, parameter in enumerate(types, 1):
+            positional = re.sub(rf":{parameter}\b", f"${number}", positional)
+        self.prepare = text(
+            f"PREPARE {name} ({', '.join(types.values())}) AS {positional}"
+        )
+        self.execute = text(
+            f"EXECUTE {name} ({', '.join(f':{key}' for key in types)})"
+        )
+
+    def on(self, connection):
+        """Return the statement to execute on the connection."""
+        if not current_app.config["PREPARED_STATEMENTS"]:
+            return self.text
+        prepared = connection.info.setdefault(PREPARED, set())
+        if self.name not in prepared:
+            connection.execute(self.prepare)
+            prepared.add(self.name)
+        return self.execute
+
+
+LISTING_COLUMNS = (
+    "id",
+    "name",
+    "organism_id",
+    "project_id",
+    "preferred_map_id",
+    "default_biomass_reaction",
+    "ec_model",
+    "parent_id",
+)
+
+
+class VisibleStatement:
+    """
+    A statement restricted to models visible with a number of projects.
+
+    The statement for each number of projects is created on first use.
+
+    :param name: The prefix of the names of the prepared statements
+    :param sql: The statement with a ``{visible}`` placeholder for the
+        condition on the projects
+    :param types: The Postgres type of each parameter but the projects
+    """
+
+    def __init__(self, name, sql, **types):
+        self.name = name
+        self.sql = sql
+        self.types = types
+        self._statements = {}
+        self._lock = threading.Lock()
+
+    def for_projects(self, count):
+        """Return the statement for the given number of projects."""
+        with self._lock:
+            if count not in self._statements:
+                names = [f"project_{index}" for index in range(count)]
+                visible = "project_id IS NULL"
+                if names:
+                    placeholders = ", ".join(f":{name}" for name in names)
+                    visible = f"(project_id IN ({placeholders}) OR {visible})"
+                self._statements[count] = Statement(
+                    f"{self.name}_{count}",
+                    self.sql.format(visible=visible),
+                    **self.types,
+                    **dict.fromkeys(names, "integer"),
+                )
+            return self._statements[count]
+
+    @staticmethod
+    def parameters(projects):
+        """Return the parameters binding the projects."""
+        return {
+            f"project_{index}": project
+            for index, project in enumerate(sorted(projects))
+        }
+
+
+LIST_MODELS = VisibleStatement(
+    "list_models",
+    f"SELECT {', '.join(LISTING_COLUMNS)} FROM model WHERE {{visible}}",
+)
+# Columns are listed rather than `model.*`, which Postgres would expand once
+# on preparing the statement.
+GET_MODEL = VisibleStatement(
+    "get_model",
+    f"SELECT {', '.join(column.name for column in Model.__table__.columns)} "
+    f"FROM model WHERE id = :id AND {{visible}}",
+    id="integer",
+)
+
+
+def connection():
+    """Return the connection of the current session for models."""
+    return db.session.connection(mapper=Model).execution_options(
+        compiled_cache=_compiled_cache
+    )
+
+
+def list_models(projects):
+    """Return the listing rows of the models visible with the projects."""
+    conn = connection()
+    statement = LIST_MODELS.for_projects(len(projects))
+    return conn.execute(
+        statement.on(conn), **LIST_MODELS.parameters(projects)
+    ).fetchall()
+
+
+def get_model(id, projects):
+    """Return the model if it is visible with the projects, or None."""
+    conn = connection()
+    statement = GET_MODEL.for_projects(len(projects))
+    return (
+        Model.query.from_statement(statement.on(conn))
+        .params(id=id, **GET_MODEL.parameters(projects))
+        .execution_options(compiled_cache=_compiled_cache)
+        .one_or_none()
+    )
+
+
+def benchmark(projects, id, iterations=1000, echo=print):
+    """
+    Compare the hot queries built through the ORM with their statements.
+
+    Every variant runs ``iterations`` times within one transaction, such that
+    the differences are due to building, compiling and loading.
+
+    :return: The mean duration in seconds of each variant by name
+    """
+    variants = {
+        "listing (ORM)": lambda: Model.query.options(
+            load_only(*(getattr(Model, key) for key in LISTING_COLUMNS))
+        )
+        .filter(Model.visible(projects))
+        .all(),
+        "listing (Core)": lambda: db.session.execute(
+            select([Model.__table__.c[key] for key in LISTING_COLUMNS]).where(
+                Model.visible(projects)
+            )
+        ).fetchall(),
+        "listing (statement)": lambda: list_models(projects),
+        "model (ORM)": lambda: Model.query.filter(Model.id == id)
+        .filter(Model.visible(projects))
+        .one_or_none(),
+        "model (statement)": lambda: get_model(id, projects),
+    }
+    results = {}
+    try:
+        for name, function in variants.items():
+            # Warm up the caches of SQLAlchemy and the connection.
+            function()
+            start = time.perf_counter()
+            for _ in range(iterations):
+                function()
+                db.session.expunge_all()
+            results[name] = (time.perf_counter() - start) / iterations
+            echo(f"{name}: {results[name] * 1000:.3f} ms")
+    finally:
+        db.session.rollback()
+    return results
@@ -0,0 +1,181 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Route safe reads to read replicas of the primary database.
+
+Replicas are configured as Flask-SQLAlchemy binds named ``replica_<n>``. Within
+a request using a safe method, the session is bound to one healthy replica;
+any other request, and any request from a client that has written within the
+last ``READ_YOUR_WRITES_WINDOW`` seconds, uses the primary. Such clients are
+recognized by a cookie set on their write or, for API clients that do not keep
+cookies, by sending the ``X-Read-Primary`` header with any non-empty value.
+"""
+
+import itertools
+import logging
+import time
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy import SignallingSession, SQLAlchemy
+from sqlalchemy import event, orm
+from sqlalchemy.exc import SQLAlchemyError
+
+from .metrics import QUERY_LATENCY
+
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = frozenset(["GET", "HEAD", "OPTIONS"])
+PRIMARY_COOKIE = "model_storage_read_primary"
+PRIMARY_HEADER = "X-Read-Primary"
+
+
+class RoutingSession(SignallingSession):
+    """Bind the session to a replica engine for safe reads."""
+
+    def get_bind(self, mapper=None, clause=None):
+        if not self._flushing:
+            replica = read_replica(self.app)
+            if replica is not None:
+                return self.db.get_engine(self.app, bind=replica)
+        return super().get_bind(mapper=mapper, clause=clause)
+
+    def get_primary_bind(self, mapper=None):
+        """Return the primary bind, even within a safe request."""
+        return super().get_bind(mapper=mapper)
+
+
+def read_replica(app):
+    """Return the bind key of the replica serving reads of this request."""
+    if not (has_request_context() and g.get("read_only")):
+        return None
+    if "replica" not in g:
+        g.replica = app.extensions["replicas"].choose()
+    return g.replica
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """Create sessions that route reads to replicas."""
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+class ReplicaRouter:
+    """
+    Choose healthy replicas in a round-robin fashion.
+
+    A replica's health is checked at most once per ``interval`` seconds; it is
+    considered unhealthy if it can not be reached or if its replication lag
+    exceeds ``max_lag`` seconds.
+    """
+
+    HEALTH_CHECK = (
+        "SELECT coalesce(extract(epoch FROM now() - "
+        "pg_last_xact_replay_timestamp()), 0)"
+    )
+
+    def __init__(self, db, app, keys, interval, max_lag):
+        self.db = db
+        self.app = app
+        self.keys = list(keys)
+        self.interval = interval
+        self.max_lag = max_lag
+        self._checked = {key: float("-inf") for key in self.keys}
+        self._healthy = {key: False for key in self.keys}
+        self._cycle = itertools.cycle(self.keys)
+
+    def choose(self):
+        """Return the bind key of a healthy replica or None for the primary."""
+        for _ in range(len(self.keys)):
+            key = next(self._cycle)
+            if self.is_healthy(key):
+                return key
+        return None
+
+    def is_healthy(self, key):
+        """Return the cached health of a replica, re-checking when stale."""
+        now = time.monotonic()
+        if now - self._checked[key] >= self.interval:
+            self._checked[key] = now
+            self._healthy[key] = self.check(key)
+        return self._healthy[key]
+
+    def check(self, key):
+        """Query a replica for its replication lag."""
+        engine = self.db.get_engine(self.app, bind=key)
+        try:
+            with engine.connect() as connection:
+                lag = connection.scalar(self.HEALTH_CHECK)
+        except SQLAlchemyError as error:
+            logger.warning(f"Read replica '{key}' is unavailable: {error}")
+            return False
+        if lag > self.max_lag:
+            logger.warning(f"Read replica '{key}' lags behind by {lag:.1f} s.")
+            return False
+        return True
+
+
+def init_app(app, db):
+    """Set up replica routing and per-engine latency measurements."""
+    keys = sorted(
+        key
+        for key in app.config["SQLALCHEMY_BINDS"]
+        if key.startswith("replica_")
+    )
+    app.extensions["replicas"] = ReplicaRouter(
+        db,
+        app,
+        keys,
+        app.config["REPLICA_HEALTH_CHECK_INTERVAL"],
+        app.config["REPLICA_MAX_LAG"],
+    )
+    for key in [None] + keys:
+        observe_latency(db.get_engine(app, bind=key), key or "primary")
+
+    @app.before_request
+    def route_reads():
+        g.read_only = (
+            request.method in SAFE_METHODS
+            and PRIMARY_COOKIE not in request.cookies
+            and not request.headers.get(PRIMARY_HEADER)
+        )
+
+    @app.after_request
+    def read_your_writes(response):
+        # After a successful write, keep the client on the primary until its
+        # changes have safely been replicated.
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            response.set_cookie(
+                PRIMARY_COOKIE,
+                "1",
+                max_age=current_app.config["READ_YOUR_WRITES_WINDOW"],
+                httponly=True,
+            )
+        return response
+
+
+def observe_latency(engine, name):
+    """Record the duration of every query issued through the engine."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def stop(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        QUERY_LATENCY.labels(name).observe(elapsed)
@@ -15,17 +15,62 @@
 
 """Implement RESTful API endpoints using resources."""
 
+import json
 import logging
+import uuid
 import warnings
 
-from flask import abort, g, make_response
+import ijson
+from flask import (
+    Response,
+    abort,
+    current_app,
+    g,
+    make_response,
+    request,
+    url_for,
+)
 from flask_apispec import FlaskApiSpec, MethodResource, marshal_with, use_kwargs
+from marshmallow import ValidationError, missing
+from sqlalchemy import literal_column, text, tuple_
 from sqlalchemy.orm import load_only
 from sqlalchemy.orm.exc import NoResultFound
+from webargs.flaskparser import abort as abort_with_messages
+from webargs.flaskparser import parser
 
+from . import (
+    blobs,
+    cdn,
+    compression,
+    elements,
+    events,
+    formats,
+    lineage,
+    queries,
+    replicas,
+    similarity,
+    uploads,
+)
 from .jwt import jwt_require_claim, jwt_required
-from .models import Model, db
+from .models import (
+    Model,
+    ModelArtifact,
+    ModelChange,
+    ModelContent,
+    ModelContentBand,
+    ModelJob,
+    ModelVersion,
+    db,
+)
+from .schemas import ChangesQuery as ChangesQuerySchema
 from .schemas import Model as ModelSchema
+from .schemas import ModelChanges as ModelChangesSchema
+from .schemas import ModelDiff as ModelDiffSchema
+from .schemas import ModelJob as ModelJobSchema
+from .schemas import ModelVersion as ModelVersionSchema
+from .schemas import SimilarModel as SimilarModelSchema
+from .schemas import SimilarQuery as SimilarQuerySchema
+from .schemas import Upload as UploadSchema
 
 
 logger = logging.getLogger(__name__)
@@ -43,80 +88,487 @@ def init_app(app):
     docs = FlaskApiSpec(app)
     register("/models", Models)
     register("/models/<int:id>", IndvModel)
+    register("/models/changes", ModelChanges)
+    register("/models/events", ModelEvents)
+    register("/models/jobs", ModelJobs)
+    register("/models/jobs/<id>", IndvModelJob)
+    register("/models/<int:id>/diff/<int:other_id>", ModelDiff)
+    register("/models/<int:id>/similar", SimilarModels)
+    register("/models/<int:id>/versions", ModelVersions)
+    register("/models/<int:id>/versions/<int:version>", IndvModelVersion)
+    register("/public/models/<int:id>", PublicModel)
+    register(
+        "/public/models/<int:id>/versions/<int:version>", PublicModelVersion
+    )
+    register("/uploads", Uploads)
+    register("/uploads/<string:id>", IndvUpload)
+    register("/uploads/<string:id>/parts/<int:number>", UploadPart)
+    register("/uploads/<string:id>/complete", UploadCompletion)
+
+
+@parser.location_handler("sbml")
+def parse_sbml(req, name, field):
+    """
+    Read a model posted as SBML.
+
+    The model is converted to its JSON serialization while its metadata is
+    given in the query string.
+    """
+    if req.mimetype not in formats.SBML_MIMETYPES:
+        return missing
+    if name != "model_serialized":
+        return parser.parse_querystring(req, name, field)
+    try:
+        return current_app.extensions["conversions"].run(
+            formats.sbml_to_document, req.get_data()
+        )
+    except Exception as error:
+        abort_with_messages(422, messages={"model_serialized": [str(error)]})
+
+
+def get_artifact(content, format, convert, in_pool=True):
+    """
+    Return a content converted to another format.
+
+    Conversions run once per content, by default in the conversion pool; the
+    result is stored for all later requests. Concurrent requests for the same
+    artifact share a single load or conversion.
+    """
+
+    def load():
+        data = ModelArtifact.load(content.hash, format)
+        if data is None:
+            logger.debug(f"Converting content {content.hash} to {format}.")
+            if in_pool:
+                data = current_app.extensions["conversions"].run(
+                    convert, content.materialize()
+                )
+            else:
+                data = convert(content.materialize())
+            ModelArtifact.store(content.hash, format, data)
+        return data
+
+    return current_app.extensions["flights"].do(
+        (format, content.hash), load, kind=format
+    )
+
+
+def get_visible_model(id, *options):
+    """
+    Return a model by ID if it is visible with the current JWT claims.
+
+    Without loader options, the model is loaded with a prepared statement;
+    see the `queries` module.
+    """
+    if not options:
+        model = queries.get_model(id, g.jwt_claims["prj"])
+        if model is None:
+            abort(404, f"Cannot find any model with ID {id}.")
+        return model
+    try:
+        return (
+            Model.query.options(*options)
+            .filter(Model.id == id)
+            .filter(Model.visible(g.jwt_claims["prj"]))
+            .one()
+        )
+    except NoResultFound:
+        abort(404, f"Cannot find any model with ID {id}.")
+
+
+def derive_content(parent, modifications, biomass_reaction):
+    """Return the content derived from a parent content, storing it if new."""
+    try:
+        values = lineage.derive(parent, modifications or {}, biomass_reaction)
+    except ValidationError as error:
+        abort_with_messages(422, messages={"modifications": error.messages})
+    return ModelContent.get_or_create(**values)
+
+
+def update_content(content, document, biomass_reaction):
+    """
+    Return the content of a new version of a model, storing it if new.
+
+    Only the elements that differ from the current content are validated.
+    """
+    try:
+        index = elements.validate_update(
+            content.element_index, document, biomass_reaction
+        )
+    except ValidationError as error:
+        abort_with_messages(422, messages={"model_serialized": error.messages})
+    return ModelContent.from_document(document, index)
+
+
+def get_elements(content, collection, element_ids):
+    """Load only the given elements from a serialized model."""
+    if content.parent_hash is not None or content.external or content.archived:
+        return {
+            element["id"]: element
+            for element in content.materialize()[collection]
+            if element["id"] in element_ids
+        }
+    rows = db.session.execute(
+        text(
+            "SELECT element FROM model_content, jsonb_array_elements("
+            "model_content.document -> :collection) AS element "
+            "WHERE model_content.hash = :hash "
+            "AND element ->> 'id' = ANY(:element_ids)"
+        ),
+        {
+            "hash": content.hash,
+            "collection": collection,
+            "element_ids": element_ids,
+        },
+    )
+    return {row.element["id"]: row.element for row in rows}
+
+
+# Request headers that responses with a model depend on.
+VARY = "Accept, Accept-Encoding, X-Cobra-Version, X-Optlang-Version"
+
+
+def envelope(model):
+    """Return the serialized metadata of a model around its document."""
+    metadata = json.dumps(
+        ModelSchema(exclude=("model_serialized",)).dump(model)
+    )
+    return f'{metadata[:-1]}, "model_serialized": '.encode("utf-8"), b"}"
+
+
+def render_model(model, headers):
+    """
+    Respond with a model as JSON.
+
+    The document is serialized once for all concurrent requests of the same
+    model content, while the metadata is serialized per request.
+    """
+    document = current_app.extensions["flights"].do(
+        ("json", model.id, model.content_hash),
+        lambda: json.dumps(model.content.materialize()).encode("utf-8"),
+        kind="json",
+    )
+    head, tail = envelope(model)
+    return Response(
+        [head, document, tail], mimetype="application/json", headers=headers
+    )
+
+
+def stream_model(model, headers, compressed=False):
+    """
+    Respond with a model without decoding its stored document.
+
+    Only the metadata envelope is serialized. Compressed responses pass the
+    pre-compressed document on as it is, between the compressed head and
+    tail of the envelope.
+    """
+    head, tail = envelope(model)
+    headers = dict(headers)
+    content = model.content
+    store = current_app.extensions["blobs"]
+    if not compressed:
+        body = blobs.stream_document(store, content.hash)
+    else:
+        head = compression.compress(head)
+        tail = compression.compress(tail)
+        headers["Content-Encoding"] = "gzip"
+        if content.external:
+            body = blobs.read_blob(store, content.hash)
+        else:
+            body = [
+                get_artifact(
+                    content,
+                    compression.FORMAT,
+                    compression.compress_document,
+                    in_pool=False,
+                )
+            ]
+
+    def generate():
+        yield head
+        yield from body
+        yield tail
+
+    return Response(generate(), mimetype="application/json", headers=headers)
+
+
+def respond_with_model(model):
+    """
+    Respond with a model in the representation requested by the client.
+
+    Responses for public models may be stored by shared caches since they do
+    not depend on the claims of the client.
+    """
+    headers = {"Vary": VARY}
+    best = request.accept_mimetypes.best_match(
+        [
+            "application/json",
+            formats.SBML_MIMETYPES[0],
+            formats.PICKLE_MIMETYPE,
+        ]
+    )
+    if best == formats.SBML_MIMETYPES[0]:
+        representation = "sbml"
+    elif best == formats.PICKLE_MIMETYPE:
+        headers.update(formats.PICKLE_VERSIONS)
+        if formats.is_pickle_compatible(request.headers):
+            representation = formats.pickle_format()
+        else:
+            representation = "json"
+    elif compression.accepts_gzip(request):
+        representation = compression.FORMAT
+    else:
+        representation = "json"
+    if model.project_id is None:
+        headers.update(
+            cdn.public_headers(
+                model, current_app.config["PUBLIC_MAX_AGE"], representation
+            )
+        )
+        if request.if_none_match.contains_weak(cdn.etag(model, representation)):
+            return make_response("", 304, headers)
+    if representation == "sbml":
+        return Response(
+            get_artifact(model.content, "sbml", formats.document_to_sbml),
+            mimetype=best,
+            headers=headers,
+        )
+    if representation == formats.pickle_format():
+        return Response(
+            get_artifact(
+                model.content, representation, formats.document_to_pickle
+            ),
+            mimetype=best,
+            headers=headers,
+        )
+    if representation == compression.FORMAT:
+        return stream_model(model, headers, compressed=True)
+    if model.content.external:
+        return stream_model(model, headers)
+    return render_model(model, headers)
+
+
+def create_model(payload):
+    """Add a new model to the session, verifying the claims of the client."""
+    if "project_id" in payload:
+        jwt_require_claim(payload["project_id"], "write")
+    modifications = payload.pop("modifications", None)
+    model = Model(**payload)
+    if "model_serialized" not in payload:
+        model.set_content(
+            derive_content(
+                get_visible_model(payload["parent_id"]).content,
+                modifications,
+                payload["default_biomass_reaction"],
+            )
+        )
+    db.session.add(model)
+    return model
+
+
+def immutable(project_id, etag):
+    """Return the headers of a response that never changes."""
+    scope = "public" if project_id is None else "private"
+    return {
+        "Cache-Control": f"{scope}, max-age=31536000, immutable",
+        "ETag": f'"{etag}"',
+    }
 
 
 class Models(MethodResource):
     """Serve all available models or create new entries."""
 
-    @marshal_with(ModelSchema(many=True, exclude=("model_serialized",)), 200)
+    @marshal_with(
+        ModelSchema(many=True, exclude=("model_serialized", "modifications")),
+        200,
+    )
+    @marshal_with(None, code=304)
     def get(self):
-        """List all available models."""
+        """
+        List all available models.
+
+        The listing carries an ``ETag`` such that polling clients can use
+        ``If-None-Match`` to only receive changed listings.
+        """
         logger.debug("Retrieving all models")
-        return (
-            Model.query.options(
-                load_only(
-                    Model.id,
-                    Model.name,
-                    Model.organism_id,
-                    Model.project_id,
-                    Model.preferred_map_id,
-                    Model.default_biomass_reaction,
-                    Model.ec_model,
-                )
+        projects = g.jwt_claims["prj"]
+
+        def render():
+            rows = queries.list_models(projects)
+            schema = ModelSchema(
+                many=True, exclude=("model_serialized", "modifications")
             )
-            .filter(
-                Model.project_id.in_(g.jwt_claims["prj"])
-                | Model.project_id.is_(None)
+            return json.dumps(schema.dump([dict(row) for row in rows])).encode(
+                "utf-8"
             )
-            .all()
+
+        listings = current_app.extensions["listings"]
+        if g.read_only:
+            listing = listings.get(
+                projects, render, replicas.read_replica(current_app)
+            )
+        else:
+            # Clients that just wrote read from the primary, which may be
+            # ahead of the notifications that invalidate cached listings.
+            listing = listings.render(render)
+        headers = {
+            "Cache-Control": "private, no-cache",
+            "ETag": f'"{listing.etag}"',
+        }
+        if request.if_none_match.contains(listing.etag):
+            return make_response("", 304, headers)
+        return Response(
+            listing.body, mimetype="application/json", headers=headers
         )
 
-    @use_kwargs(ModelSchema(exclude=("id",)))
+    @use_kwargs(ModelSchema(exclude=("id",)), locations=("json", "sbml"))
     @marshal_with(ModelSchema(only=("id",)), code=201)
     @jwt_required
     def post(self, **payload):
-        """Create a new model."""
+        """
+        Create a new model.
+
+        Models may be posted as SBML (``application/sbml+xml``) with their
+        metadata in the query string.
+        """
         logger.debug("Creating a new model in the model storage")
-        if "project_id" in payload:
-            jwt_require_claim(payload["project_id"], "write")
-        new_model = Model(**payload)
-        db.session.add(new_model)
+        new_model = create_model(payload)
         db.session.commit()
         return new_model, 201
 
 
+class ModelJobs(MethodResource):
+    """Create models asynchronously."""
+
+    @marshal_with(ModelJobSchema, code=202)
+    @jwt_required
+    def post(self):
+        """
+        Queue the creation of a model.
+
+        The body is the same JSON as for creating a model directly. It is
+        stored as it is and validated and inserted by a separate worker
+        process, such that large models do not hold up the request. Poll the
+        job at the URL given in the ``Location`` header for its result.
+        """
+        job = ModelJob(
+            id=uuid.uuid4().hex,
+            body=request.get_data(),
+            claims=g.jwt_claims["prj"],
+            submitter=g.jwt_claims.get("sub"),
+        )
+        db.session.add(job)
+        db.session.commit()
+        logger.debug(f"Queued model job {job.id}.")
+        return job, 202, {"Location": url_for("IndvModelJob", id=job.id)}
+
+
+class IndvModelJob(MethodResource):
+    """Poll an asynchronous creation of a model."""
+
+    @marshal_with(ModelJobSchema, code=200)
+    @marshal_with(None, code=404)
+    @jwt_required
+    def get(self, id):
+        """
+        Return the status of a job and, once finished, its result.
+
+        Jobs are only returned to the client that queued them.
+        """
+        job = ModelJob.query.get(id)
+        if job is None or not job.submitted_by(g.jwt_claims):
+            abort(404, f"Cannot find any job with ID {id}.")
+        return job
+
+
 class IndvModel(MethodResource):
     """Retrieve, update or delete a single model."""
 
     @marshal_with(ModelSchema, code=200)
+    @marshal_with(None, code=304)
     @marshal_with(None, code=404)
     def get(self, id):
-        """Return a model by ID."""
+        """
+        Return a model by ID.
+
+        Request ``application/sbml+xml`` in the Accept header to export the
+        model as SBML instead.
+
+        Request ``application/vnd.cobra.model+pickle`` to receive a pickled
+        cobra model, which loads much faster than the JSON serialization. The
+        consumer's cobrapy and optlang versions must be given in the
+        ``X-Cobra-Version`` and ``X-Optlang-Version`` headers; unless their
+        major and minor versions match those of the service, the model is
+        returned as JSON. The versions used are declared in the same headers
+        of the response.
+        """
         logger.debug(f"Fetching model by ID {id}.")
-        try:
-            return (
-                Model.query.filter(Model.id == id)
-                .filter(
-                    Model.project_id.in_(g.jwt_claims["prj"])
-                    | Model.project_id.is_(None)
-                )
-                .one()
-            )
-        except NoResultFound:
-            abort(404, f"Cannot find any model with ID {id}.")
+        model = get_visible_model(id)
+        current_app.extensions["accesses"].record(model)
+        return respond_with_model(model)
 
     @use_kwargs(ModelSchema(exclude=("id",), partial=True))
     @marshal_with(None, code=204)
     @marshal_with(None, code=404)
     @jwt_required
     def put(self, id, **payload):
-        """Update a model by ID."""
+        """
+        Update a model by ID.
+
+        Updates are validated against the index of the stored model, such that
+        only changed elements and a changed biomass reaction are checked.
+        """
         logger.debug(f"Updating model with ID {id}.")
         try:
             model = Model.query.filter(Model.id == id).one()
         except NoResultFound:
             abort(404, f"Cannot find any model with ID {id}.")
         jwt_require_claim(model.project_id, "write")
+        if "modifications" in payload:
+            # Derive a new version from the given parent model or, by default,
+            # from the current version of the model itself.
+            if "parent_id" in payload:
+                parent = get_visible_model(payload["parent_id"]).content
+            else:
+                parent = model.content
+            model.set_content(
+                derive_content(
+                    parent,
+                    payload.pop("modifications"),
+                    payload.get(
+                        "default_biomass_reaction",
+                        model.default_biomass_reaction,
+                    ),
+                )
+            )
+        elif "model_serialized" in payload:
+            model.set_content(
+                update_content(
+                    model.content,
+                    payload.pop("model_serialized"),
+                    payload.get(
+                        "default_biomass_reaction",
+                        model.default_biomass_reaction,
+                    ),
+                )
+            )
+            payload.setdefault("parent_id", None)
+        elif "default_biomass_reaction" in payload:
+            if not ModelContent.has_element(
+                model.content_hash,
+                "reactions",
+                payload["default_biomass_reaction"],
+            ):
+                abort_with_messages(
+                    422,
+                    messages={
+                        "default_biomass_reaction": [
+                            f"The biomass reaction "
+                            f"'{payload['default_biomass_reaction']}' does "
+                            f"not exist in the corresponding model."
+                        ]
+                    },
+                )
         for key, value in payload.items():
             setattr(model, key, value)
         db.session.commit()
@@ -136,3 +588,394 @@ class IndvModel(MethodResource):
         db.session.delete(model)
         db.session.commit()
         return make_response("", 204)
+
+
+def get_visible_changes(since):
+    """Query the changes after a cursor visible with the current JWT claims."""
+    return (
+        ModelChange.query.filter(ModelChange.id > since)
+        .filter(
+            ModelChange.project_id.in_(g.jwt_claims["prj"])
+            | ModelChange.project_id.is_(None)
+        )
+        .order_by(ModelChange.id)
+    )
+
+
+class ModelChanges(MethodResource):
+    """Follow the change log of models."""
+
+    @use_kwargs(ChangesQuerySchema, locations=("query",))
+    @marshal_with(ModelChangesSchema, code=200)
+    def get(self, since, limit):
+        """
+        Return the changes of visible models after the given cursor.
+
+        Changes are returned in commit order. A model moved to another project
+        appears as deleted to the previous project.
+        """
+        logger.debug(f"Listing model changes since {since}.")
+        changes = get_visible_changes(since).limit(limit + 1).all()
+        more = len(changes) > limit
+        changes = changes[:limit]
+        return {
+            "changes": changes,
+            "cursor": changes[-1].id if changes else since,
+            "more": more,
+        }
+
+
+class ModelEvents(MethodResource):
+    """Push changes of models to clients."""
+
+    def get(self):
+        """
+        Stream the changes of visible models as server-sent events.
+
+        Every event carries the cursor of the change as its ID, such that
+        reconnecting clients receive the changes they missed through the
+        ``Last-Event-ID`` header. If too many changes were missed, a single
+        ``reset`` event asks the client to catch up with `/models/changes`.
+        """
+        logger.debug("Streaming model changes.")
+        config = current_app.config
+        broadcaster = current_app.extensions["events"]
+        subscription = broadcaster.subscribe(set(g.jwt_claims["prj"]))
+        last_id = request.headers.get("Last-Event-ID", type=int)
+        backlog = []
+        if last_id is not None:
+            backlog = [
+                {
+                    "cursor": change.id,
+                    "model_id": change.model_id,
+                    "action": change.action,
+                }
+                for change in get_visible_changes(last_id).limit(
+                    config["EVENTS_REPLAY_LIMIT"] + 1
+                )
+            ]
+        # Do not hold on to a database connection while streaming.
+        db.session.close()
+        if len(backlog) > config["EVENTS_REPLAY_LIMIT"]:
+            broadcaster.unsubscribe(subscription)
+            body = f"event: reset\ndata: {json.dumps({'cursor': last_id})}\n\n"
+            return Response(body, mimetype="text/event-stream")
+        return Response(
+            events.stream(
+                broadcaster,
+                subscription,
+                backlog,
+                last_id,
+                config["EVENTS_KEEPALIVE"],
+            ),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+
+class ModelDiff(MethodResource):
+    """Compare two models."""
+
+    @marshal_with(ModelDiffSchema, code=200)
+    @marshal_with(None, code=404)
+    def get(self, id, other_id):
+        """Return the reactions, metabolites and genes that differ."""
+        logger.debug(f"Comparing model {id} with model {other_id}.")
+        options = load_only(Model.id, Model.project_id, Model.content_hash)
+        old = get_visible_model(id, options).content
+        new = get_visible_model(other_id, options).content
+        cache = current_app.extensions["caches"]["diff"]
+        key = (old.hash, new.hash)
+        result = cache.get(key)
+        if result is None:
+            result = self.compare(old, new)
+            cache.set(key, result)
+        return result
+
+    @staticmethod
+    def compare(old, new):
+        """
+        Compare two model contents by their element indices.
+
+        Only elements whose digests differ are loaded and compared in detail.
+        """
+        result = elements.compare(old.element_index, new.element_index)
+        for collection, comparison in result.items():
+            changed = comparison["changed"]
+            if not changed:
+                comparison["changed"] = {}
+                continue
+            before = get_elements(old, collection, changed)
+            after = get_elements(new, collection, changed)
+            comparison["changed"] = {
+                element_id: elements.changes(
+                    before[element_id], after[element_id]
+                )
+                for element_id in changed
+            }
+        return result
+
+
+class SimilarModels(MethodResource):
+    """Find models similar to a given model."""
+
+    @use_kwargs(SimilarQuerySchema, locations=("query",))
+    @marshal_with(SimilarModelSchema(many=True), code=200)
+    @marshal_with(None, code=404)
+    def get(self, id, threshold, limit):
+        """
+        List visible models by their estimated similarity to the given model.
+
+        Candidates are looked up in a locality-sensitive hashing index, such
+        that models below a similarity of about 0.5 may be missed.
+        """
+        model = get_visible_model(id, load_only(Model.id, Model.content_hash))
+        content = ModelContent.query.options(
+            load_only(ModelContent.hash, ModelContent.signature)
+        ).get(model.content_hash)
+        signature = content.signature or similarity.signature(
+            content.element_index
+        )
+        candidates = (
+            db.session.query(ModelContentBand.content_hash)
+            .filter(
+                tuple_(ModelContentBand.band, ModelContentBand.bucket).in_(
+                    list(enumerate(similarity.buckets(signature)))
+                )
+            )
+            .distinct()
+        )
+        rows = (
+            db.session.query(
+                Model.id, Model.name, Model.project_id, ModelContent.signature
+            )
+            .join(ModelContent, Model.content_hash == ModelContent.hash)
+            .filter(Model.content_hash.in_(candidates.subquery()))
+            .filter(Model.visible(g.jwt_claims["prj"]))
+            .filter(Model.id != id)
+        )
+        results = []
+        for model_id, name, project_id, other in rows:
+            score = similarity.estimate(signature, other)
+            if score >= threshold:
+                results.append(
+                    {
+                        "id": model_id,
+                        "name": name,
+                        "project_id": project_id,
+                        "similarity": score,
+                    }
+                )
+        results.sort(key=lambda result: (-result["similarity"], result["id"]))
+        return results[:limit]
+
+
+def get_upload(id):
+    """Return an upload by ID if the current JWT claims allow writing it."""
+    upload = uploads.Upload.find(current_app.config["UPLOAD_DIR"], id)
+    if upload is None:
+        abort(404, f"Cannot find any upload with ID {id}.")
+    jwt_require_claim(upload.metadata["project_id"], "write")
+    return upload
+
+
+class Uploads(MethodResource):
+    """Start chunked, resumable uploads of large models."""
+
+    @use_kwargs(UploadSchema)
+    @marshal_with(UploadSchema, code=201)
+    @jwt_required
+    def post(self, model, model_id=None):
+        """
+        Start an upload for a new model or a replacement of an existing model.
+
+        Upload the serialized model in parts and complete the upload to
+        create or update the model.
+        """
+        logger.debug("Starting a new upload.")
+        if model_id is None:
+            errors = ModelSchema(exclude=("id", "model_serialized")).validate(
+                model
+            )
+            if errors:
+                abort_with_messages(422, messages=errors)
+            project_id = model["project_id"]
+        else:
+            try:
+                project_id = (
+                    Model.query.options(load_only(Model.project_id))
+                    .filter(Model.id == model_id)
+                    .one()
+                    .project_id
+                )
+            except NoResultFound:
+                abort(404, f"Cannot find any model with ID {model_id}.")
+        jwt_require_claim(project_id, "write")
+        upload = uploads.Upload.create(
+            current_app.config["UPLOAD_DIR"],
+            {"model_id": model_id, "project_id": project_id, "model": model},
+        )
+        return {"id": upload.id, "model_id": model_id, "model": model}, 201
+
+
+class IndvUpload(MethodResource):
+    """Inspect or abort an upload."""
+
+    @marshal_with(UploadSchema, code=200)
+    @marshal_with(None, code=404)
+    @jwt_required
+    def get(self, id):
+        """Return the upload and its received parts to resume it."""
+        upload = get_upload(id)
+        return dict(upload.metadata, id=upload.id, parts=upload.parts())
+
+    @marshal_with(None, code=204)
+    @marshal_with(None, code=404)
+    @jwt_required
+    def delete(self, id):
+        """Abort an upload."""
+        get_upload(id).discard()
+        return make_response("", 204)
+
+
+class UploadPart(MethodResource):
+    """Receive a part of an upload."""
+
+    @marshal_with(None, code=204)
+    @marshal_with(None, code=404)
+    @jwt_required
+    def put(self, id, number):
+        """
+        Store the raw request body as the part with the given number.
+
+        Parts are concatenated in the order of their numbers. Re-sending a part
+        replaces it.
+        """
+        get_upload(id).write_part(number, request.stream)
+        return make_response("", 204)
+
+
+class UploadCompletion(MethodResource):
+    """Validate and store an upload."""
+
+    @marshal_with(ModelSchema(only=("id",)), code=201)
+    @marshal_with(None, code=204)
+    @marshal_with(None, code=404)
+    @jwt_required
+    def post(self, id):
+        """
+        Validate the uploaded model and create or update the model.
+
+        The model is parsed incrementally and streamed into the database, such
+        that it is never loaded into memory as a whole.
+        """
+        upload = get_upload(id)
+        state = upload.metadata
+        if state["model_id"] is None:
+            model = Model(**state["model"])
+        else:
+            try:
+                model = Model.query.filter(Model.id == state["model_id"]).one()
+            except NoResultFound:
+                abort(
+                    404, f"Cannot find any model with ID {state['model_id']}."
+                )
+            for key, value in state["model"].items():
+                setattr(model, key, value)
+            # A full model no longer derives from its parent.
+            model.parent_id = None
+        path = upload.assemble()
+        try:
+            index = uploads.validate(path, model.default_biomass_reaction)
+        except (ValidationError, ijson.JSONError) as error:
+            abort_with_messages(
+                422, messages={"model_serialized": [str(error)]}
+            )
+        hash = elements.content_hash(index)
+        store = current_app.extensions["blobs"]
+        if store is not None:
+            blobs.store_file(store, hash, path)
+            values = {"external": True}
+        else:
+            uploads.copy_document(db.session.connection().connection, path)
+            values = {
+                "document": literal_column("(SELECT document FROM upload)")
+            }
+        model.set_content(
+            ModelContent.get_or_create(
+                hash=hash, element_index=index, depth=0, **values
+            )
+        )
+        if state["model_id"] is None:
+            db.session.add(model)
+        db.session.commit()
+        upload.discard()
+        logger.debug(f"Stored upload {id} as model {model.id}.")
+        if state["model_id"] is not None:
+            return make_response("", 204)
+        return model, 201
+
+
+class ModelVersions(MethodResource):
+    """List the versions of a model."""
+
+    @marshal_with(ModelVersionSchema(many=True, exclude=("model_serialized",)))
+    @marshal_with(None, code=404)
+    def get(self, id):
+        """List all versions of a model, oldest first."""
+        logger.debug(f"Listing the versions of model {id}.")
+        model = get_visible_model(id, load_only(Model.id, Model.project_id))
+        return model.versions.all()
+
+
+class IndvModelVersion(MethodResource):
+    """Retrieve a single, immutable version of a model."""
+
+    @marshal_with(ModelVersionSchema, code=200)
+    @marshal_with(None, code=304)
+    @marshal_with(None, code=404)
+    def get(self, id, version):
+        """
+        Return a version of a model.
+
+        Versions never change, so responses may be cached indefinitely and are
+        identified by the content hash in their ETag.
+        """
+        logger.debug(f"Fetching version {version} of model {id}.")
+        model = get_visible_model(id, load_only(Model.id, Model.project_id))
+        model_version = model.versions.filter(
+            ModelVersion.version == version
+        ).one_or_none()
+        if model_version is None:
+            abort(404, f"Cannot find version {version} of model {id}.")
+        headers = immutable(model.project_id, model_version.content_hash)
+        if model_version.content_hash in request.if_none_match:
+            return make_response("", 304, headers)
+        return model_version, 200, headers
+
+
+class PublicModel(MethodResource):
+    """
+    Retrieve a public model independently of any JWT claims.
+
+    Tokens are not even decoded, such that these responses are cheap to
+    produce and can be shared by all clients of a CDN or reverse proxy.
+    """
+
+    jwt_exempt = True
+
+    @marshal_with(ModelSchema, code=200)
+    @marshal_with(None, code=304)
+    @marshal_with(None, code=404)
+    def get(self, id):
+        """Return a public model by ID; see `GET /models/<id>`."""
+        logger.debug(f"Fetching public model by ID {id}.")
+        model = get_visible_model(id)
+        current_app.extensions["accesses"].record(model)
+        return respond_with_model(model)
+
+
+class PublicModelVersion(IndvModelVersion):
+    """Retrieve an immutable version of a public model without any claims."""
+
+    jwt_exempt = True
@@ -14,7 +14,13 @@
 # limitations under the License.
 
 from cobra.io.dict import model_from_dict
-from marshmallow import Schema, ValidationError, fields, validates_schema
+from marshmallow import (
+    Schema,
+    ValidationError,
+    fields,
+    validate,
+    validates_schema,
+)
 
 
 class Model(Schema):
@@ -23,16 +29,47 @@ class Model(Schema):
     organism_id = fields.Integer(required=True)
     project_id = fields.Integer(required=True)
     model_serialized = fields.Raw(
-        description="A metabolic model serialized to JSON by cobrapy",
-        required=True,
+        description="A metabolic model serialized to JSON by cobrapy"
+    )
+    parent_id = fields.Integer(
+        allow_none=True,
+        description="The model that this model is derived from",
+    )
+    modifications = fields.Dict(
+        allow_none=True,
+        description="The reactions, metabolites, genes and attributes of the "
+        "parent model to add or replace by ID, or null to remove them. "
+        "Required together with `parent_id` instead of `model_serialized`.",
     )
     default_biomass_reaction = fields.String(required=True)
     preferred_map_id = fields.Integer(allow_none=True)
     ec_model = fields.Boolean(required=True)
 
+    @validates_schema
+    def validate_content(self, data, partial, many):
+        derived = "parent_id" in data or "modifications" in data
+        if "model_serialized" in data and derived:
+            raise ValidationError(
+                "Provide either a serialized model or the modifications of a "
+                "parent model, not both."
+            )
+        if "parent_id" in data and "modifications" not in data:
+            raise ValidationError(
+                "The modifications of the parent model are required."
+            )
+        if partial or "model_serialized" not in self.fields:
+            return
+        if "model_serialized" not in data and "parent_id" not in data:
+            raise ValidationError(
+                "Provide either a serialized model or a parent model and its "
+                "modifications."
+            )
+
     @validates_schema
     def validate_biomass(self, data, partial, many):
-        if "model_serialized" in data:
+        # Partial updates are validated against the index of the stored model
+        # instead; see `resources.IndvModel.put`.
+        if "model_serialized" in data and not partial:
             # Validate that the model can be loaded by cobrapy
             try:
                 model = model_from_dict(data["model_serialized"])
@@ -50,3 +87,112 @@ class Model(Schema):
 
     class Meta:
         strict = True
+
+
+class ElementChanges(Schema):
+    added = fields.List(fields.String())
+    removed = fields.List(fields.String())
+    changed = fields.Dict(
+        keys=fields.String(),
+        values=fields.Dict(),
+        description="Changed fields of each element as [old, new] values",
+    )
+
+
+class ModelDiff(Schema):
+    reactions = fields.Nested(ElementChanges)
+    metabolites = fields.Nested(ElementChanges)
+    genes = fields.Nested(ElementChanges)
+
+
+class ModelVersion(Schema):
+    version = fields.Integer()
+    content_hash = fields.String(
+        description="Identifies the serialized model; also used as its ETag"
+    )
+    created = fields.DateTime()
+    model_serialized = fields.Raw(
+        description="A metabolic model serialized to JSON by cobrapy"
+    )
+
+
+class ModelChange(Schema):
+    cursor = fields.Integer(attribute="id")
+    model_id = fields.Integer()
+    action = fields.String(
+        description="One of 'created', 'updated' or 'deleted'; treat updates "
+        "of unknown models as creations"
+    )
+    created = fields.DateTime()
+
+
+class ModelChanges(Schema):
+    changes = fields.Nested(ModelChange, many=True)
+    cursor = fields.Integer(
+        description="Pass as `since` to continue after the last change"
+    )
+    more = fields.Boolean(description="Whether more changes are available")
+
+
+class ChangesQuery(Schema):
+    since = fields.Integer(
+        missing=0,
+        validate=validate.Range(min=0),
+        description="The cursor of the last change seen",
+    )
+    limit = fields.Integer(missing=1000, validate=validate.Range(1, 10000))
+
+
+class SimilarModel(Schema):
+    id = fields.Integer(required=True)
+    name = fields.String(required=True)
+    project_id = fields.Integer(allow_none=True)
+    similarity = fields.Float(
+        required=True,
+        description="The estimated Jaccard similarity of the reaction, "
+        "metabolite and gene IDs",
+    )
+
+
+class SimilarQuery(Schema):
+    threshold = fields.Float(missing=0.5, validate=validate.Range(0, 1))
+    limit = fields.Integer(missing=20, validate=validate.Range(1, 100))
+
+
+class ModelJob(Schema):
+    id = fields.String(dump_only=True)
+    status = fields.String(
+        dump_only=True,
+        description="One of queued, running, succeeded or failed",
+    )
+    model_id = fields.Integer(
+        dump_only=True, description="The created model once succeeded"
+    )
+    errors = fields.Raw(
+        dump_only=True,
+        description="The reasons of a failure as in synchronous responses",
+    )
+    created = fields.DateTime(dump_only=True)
+    finished = fields.DateTime(dump_only=True)
+
+
+class Upload(Schema):
+    id = fields.String(dump_only=True)
+    model_id = fields.Integer(
+        allow_none=True,
+        description="Replace the model with this ID instead of creating one",
+    )
+    model = fields.Nested(
+        Model(
+            exclude=("id", "model_serialized", "parent_id", "modifications"),
+            partial=True,
+        ),
+        missing=dict,
+        description="The model metadata; required unless `model_id` is given",
+    )
+    parts = fields.Dict(
+        keys=fields.Integer(),
+        values=fields.Integer(),
+        dump_only=True,
+        description="The sizes in bytes of the received parts by part number",
+    )
@@ -16,6 +16,7 @@
 """Provide settings for different deployment scenarios."""
 
 import os
+import tempfile
 
 import requests
 import werkzeug.exceptions
@@ -91,6 +92,98 @@ class Default:
             "{POSTGRES_PORT}/{POSTGRES_DB_NAME}".format(**os.environ)
         )
         self.SQLALCHEMY_TRACK_MODIFICATIONS = False
+        # Optional read replicas which share the credentials of the primary.
+        self.SQLALCHEMY_BINDS = {
+            f"replica_{index}": (
+                "postgresql://{POSTGRES_USERNAME}:{POSTGRES_PASS}@{host}:"
+                "{POSTGRES_PORT}/{POSTGRES_DB_NAME}".format(
+                    host=host, **os.environ
+                )
+            )
+            for index, host in enumerate(
+                filter(
+                    None,
+                    os.environ.get("POSTGRES_REPLICA_HOSTS", "").split(","),
+                )
+            )
+        }
+        self.REPLICA_HEALTH_CHECK_INTERVAL = 10
+        self.REPLICA_MAX_LAG = 30
+        self.READ_YOUR_WRITES_WINDOW = 30
+        self.DIFF_CACHE_SIZE = 256
+        # Rendered model listings per set of visible projects.
+        self.LISTING_CACHE_SIZE = 64
+        self.LISTING_CACHE_MAX_AGE = 60
+        # Materialized models by content hash.
+        self.DOCUMENT_CACHE_SIZE = int(
+            os.environ.get("DOCUMENT_CACHE_SIZE", 16)
+        )
+        # Models loaded into the cache of every worker before it accepts
+        # requests; by default the public models. Warm-up must finish well
+        # within the gunicorn worker timeout.
+        self.WARMUP_MODEL_IDS = [
+            int(id)
+            for id in os.environ.get("WARMUP_MODEL_IDS", "").split(",")
+            if id
+        ]
+        self.WARMUP_TIME_BUDGET = float(
+            os.environ.get("WARMUP_TIME_BUDGET", 10)
+        )
+        self.LINEAGE_MAX_DEPTH = 8
+        self.LINEAGE_COMPACTION_RATIO = 0.5
+        # Where to keep serialized models instead of the database; see the
+        # `blobs` module.
+        self.BLOB_STORAGE_URL = os.environ.get("BLOB_STORAGE_URL", "")
+        # Archiving of models that have not been read for `ARCHIVE_AFTER`
+        # seconds; see the `tiers` module.
+        self.ARCHIVE_STORAGE_URL = os.environ.get("ARCHIVE_STORAGE_URL", "")
+        self.ARCHIVE_AFTER = int(
+            os.environ.get("ARCHIVE_AFTER", 90 * 24 * 60 * 60)
+        )
+        self.ACCESS_FLUSH_INTERVAL = 60
+        # Upper bound of gzip encoded request bodies once decoded.
+        self.MAX_DECOMPRESSED_LENGTH = int(
+            os.environ.get("MAX_DECOMPRESSED_LENGTH", 256 * 1024 * 1024)
+        )
+        self.UPLOAD_DIR = os.environ.get(
+            "UPLOAD_DIR",
+            os.path.join(tempfile.gettempdir(), "model-storage-uploads"),
+        )
+        # Processes per worker for converting models with cobrapy; 0 converts
+        # within the request.
+        self.CONVERSION_PROCESSES = int(
+            os.environ.get("CONVERSION_PROCESSES", 1)
+        )
+        # Asynchronous creation of models; see the `jobs` module.
+        self.JOB_POLL_INTERVAL = 1
+        self.JOB_TIMEOUT = 600
+        self.JOB_MAX_ATTEMPTS = 3
+        self.JOB_RETENTION = 7 * 24 * 60 * 60
+        # Concurrent requests per worker and request class, and the number of
+        # requests that may wait for up to `ADMISSION_TIMEOUT` seconds; see
+        # the `admission` module.
+        self.ADMISSION_LIMITS = {
+            "listing": {"concurrency": 50, "queue": 100},
+            "read": {"concurrency": 10, "queue": 20},
+            "write": {"concurrency": 4, "queue": 8},
+        }
+        self.ADMISSION_TIMEOUT = 5
+        self.ADMISSION_RETRY_AFTER = 2
+        # Shared caching of public models; see the `cdn` module.
+        self.PUBLIC_MAX_AGE = int(os.environ.get("PUBLIC_MAX_AGE", 300))
+        self.CACHE_PURGE_URL = os.environ.get("CACHE_PURGE_URL", "")
+        # Server-sent events of model changes.
+        self.EVENTS_KEEPALIVE = 15
+        self.EVENTS_QUEUE_SIZE = 64
+        self.EVENTS_REPLAY_LIMIT = 1000
+        # Prepare the queries of every request once per connection; disable
+        # behind a connection pooler in transaction mode.
+        self.PREPARED_STATEMENTS = (
+            os.environ.get("PREPARED_STATEMENTS", "true").lower() == "true"
+        )
+        # Connection pool and response streaming of the ASGI entry point.
+        self.ASGI_DB_POOL_SIZE = int(os.environ.get("ASGI_DB_POOL_SIZE", 20))
+        self.ASGI_STREAM_CHUNK_SIZE = 64 * 1024
         self.JWT_PUBLIC_KEY = requests.get(
             f"{os.environ['IAM_API']}/keys"
         ).json()["keys"][0]
@@ -109,6 +202,11 @@ class Testing(Default):
         """Initialize the testing environment configuration."""
         super().__init__()
         self.TESTING = True
+        self.CONVERSION_PROCESSES = 0
+        # Test transactions are rolled back without notifying other workers.
+        self.LISTING_CACHE_SIZE = 0
+        # Reads are written outside of the test transactions, so never do.
+        self.ACCESS_FLUSH_INTERVAL = float("inf")
         self.SQLALCHEMY_DATABASE_URI = (
             "postgresql://{POSTGRES_USERNAME}:{POSTGRES_PASS}@{POSTGRES_HOST}:"
             "{POSTGRES_PORT}/{POSTGRES_DB_NAME}_test".format(**os.environ)
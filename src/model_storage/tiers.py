@@ -0,0 +1,228 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Move the documents of rarely read models to an archive and back.
+
+Reads of models are recorded in memory and written to ``model.accessed`` in
+batches, at most once per ``ACCESS_FLUSH_INTERVAL`` seconds per worker.
+`archive_contents` moves the full documents of contents that no model has
+needed for ``ARCHIVE_AFTER`` seconds, neither directly nor as an ancestor of
+its modifications, from the database to the archive configured by
+``ARCHIVE_STORAGE_URL``, compressed with xz. The archive is a blob store; see
+the `blobs` module. An archived model is served from the archive and restored
+to the database with the next batch, along with any archived ancestors.
+"""
+
+import atexit
+import json
+import logging
+import lzma
+import tempfile
+import threading
+import time
+from contextlib import closing
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from . import blobs
+from .metrics import TIER_MOVES, TIER_READS
+
+
+logger = logging.getLogger(__name__)
+
+SUFFIX = ".json.xz"
+
+TOUCH = text(
+    "UPDATE model SET accessed = greatest(model.accessed, access.accessed) "
+    "FROM unnest(CAST(:ids AS integer[]), CAST(:times AS timestamp[])) "
+    "AS access (id, accessed) WHERE model.id = access.id"
+)
+REHYDRATE = text(
+    "UPDATE model_content SET document = CAST(:document AS jsonb), "
+    "archived = false WHERE hash = :hash AND archived"
+)
+
+
+def archive_text(store, key, text):
+    """Compress and store the JSON text of a model unless stored already."""
+    if store.exists(key):
+        return
+    with tempfile.SpooledTemporaryFile(max_size=8 * blobs.CHUNK_SIZE) as buffer:
+        with lzma.LZMAFile(buffer, mode="wb", preset=9) as compressed:
+            compressed.write(text.encode("utf-8"))
+        buffer.seek(0)
+        store.put(key, buffer)
+
+
+def read_text(store, key):
+    """Return the JSON text of an archived model."""
+    with closing(store.open(key)) as file_:
+        return lzma.decompress(file_.read()).decode("utf-8")
+
+
+def load_document(store, key):
+    """Return an archived serialized model."""
+    return json.loads(read_text(store, key))
+
+
+def tier(content):
+    """Return the name of the storage tier holding a content."""
+    if content.archived:
+        return "archive"
+    if content.external:
+        return "blob"
+    return "database"
+
+
+class AccessTracker:
+    """
+    Collect the reads of models and the contents to restore from the archive.
+
+    Both are written to the primary database in one transaction per flush,
+    outside of any request transaction. A failed flush is only logged since
+    the access times are merely a hint for archiving.
+    """
+
+    def __init__(self, db, app, interval):
+        self.db = db
+        self.app = app
+        self.interval = interval
+        self._accessed = {}
+        self._restore = set()
+        self._lock = threading.Lock()
+        self._flushed = time.monotonic()
+
+    def record(self, model):
+        """Record a read of the model, restoring its contents if archived."""
+        content = model.content
+        self.record_read(model.id, tier(content))
+        # Modifications are applied to their ancestors, which are restored as
+        # well.
+        while content is not None:
+            if content.archived:
+                with self._lock:
+                    self._restore.add(content.hash)
+            content = content.parent
+
+    def record_read(self, model_id, tier):
+        """Record a read of a model served from the given storage tier."""
+        TIER_READS.labels(tier).inc()
+        with self._lock:
+            self._accessed[model_id] = datetime.utcnow()
+
+    def flush(self, force=False):
+        """Write the recorded reads unless the last flush is too recent."""
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._flushed < self.interval:
+                return
+            self._flushed = now
+            accessed, self._accessed = self._accessed, {}
+            restore, self._restore = self._restore, set()
+        if not accessed and not restore:
+            return
+        store = self.app.extensions["archive"]
+        try:
+            with self.db.get_engine(self.app).begin() as connection:
+                if accessed:
+                    connection.execute(
+                        TOUCH,
+                        ids=list(accessed),
+                        times=list(accessed.values()),
+                    )
+                for hash in restore:
+                    connection.execute(
+                        REHYDRATE, hash=hash, document=read_text(store, hash)
+                    )
+        except (SQLAlchemyError, OSError) as error:
+            logger.warning(f"Failed to record {len(accessed)} reads: {error}")
+            return
+        TIER_MOVES.labels("rehydrate").inc(len(restore))
+
+
+def archive_contents(db, store, max_idle, batch_size=100, echo=print):
+    """
+    Move the documents of contents not read recently to the archive.
+
+    A content is moved once it is older than ``max_idle`` seconds and none of
+    the models it is the current version or an ancestor of has been read
+    within that time.
+    Its converted artifacts are removed as well and recreated on demand. Each
+    batch is committed on its own, such that the move can be interrupted and
+    resumed at any time.
+
+    :return: The number of archived documents
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=max_idle)
+    archived = 0
+    while True:
+        rows = db.session.execute(
+            text(
+                "WITH RECURSIVE needed (hash) AS ("
+                "SELECT content_hash FROM model "
+                "WHERE coalesce(accessed, created) >= :cutoff "
+                "UNION SELECT derived.parent_hash FROM model_content derived "
+                "JOIN needed ON derived.hash = needed.hash "
+                "WHERE derived.parent_hash IS NOT NULL"
+                ") "
+                "SELECT hash, document::text AS document FROM model_content "
+                "WHERE document IS NOT NULL AND NOT archived "
+                "AND created < :cutoff AND NOT EXISTS ("
+                "SELECT 1 FROM needed WHERE needed.hash = model_content.hash"
+                ") LIMIT :limit"
+            ),
+            {"cutoff": cutoff, "limit": batch_size},
+        ).fetchall()
+        if not rows:
+            break
+        for row in rows:
+            archive_text(store, row.hash, row.document)
+        hashes = [row.hash for row in rows]
+        db.session.execute(
+            text(
+                "UPDATE model_content SET document = NULL, archived = true "
+                "WHERE hash = ANY(:hashes)"
+            ),
+            {"hashes": hashes},
+        )
+        db.session.execute(
+            text(
+                "DELETE FROM model_artifact WHERE content_hash = ANY(:hashes)"
+            ),
+            {"hashes": hashes},
+        )
+        db.session.commit()
+        archived += len(rows)
+        TIER_MOVES.labels("archive").inc(len(rows))
+        echo(f"Archived {archived} documents.")
+    return archived
+
+
+def init_app(app, db):
+    """Create the configured archive and record the reads of models."""
+    app.extensions["archive"] = blobs.create_store(
+        app.config["ARCHIVE_STORAGE_URL"], suffix=SUFFIX, encoding=None
+    )
+    tracker = AccessTracker(db, app, app.config["ACCESS_FLUSH_INTERVAL"])
+    app.extensions["accesses"] = tracker
+    atexit.register(tracker.flush, force=True)
+
+    @app.teardown_request
+    def flush_accesses(exception):
+        current_app.extensions["accesses"].flush()
@@ -0,0 +1,244 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Stage, validate and store large models without loading them into memory.
+
+An upload is a directory holding its metadata and the parts received so far.
+On completion, the parts are concatenated into a single file which is
+validated with an incremental JSON parser and then streamed into Postgres.
+"""
+
+import json
+import os
+import re
+import shutil
+import uuid
+
+import ijson
+from marshmallow import ValidationError
+
+from . import elements
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+class Upload:
+    """Manage the staging directory of a single upload."""
+
+    def __init__(self, root, id):
+        self.id = id
+        self.path = os.path.join(root, id)
+
+    @classmethod
+    def create(cls, root, metadata):
+        """Start a new upload with the given model metadata."""
+        upload = cls(root, uuid.uuid4().hex)
+        os.makedirs(upload.path)
+        with open(upload.metadata_path, "w") as file_:
+            json.dump(metadata, file_)
+        return upload
+
+    @classmethod
+    def find(cls, root, id):
+        """Return an existing upload or None."""
+        if not re.fullmatch(r"[0-9a-f]{32}", id):
+            return None
+        upload = cls(root, id)
+        if not os.path.isfile(upload.metadata_path):
+            return None
+        return upload
+
+    @property
+    def metadata_path(self):
+        return os.path.join(self.path, "upload.json")
+
+    @property
+    def document_path(self):
+        return os.path.join(self.path, "model.json")
+
+    @property
+    def metadata(self):
+        with open(self.metadata_path) as file_:
+            return json.load(file_)
+
+    def part_path(self, number):
+        return os.path.join(self.path, f"part-{number:05d}")
+
+    def parts(self):
+        """Return the sizes of all received parts by part number."""
+        return {
+            int(name[len("part-") :]): os.path.getsize(
+                os.path.join(self.path, name)
+            )
+            for name in os.listdir(self.path)
+            if name.startswith("part-")
+        }
+
+    def write_part(self, number, stream):
+        """
+        Store a part, replacing any previous attempt at the same part.
+
+        The part is written to a temporary file first, such that an interrupted
+        transfer never leaves a truncated part behind.
+        """
+        partial = f"{self.part_path(number)}.partial"
+        with open(partial, "wb") as file_:
+            shutil.copyfileobj(stream, file_, CHUNK_SIZE)
+        os.replace(partial, self.part_path(number))
+
+    def assemble(self):
+        """Concatenate all parts in order into a single document."""
+        with open(self.document_path, "wb") as document:
+            for number in sorted(self.parts()):
+                with open(self.part_path(number), "rb") as part:
+                    shutil.copyfileobj(part, document, CHUNK_SIZE)
+        return self.document_path
+
+    def discard(self):
+        """Remove the upload and all its parts."""
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def scan(file_):
+    """
+    Parse a serialized model incrementally.
+
+    Yield ``(collection, id, element)`` for every reaction, metabolite and
+    gene, and ``("attributes", key, value)`` for any other top-level entry.
+    Only a single element is held in memory at a time.
+    """
+    events = ijson.parse(file_, use_float=True)
+    try:
+        _, event, _ = next(events)
+    except StopIteration:
+        raise ValidationError("The model is empty.")
+    if event != "start_map":
+        raise ValidationError("The model must be a JSON object.")
+    builder = None
+    depth = 0
+    for prefix, event, value in events:
+        if builder is None:
+            collection, _, rest = prefix.partition(".")
+            if collection in elements.COLLECTIONS:
+                if not rest:
+                    if event not in ("start_array", "end_array"):
+                        raise ValidationError(
+                            f"The {collection} must be a JSON array."
+                        )
+                    continue
+                if event != "start_map":
+                    raise ValidationError(
+                        f"The {collection} must be JSON objects."
+                    )
+            elif event in ("map_key", "end_map"):
+                continue
+            elif event not in ("start_map", "start_array"):
+                yield "attributes", prefix, value
+                continue
+            builder = ijson.ObjectBuilder()
+            key = prefix
+        builder.event(event, value)
+        if event in ("start_map", "start_array"):
+            depth += 1
+        elif event in ("end_map", "end_array"):
+            depth -= 1
+        if depth == 0:
+            if collection in elements.COLLECTIONS:
+                try:
+                    key = builder.value["id"]
+                except KeyError:
+                    raise ValidationError(f"All {collection} require an 'id'.")
+            else:
+                collection = "attributes"
+            yield collection, key, builder.value
+            builder = None
+
+
+def validate(path, biomass_reaction):
+    """
+    Validate a staged model and return its element index.
+
+    Checks that reactions only refer to defined metabolites and genes, that
+    their bounds are consistent and that the biomass reaction exists. Unlike
+    loading the model with cobrapy, the model is never held in memory.
+    """
+    index = {collection: {} for collection in elements.COLLECTIONS}
+    index["attributes"] = {}
+    references = []
+    with open(path, "rb") as file_:
+        for collection, key, value in scan(file_):
+            if key in index[collection]:
+                raise ValidationError(f"Duplicate {collection} entry '{key}'.")
+            index[collection][key] = elements.digest(value)
+            if collection == "reactions":
+                elements.check_bounds(value)
+                # Metabolites and genes may be defined after the reactions, so
+                # only keep the references to verify them in the end.
+                references.append((key, *elements.references(value)))
+    for reaction, metabolites, genes in references:
+        elements.check_references(reaction, metabolites, genes, index)
+    if biomass_reaction not in index["reactions"]:
+        raise ValidationError(
+            f"The biomass reaction '{biomass_reaction}' does not exist in the "
+            f"corresponding model."
+        )
+    return index
+
+
+class CSVField:
+    """
+    Present the content of a file as a single quoted CSV field.
+
+    Allows streaming a JSON document into Postgres with ``COPY ... CSV``.
+    """
+
+    def __init__(self, file_):
+        self.file = file_
+        self.head = '"'
+        self.done = False
+
+    def read(self, size=CHUNK_SIZE):
+        if self.done:
+            return ""
+        chunk = self.file.read(size)
+        if chunk:
+            chunk = self.head + chunk.replace('"', '""')
+            self.head = ""
+            return chunk
+        self.done = True
+        return f'{self.head}"\n'
+
+
+def copy_document(connection, path):
+    """
+    Stream a staged model into the temporary table ``upload``.
+
+    The table only lives until the end of the current transaction.
+
+    :param connection: A DBAPI (psycopg2) connection
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE TEMPORARY TABLE upload (document jsonb NOT NULL) "
+            "ON COMMIT DROP"
+        )
+        with open(path, encoding="utf-8") as file_:
+            cursor.copy_expert(
+                "COPY upload (document) FROM STDIN WITH (FORMAT csv)",
+                CSVField(file_),
+                CHUNK_SIZE,
+            )
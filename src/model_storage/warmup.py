@@ -0,0 +1,80 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Load frequently requested models into the cache of a fresh worker."""
+
+import logging
+import time
+
+from sqlalchemy.orm import load_only
+
+from .models import Model
+
+
+logger = logging.getLogger(__name__)
+
+
+def hot_model_ids(app):
+    """Return the configured models or, by default, the public models."""
+    if app.config["WARMUP_MODEL_IDS"]:
+        return app.config["WARMUP_MODEL_IDS"]
+    return [
+        id
+        for id, in Model.query.with_entities(Model.id)
+        .filter(Model.project_id.is_(None))
+        .order_by(Model.id)
+        .limit(app.config["DOCUMENT_CACHE_SIZE"])
+    ]
+
+
+def warm_up(app, db):
+    """
+    Materialize hot models into the document cache within the time budget.
+
+    Queries are cancelled by the database once the budget is used up, such
+    that a slow database can not delay the worker indefinitely.
+    """
+    budget = app.config["WARMUP_TIME_BUDGET"]
+    start = time.monotonic()
+    loaded = 0
+    with app.app_context():
+        try:
+            ids = hot_model_ids(app)
+            for id in ids:
+                remaining = budget - (time.monotonic() - start)
+                if remaining <= 0:
+                    logger.warning(
+                        f"Warm-up exceeded its budget of {budget} s after "
+                        f"{loaded} of {len(ids)} models."
+                    )
+                    break
+                db.session.execute(
+                    f"SET LOCAL statement_timeout = {int(remaining * 1000)}"
+                )
+                model = Model.query.options(
+                    load_only(Model.id, Model.content_hash)
+                ).get(id)
+                if model is not None:
+                    model.content.materialize()
+                    loaded += 1
+                db.session.rollback()
+        except Exception as error:
+            # The worker can serve requests with a cold cache.
+            logger.error(f"Warm-up failed: {error}")
+        finally:
+            db.session.remove()
+    logger.info(
+        f"Warmed up {loaded} models in {time.monotonic() - start:.2f} s."
+    )
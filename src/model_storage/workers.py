@@ -0,0 +1,157 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Size and recycle the gunicorn workers by their memory use.
+
+Serving and validating large models fragments the heap of a worker, so its
+resident memory grows over time. The number of workers is derived from the
+CPU and memory limits of the container (cgroup v1 or v2), and every worker
+samples its resident set size. A worker exceeding ``WORKER_MAX_RSS``, or that
+has served ``MAX_REQUESTS`` requests, stops accepting requests, finishes the
+ones in flight and is replaced by the arbiter. Both thresholds are jittered
+per worker so that workers started together are not all recycled at once.
+Every exit of a worker is logged to the gunicorn error log and counted with its
+reason.
+"""
+
+import math
+import os
+import random
+
+from .metrics import WORKER_RECYCLES, WORKER_RSS
+
+
+CGROUP = "/sys/fs/cgroup"
+# cgroup v1 reports a limit close to the maximum 64 bit integer if unlimited.
+UNLIMITED = 2**60
+
+
+def read_first(*paths):
+    """Return the stripped content of the first existing file or None."""
+    for path in paths:
+        try:
+            with open(path) as file_:
+                return file_.read().strip()
+        except OSError:
+            continue
+    return None
+
+
+def cpu_limit(root=CGROUP):
+    """Return the number of CPUs available to the container."""
+    quota = read_first(os.path.join(root, "cpu.max"))
+    if quota is not None:
+        quota, _, period = quota.partition(" ")
+    else:
+        quota = read_first(os.path.join(root, "cpu", "cpu.cfs_quota_us"))
+        period = read_first(os.path.join(root, "cpu", "cpu.cfs_period_us"))
+    if quota not in (None, "max", "-1") and period:
+        return int(quota) / int(period)
+    return float(os.cpu_count() or 1)
+
+
+def memory_limit(root=CGROUP):
+    """Return the memory limit of the container in bytes or None."""
+    limit = read_first(
+        os.path.join(root, "memory.max"),
+        os.path.join(root, "memory", "memory.limit_in_bytes"),
+    )
+    if limit is None or limit == "max" or int(limit) >= UNLIMITED:
+        return None
+    return int(limit)
+
+
+def worker_count(cpus, memory, workers_per_cpu, worker_memory):
+    """
+    Return the number of workers that the CPU and memory limits allow.
+
+    :param cpus: The number of available CPUs
+    :param memory: The memory limit in bytes or None
+    :param workers_per_cpu: The number of workers per CPU
+    :param worker_memory: The memory that each worker may use in bytes
+    """
+    count = math.ceil(cpus * workers_per_cpu)
+    if memory is not None:
+        count = min(count, memory // worker_memory)
+    return max(1, count)
+
+
+def rss():
+    """Return the resident set size of the current process in bytes."""
+    with open("/proc/self/statm") as file_:
+        pages = int(file_.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def jittered(value, jitter):
+    """Return the value reduced by a random fraction of up to ``jitter``."""
+    return int(value * (1 - random.uniform(0, jitter)))
+
+
+class Watchdog:
+    """
+    Recycle a gunicorn worker once its memory exceeds a threshold.
+
+    :param worker: The gunicorn worker
+    :param max_rss: The threshold in bytes
+    :param interval: Seconds between samples
+    :param sample: A function returning the current memory use in bytes
+    """
+
+    def __init__(self, worker, max_rss, interval, sample=rss):
+        self.worker = worker
+        self.max_rss = max_rss
+        self.interval = interval
+        self.sample = sample
+
+    def check(self):
+        """Sample the memory use and stop the worker if it is exceeded."""
+        current = self.sample()
+        WORKER_RSS.set(current)
+        if current <= self.max_rss or not self.worker.alive:
+            return False
+        self.worker.recycle_reason = "memory"
+        self.worker.log.warning(
+            f"Worker {self.worker.pid} uses {current / 2 ** 20:.0f} MiB, "
+            f"more than {self.max_rss / 2 ** 20:.0f} MiB; recycling."
+        )
+        self.worker.alive = False
+        return True
+
+    def run(self, sleep):
+        """Check the memory use every interval until the worker stops."""
+        while self.worker.alive:
+            sleep(self.interval)
+            if self.check():
+                break
+
+
+def recycled(worker):
+    """
+    Record why a worker exits.
+
+    Workers that exceeded their memory threshold record so themselves;
+    otherwise they reached their request threshold or were shut down.
+    """
+    reason = getattr(worker, "recycle_reason", None)
+    if reason is None:
+        max_requests = worker.max_requests
+        reason = "requests" if worker.nr >= max_requests else "shutdown"
+    WORKER_RECYCLES.labels(reason).inc()
+    worker.log.info(
+        f"Worker {worker.pid} exits after {worker.nr} requests: {reason}."
+    )
+    return reason
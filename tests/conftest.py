@@ -82,6 +82,34 @@ def tokens(app):
     }
 
 
+@pytest.fixture()
+def create_model(client, tokens):
+    """
+    Provide a function storing a model in project 4 through the API.
+
+    Its keyword arguments override the metadata of the model and it returns
+    the ID of the stored model.
+    """
+
+    def create(token="admin", **fields):
+        response = client.post(
+            "/models",
+            json={
+                "name": "model",
+                "organism_id": 1,
+                "project_id": 4,
+                "default_biomass_reaction": "BIOMASS_Ecoli_core_w_GAM",
+                "ec_model": False,
+                **fields,
+            },
+            headers={"Authorization": f"Bearer {tokens[token]}"},
+        )
+        assert response.status_code == 201, response.json
+        return response.json["id"]
+
+    return create
+
+
 @pytest.fixture(scope="function")
 def session(reset_tables, connection):
     """
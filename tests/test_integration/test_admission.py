@@ -0,0 +1,32 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Test admission control of streamed responses."""
+
+from model_storage.admission import Limiter
+
+
+def test_release_on_close(app, client, tokens, model, monkeypatch):
+    limiter = Limiter("read", concurrency=1, queue_size=0, timeout=0)
+    monkeypatch.setitem(app.extensions["admission"], "read", limiter)
+    response = client.get(
+        f"/models/{model.id}",
+        headers={"Authorization": f"Bearer {tokens['read']}"},
+        buffered=False,
+    )
+    assert response.status_code == 200
+    # The slot is held until the body has been sent.
+    assert limiter.acquire() == "queue_full"
+    response.close()
+    assert limiter.acquire() is None
@@ -0,0 +1,85 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test the ASGI variant of the read endpoints."""
+
+import pytest
+from starlette.testclient import TestClient
+
+from model_storage.asynchronous import create_app
+
+
+@pytest.fixture(scope="module")
+def asgi_client(app):
+    """Provide a test client for the ASGI application."""
+    with TestClient(create_app(app)) as client:
+        yield client
+
+
+def test_list(asgi_client, model, tokens):
+    """Private models are only listed with the JWT claim."""
+    response = asgi_client.get("/models")
+    assert response.status_code == 200
+    assert len(response.json()) == 0
+    response = asgi_client.get(
+        "/models", headers={"Authorization": f"Bearer {tokens['read']}"}
+    )
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+
+
+def test_list_not_modified(asgi_client, client, model, tokens):
+    """Listings carry the same ETag as those of the Flask application."""
+    headers = {"Authorization": f"Bearer {tokens['read']}"}
+    response = asgi_client.get("/models", headers=headers)
+    assert response.headers["Cache-Control"] == "private, no-cache"
+    etag = response.headers["ETag"]
+    assert client.get("/models", headers=headers).headers["ETag"] == etag
+    response = asgi_client.get(
+        "/models", headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 304
+
+
+def test_get(asgi_client, model, tokens):
+    """Stream the same model representation as the Flask application."""
+    response = asgi_client.get(
+        f"/models/{model.id}",
+        headers={"Authorization": f"Bearer {tokens['read']}"},
+    )
+    assert response.status_code == 200
+    assert response.json()["name"] == model.name
+    assert response.json()["model_serialized"] == model.model_serialized
+
+
+def test_get_no_token(asgi_client, model):
+    """Private model gives impression of not existing without JWT claim."""
+    response = asgi_client.get(f"/models/{model.id}")
+    assert response.status_code == 404
+    assert "message" in response.json()
+
+
+def test_invalid_token(asgi_client, model):
+    """Invalid tokens are rejected as by the Flask application."""
+    response = asgi_client.get(
+        "/models", headers={"Authorization": "Bearer invalid"}
+    )
+    assert response.status_code == 401
+
+
+def test_docs(asgi_client):
+    """The OpenAPI docs are served by the Flask application."""
+    response = asgi_client.get("/")
+    assert response.status_code == 200
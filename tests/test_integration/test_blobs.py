@@ -0,0 +1,56 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test serving models from the blob store."""
+
+import pytest
+
+from model_storage import blobs
+from model_storage.models import ModelContent
+
+
+@pytest.fixture()
+def store(app, tmp_path):
+    previous = app.extensions["blobs"]
+    app.extensions["blobs"] = blobs.FilesystemStore(str(tmp_path))
+    yield app.extensions["blobs"]
+    app.extensions["blobs"] = previous
+
+
+def test_external_model(client, session, tokens, e_coli_core, store):
+    """Documents are kept out of the database and streamed from the store."""
+    headers = {"Authorization": f"Bearer {tokens['write']}"}
+    response = client.post(
+        "/models",
+        json={
+            "name": "e_coli_core",
+            "organism_id": 1,
+            "project_id": 4,
+            "default_biomass_reaction": "BIOMASS_Ecoli_core_w_GAM",
+            "ec_model": False,
+            "model_serialized": e_coli_core,
+        },
+        headers=headers,
+    )
+    assert response.status_code == 201
+    id = response.json["id"]
+    response = client.get(f"/models/{id}", headers=headers)
+    assert response.status_code == 200
+    assert response.json["id"] == id
+    assert response.json["model_serialized"] == e_coli_core
+
+    content = ModelContent.query.filter(ModelContent.external).one()
+    assert content.document is None
+    assert store.exists(content.hash)
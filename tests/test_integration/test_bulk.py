@@ -0,0 +1,55 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test the bulk import and export of models."""
+
+import json
+
+from model_storage import bulk
+from model_storage.models import Model, db
+
+
+def test_import_export(session, e_coli_core, tmp_path):
+    """Exported models can be imported as they are."""
+    source = tmp_path / "source"
+    source.mkdir()
+    (source / "e_coli_core.json").write_text(json.dumps(e_coli_core))
+    (source / "invalid.json").write_text("{}")
+    stored, failed = bulk.import_models(
+        db, str(source), {"organism_id": 1, "project_id": 5}, processes=1
+    )
+    assert stored == 1
+    assert list(failed) == ["invalid.json"]
+    model = Model.query.filter(Model.name == "e_coli_core").one()
+    assert model.default_biomass_reaction == "BIOMASS_Ecoli_core_w_GAM"
+    assert model.model_serialized == e_coli_core
+
+    # Importing again skips the stored file.
+    stored, _ = bulk.import_models(db, str(source), {}, processes=1)
+    assert stored == 0
+
+    # Models committed without being recorded are not stored twice.
+    (tmp_path / "source.imported").write_text("")
+    stored, _ = bulk.import_models(
+        db, str(source), {"organism_id": 1, "project_id": 5}, processes=1
+    )
+    assert stored == 0
+    assert Model.query.filter(Model.name == "e_coli_core").count() == 1
+
+    destination = tmp_path / "export.tar.gz"
+    assert bulk.export_models(db, str(destination), project_ids=[5]) == 1
+    stored, failed = bulk.import_models(db, str(destination), {}, processes=1)
+    assert (stored, failed) == (1, {})
+    assert Model.query.filter(Model.name == "e_coli_core").count() == 2
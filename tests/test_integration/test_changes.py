@@ -0,0 +1,65 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test the change feed of models."""
+
+
+def test_changes(client, session, tokens, e_coli_core):
+    """Creations, updates and deletions are listed in order."""
+    headers = {"Authorization": f"Bearer {tokens['admin']}"}
+    response = client.get("/models/changes", headers=headers)
+    since = response.json["cursor"]
+    response = client.post(
+        "/models",
+        json={
+            "name": "model",
+            "organism_id": 1,
+            "project_id": 4,
+            "default_biomass_reaction": "BIOMASS_Ecoli_core_w_GAM",
+            "ec_model": False,
+            "model_serialized": e_coli_core,
+        },
+        headers=headers,
+    )
+    id = response.json["id"]
+    client.put(f"/models/{id}", json={"name": "renamed"}, headers=headers)
+    client.delete(f"/models/{id}", headers=headers)
+
+    response = client.get(
+        "/models/changes", query_string={"since": since}, headers=headers
+    )
+    assert response.status_code == 200
+    assert [
+        (change["model_id"], change["action"])
+        for change in response.json["changes"]
+    ] == [(id, "created"), (id, "updated"), (id, "deleted")]
+    assert response.json["more"] is False
+
+    response = client.get(
+        "/models/changes",
+        query_string={"since": since, "limit": 1},
+        headers=headers,
+    )
+    assert len(response.json["changes"]) == 1
+    assert response.json["more"] is True
+
+
+def test_changes_invisible(client, session, tokens, model):
+    """Changes of models in other projects are not listed."""
+    response = client.get("/models/changes")
+    assert response.status_code == 200
+    assert model.id not in [
+        change["model_id"] for change in response.json["changes"]
+    ]
@@ -0,0 +1,84 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test compressed requests and pre-compressed responses."""
+
+import gzip
+import json
+
+import pytest
+
+
+def test_compressed(client, session, tokens, e_coli_core):
+    headers = {"Authorization": f"Bearer {tokens['write']}"}
+    body = {
+        "name": "e_coli_core",
+        "organism_id": 1,
+        "project_id": 4,
+        "default_biomass_reaction": "BIOMASS_Ecoli_core_w_GAM",
+        "ec_model": False,
+        "model_serialized": e_coli_core,
+    }
+    response = client.post(
+        "/models",
+        data=gzip.compress(json.dumps(body).encode()),
+        content_type="application/json",
+        headers=dict(headers, **{"Content-Encoding": "gzip"}),
+    )
+    assert response.status_code == 201
+    id = response.json["id"]
+
+    response = client.get(
+        f"/models/{id}",
+        headers=dict(headers, **{"Accept-Encoding": "gzip"}),
+    )
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    model = json.loads(gzip.decompress(response.data))
+    assert model["id"] == id
+    assert model["model_serialized"] == e_coli_core
+
+
+def test_compressed_too_large(app, client, session, tokens, monkeypatch):
+    monkeypatch.setitem(app.config, "MAX_DECOMPRESSED_LENGTH", 1024)
+    response = client.post(
+        "/models",
+        data=gzip.compress(b" " * 1024 * 1024),
+        content_type="application/json",
+        headers={
+            "Authorization": f"Bearer {tokens['write']}",
+            "Content-Encoding": "gzip",
+        },
+    )
+    assert response.status_code == 413
+
+
+@pytest.mark.parametrize(
+    "data",
+    [b"not gzip", gzip.compress(b'{"name": "model"}')[:-12]],
+    ids=["invalid", "truncated"],
+)
+def test_compressed_corrupt(client, session, tokens, data):
+    response = client.post(
+        "/models",
+        data=data,
+        content_type="application/json",
+        headers={
+            "Authorization": f"Bearer {tokens['write']}",
+            "Content-Encoding": "gzip",
+        },
+    )
+    assert response.status_code == 400
+    assert "gzip" in response.json["message"]
@@ -0,0 +1,48 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test the comparison of two stored models."""
+
+import copy
+
+
+def test_diff(client, session, tokens, create_model, e_coli_core):
+    """Report the changed bounds and GPR of a reaction."""
+    variant = copy.deepcopy(e_coli_core)
+    reaction = variant["reactions"][0]
+    reaction["upper_bound"] = 0
+    reaction["gene_reaction_rule"] = ""
+    parent_id = create_model(name="parent", model_serialized=e_coli_core)
+    variant_id = create_model(name="variant", model_serialized=variant)
+    response = client.get(
+        f"/models/{parent_id}/diff/{variant_id}",
+        headers={"Authorization": f"Bearer {tokens['read']}"},
+    )
+    assert response.status_code == 200
+    changed = response.json["reactions"]["changed"]
+    assert list(changed) == [reaction["id"]]
+    assert changed[reaction["id"]]["upper_bound"] == [1000.0, 0]
+    assert changed[reaction["id"]]["gene_reaction_rule"][1] == ""
+    assert response.json["genes"] == {
+        "added": [],
+        "removed": [],
+        "changed": {},
+    }
+
+
+def test_diff_not_visible(client, session, model):
+    """Models that are not visible can not be compared."""
+    response = client.get(f"/models/{model.id}/diff/{model.id}")
+    assert response.status_code == 404
@@ -15,6 +15,8 @@
 
 """Test expected functioning of the OpenAPI docs endpoints."""
 
+import copy
+
 import pytest
 
 
@@ -27,6 +29,17 @@ def test_models_get(client, session, model, tokens):
     assert len(resp.json) == 1
 
 
+def test_models_get_not_modified(client, session, model, tokens):
+    """An unchanged listing is not sent again."""
+    headers = {"Authorization": f"Bearer {tokens['read']}"}
+    resp = client.get("/models", headers=headers)
+    assert resp.status_code == 200
+    resp = client.get(
+        "/models", headers={**headers, "If-None-Match": resp.headers["ETag"]}
+    )
+    assert resp.status_code == 304
+
+
 def test_models_post(client, session, tokens, e_coli_core):
     """Test the /models POST API supposed to post a single model to the DB."""
     new_model = {
@@ -83,3 +96,44 @@ def test_indvmodel_delete(client, session, model, tokens, url, code):
         url, headers={"Authorization": f"Bearer {tokens['admin']}"}
     )
     assert resp.status_code == code
+
+
+def test_indvmodel_put_biomass(client, session, model, tokens):
+    """The biomass reaction must exist in the stored model."""
+    resp = client.put(
+        "/models/1",
+        json={"default_biomass_reaction": "missing"},
+        headers={"Authorization": f"Bearer {tokens['write']}"},
+    )
+    assert resp.status_code == 422
+    assert "default_biomass_reaction" in resp.json
+
+
+def test_indvmodel_put_changed_elements(client, session, tokens, e_coli_core):
+    """Changed elements of an updated model are validated."""
+    headers = {"Authorization": f"Bearer {tokens['write']}"}
+    resp = client.post(
+        "/models",
+        json={
+            "name": "e_coli_core",
+            "organism_id": 1,
+            "project_id": 4,
+            "default_biomass_reaction": "BIOMASS_Ecoli_core_w_GAM",
+            "ec_model": False,
+            "model_serialized": e_coli_core,
+        },
+        headers=headers,
+    )
+    id = resp.json["id"]
+    modified = copy.deepcopy(e_coli_core)
+    modified["reactions"][0]["metabolites"]["unknown_c"] = 1
+    resp = client.put(
+        f"/models/{id}", json={"model_serialized": modified}, headers=headers
+    )
+    assert resp.status_code == 422
+    resp = client.put(
+        f"/models/{id}",
+        json={"default_biomass_reaction": "ACALD"},
+        headers=headers,
+    )
+    assert resp.status_code == 204
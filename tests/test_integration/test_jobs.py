@@ -0,0 +1,122 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test the asynchronous creation of models."""
+
+from jose import jwt
+
+from model_storage import jobs
+from model_storage.models import Model, ModelJob
+
+
+def post_job(client, headers, e_coli_core, project_id=4):
+    return client.post(
+        "/models/jobs",
+        json={
+            "name": "model",
+            "organism_id": 1,
+            "project_id": project_id,
+            "default_biomass_reaction": "BIOMASS_Ecoli_core_w_GAM",
+            "ec_model": False,
+            "model_serialized": e_coli_core,
+        },
+        headers=headers,
+    )
+
+
+def test_job(app, client, session, tokens, e_coli_core):
+    """A queued model is created by the job worker."""
+    headers = {"Authorization": f"Bearer {tokens['write']}"}
+    response = post_job(client, headers, e_coli_core)
+    assert response.status_code == 202
+    assert response.json["status"] == "queued"
+    location = response.headers["Location"]
+    assert jobs.run_once(app)
+    assert not jobs.run_once(app)
+    response = client.get(location, headers=headers)
+    assert response.status_code == 200
+    assert response.json["status"] == "succeeded"
+    response = client.get(
+        f"/models/{response.json['model_id']}", headers=headers
+    )
+    assert response.status_code == 200
+
+
+def test_job_forbidden(app, client, session, tokens, e_coli_core):
+    """The claims of the client are verified when the job runs."""
+    headers = {"Authorization": f"Bearer {tokens['write']}"}
+    response = post_job(client, headers, e_coli_core, project_id=5)
+    assert response.status_code == 202
+    assert jobs.run_once(app)
+    response = client.get(response.headers["Location"], headers=headers)
+    assert response.json["status"] == "failed"
+    assert "message" in response.json["errors"]
+
+
+def test_job_not_found(client, session, tokens):
+    response = client.get(
+        "/models/jobs/unknown",
+        headers={"Authorization": f"Bearer {tokens['read']}"},
+    )
+    assert response.status_code == 404
+
+
+def test_job_other_client(app, client, session, tokens, e_coli_core):
+    """Jobs are only returned to the client that queued them."""
+    token = jwt.encode(
+        {"prj": {4: "write"}, "sub": "alice"},
+        app.config["JWT_PRIVATE_KEY"],
+        "RS512",
+    )
+    response = post_job(
+        client, {"Authorization": f"Bearer {token}"}, e_coli_core
+    )
+    location = response.headers["Location"]
+    response = client.get(
+        location, headers={"Authorization": f"Bearer {tokens['write']}"}
+    )
+    assert response.status_code == 404
+    response = client.get(
+        location, headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 200
+
+
+def test_job_invalid_json(app, client, session, tokens):
+    headers = {"Authorization": f"Bearer {tokens['write']}"}
+    response = client.post(
+        "/models/jobs",
+        data=b"{",
+        content_type="application/json",
+        headers=headers,
+    )
+    assert jobs.run_once(app)
+    response = client.get(response.headers["Location"], headers=headers)
+    assert response.json["status"] == "failed"
+    assert "not valid JSON" in response.json["errors"]["message"]
+
+
+def test_job_queued_again(app, client, session, tokens, e_coli_core):
+    """A result is discarded once the job was queued again meanwhile."""
+    headers = {"Authorization": f"Bearer {tokens['write']}"}
+    post_job(client, headers, e_coli_core)
+    with app.test_request_context():
+        job = jobs.claim()
+        attempt = job.attempts
+        ModelJob.query.filter(ModelJob.id == job.id).update(
+            {"status": "queued"}, synchronize_session=False
+        )
+        assert not jobs.finish(job, attempt, *jobs.execute(job))
+        assert Model.query.filter(Model.name == "model").count() == 0
@@ -0,0 +1,67 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test storing models as modifications of a parent model."""
+
+from model_storage import lineage
+
+
+def test_derived_model(client, session, tokens, create_model, e_coli_core):
+    """A derived model is served as its full, modified model."""
+    headers = {"Authorization": f"Bearer {tokens['admin']}"}
+    modifications = {"reactions": {"ACALD": None}}
+    parent_id = create_model(model_serialized=e_coli_core)
+    child_id = create_model(parent_id=parent_id, modifications=modifications)
+    response = client.get(f"/models/{child_id}", headers=headers)
+    assert response.status_code == 200
+    assert response.json["parent_id"] == parent_id
+    assert response.json["model_serialized"] == lineage.apply(
+        e_coli_core, modifications
+    )
+
+    # Deleting the parent preserves the derived model.
+    response = client.delete(f"/models/{parent_id}", headers=headers)
+    assert response.status_code == 204
+    response = client.get(f"/models/{child_id}", headers=headers)
+    assert response.json["parent_id"] is None
+    assert response.json["model_serialized"] == lineage.apply(
+        e_coli_core, modifications
+    )
+
+
+def test_derived_model_invalid(
+    client, session, tokens, create_model, e_coli_core
+):
+    """Reject modifications referring to unknown metabolites."""
+    headers = {"Authorization": f"Bearer {tokens['write']}"}
+    parent_id = create_model(model_serialized=e_coli_core)
+    response = client.post(
+        "/models",
+        json={
+            "name": "invalid",
+            "organism_id": 1,
+            "project_id": 4,
+            "default_biomass_reaction": "BIOMASS_Ecoli_core_w_GAM",
+            "ec_model": False,
+            "parent_id": parent_id,
+            "modifications": {
+                "reactions": {
+                    "NEW": {"id": "NEW", "metabolites": {"unknown": -1}}
+                }
+            },
+        },
+        headers=headers,
+    )
+    assert response.status_code == 422
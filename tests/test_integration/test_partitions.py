@@ -0,0 +1,34 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test the management of model partitions."""
+
+from model_storage import partitions
+from model_storage.models import Model, ModelChange, ModelVersion
+
+
+def test_delete_project(session, model):
+    connection = session.connection()
+    assert partitions.delete_project(connection, model.project_id) == 1
+    session.expire_all()
+    assert Model.query.filter(Model.project_id == 4).count() == 0
+    assert ModelVersion.query.filter_by(model_id=model.id).count() == 0
+    change = ModelChange.query.order_by(ModelChange.id.desc()).first()
+    assert (change.model_id, change.action) == (model.id, "deleted")
+
+
+def test_partition_project_unpartitioned(session):
+    """Tables created from the models are not partitioned."""
+    assert not partitions.is_partitioned(session.connection())
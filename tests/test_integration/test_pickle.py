@@ -0,0 +1,57 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test serving models as pickled cobra models."""
+
+import pickle
+
+import cobra
+import optlang
+
+
+def test_pickle(client, session, tokens, e_coli_core):
+    headers = {"Authorization": f"Bearer {tokens['write']}"}
+    response = client.post(
+        "/models",
+        json={
+            "name": "e_coli_core",
+            "organism_id": 1,
+            "project_id": 4,
+            "default_biomass_reaction": "BIOMASS_Ecoli_core_w_GAM",
+            "ec_model": False,
+            "model_serialized": e_coli_core,
+        },
+        headers=headers,
+    )
+    id = response.json["id"]
+    headers.update(
+        {
+            "Accept": "application/vnd.cobra.model+pickle",
+            "X-Cobra-Version": cobra.__version__,
+            "X-Optlang-Version": optlang.__version__,
+        }
+    )
+    response = client.get(f"/models/{id}", headers=headers)
+    assert response.status_code == 200
+    assert response.mimetype == "application/vnd.cobra.model+pickle"
+    model = pickle.loads(response.data)
+    assert len(model.reactions) == len(e_coli_core["reactions"])
+
+    # Incompatible consumers receive the serialized model instead.
+    headers["X-Cobra-Version"] = "0.1.0"
+    response = client.get(f"/models/{id}", headers=headers)
+    assert response.mimetype == "application/json"
+    assert response.headers["X-Cobra-Version"] == cobra.__version__
+    assert response.json["model_serialized"] == e_coli_core
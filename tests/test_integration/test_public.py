@@ -0,0 +1,85 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test serving public models to shared caches."""
+
+import pytest
+
+from model_storage.models import Model
+
+
+@pytest.fixture()
+def public_model(session, e_coli_core):
+    model = Model(
+        name="e_coli_core",
+        organism_id=1,
+        project_id=None,
+        default_biomass_reaction="BIOMASS_Ecoli_core_w_GAM",
+        ec_model=False,
+        model_serialized=e_coli_core,
+    )
+    session.add(model)
+    session.commit()
+    return model
+
+
+def test_public_model(client, public_model):
+    # Even an invalid token is ignored.
+    response = client.get(
+        f"/public/models/{public_model.id}",
+        headers={"Authorization": "Bearer invalid"},
+    )
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"].startswith("public")
+    assert response.headers["Surrogate-Key"] == f"model-{public_model.id}"
+    response = client.get(
+        f"/public/models/{public_model.id}",
+        headers={"If-None-Match": response.headers["ETag"]},
+    )
+    assert response.status_code == 304
+    response = client.get(f"/public/models/{public_model.id}/versions/1")
+    assert response.status_code == 200
+
+
+def test_public_model_representations(client, public_model):
+    """Entity tags differ between the representations of a model."""
+    url = f"/public/models/{public_model.id}"
+    plain = client.get(url)
+    compressed = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert compressed.headers["ETag"] != plain.headers["ETag"]
+    response = client.get(
+        url,
+        headers={
+            "Accept-Encoding": "gzip",
+            "If-None-Match": plain.headers["ETag"],
+        },
+    )
+    assert response.status_code == 200
+
+
+def test_public_model_private(client, model):
+    """Models of projects are not served without claims."""
+    response = client.get(f"/public/models/{model.id}")
+    assert response.status_code == 404
+
+
+def test_private_model_not_shared(client, tokens, model):
+    response = client.get(
+        f"/models/{model.id}",
+        headers={"Authorization": f"Bearer {tokens['read']}"},
+    )
+    assert response.status_code == 200
+    assert "Cache-Control" not in response.headers
@@ -0,0 +1,61 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test the prepared statements of the hot queries."""
+
+import pytest
+
+from model_storage import queries
+from model_storage.models import Model
+
+
+@pytest.fixture(params=[True, False], ids=["prepared", "unprepared"])
+def prepared(app, request):
+    previous = app.config["PREPARED_STATEMENTS"]
+    app.config["PREPARED_STATEMENTS"] = request.param
+    yield request.param
+    app.config["PREPARED_STATEMENTS"] = previous
+
+
+def test_list_models(app, session, model, prepared):
+    """The listing contains the models of the projects and public models."""
+    with app.test_request_context():
+        ids = {row.id for row in queries.list_models([model.project_id])}
+        assert model.id in ids
+        assert ids == {
+            id
+            for id, in session.query(Model.id).filter(
+                Model.visible({model.project_id: "read"})
+            )
+        }
+        assert model.id not in {row.id for row in queries.list_models([])}
+
+
+def test_get_model(app, session, model, prepared):
+    """A model is only found if it is visible."""
+    with app.test_request_context():
+        found = queries.get_model(model.id, [model.project_id])
+        assert found.id == model.id
+        assert found.content_hash == model.content_hash
+        assert queries.get_model(model.id, [model.project_id + 1]) is None
+
+
+def test_many_projects(app, session, model, prepared):
+    """Statements are prepared per number of projects."""
+    with app.test_request_context():
+        for count in range(1, 12):
+            projects = [model.project_id + offset for offset in range(count)]
+            found = queries.get_model(model.id, projects)
+            assert found.id == model.id
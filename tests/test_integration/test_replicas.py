@@ -0,0 +1,57 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test routing of reads and the exposed per-engine metrics."""
+
+from flask import g
+
+from model_storage.replicas import PRIMARY_COOKIE, PRIMARY_HEADER
+
+
+def test_read_your_writes(client, session, model, tokens):
+    """A successful write keeps the client on the primary."""
+    response = client.put(
+        "/models/1",
+        json={"name": "Changed"},
+        headers={"Authorization": f"Bearer {tokens['write']}"},
+    )
+    assert response.status_code == 204
+    assert PRIMARY_COOKIE in response.headers["Set-Cookie"]
+
+
+def test_read_no_cookie(client, session, model):
+    """Reads do not pin the client to the primary."""
+    response = client.get("/models")
+    assert "Set-Cookie" not in response.headers
+
+
+def test_read_primary_header(app, session):
+    """Clients without cookies ask for the primary with a header."""
+    with app.test_request_context("/models", headers={PRIMARY_HEADER: "1"}):
+        app.preprocess_request()
+        assert not g.read_only
+    with app.test_request_context("/models"):
+        app.preprocess_request()
+        assert g.read_only
+
+
+def test_metrics(client, session, model):
+    """Query latencies are reported per engine."""
+    client.get("/models")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert b'model_storage_query_duration_seconds_count{engine="primary"}' in (
+        response.data
+    )
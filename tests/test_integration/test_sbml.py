@@ -0,0 +1,67 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test importing and exporting models as SBML."""
+
+from model_storage.models import ModelArtifact
+
+
+def test_sbml_round_trip(client, session, tokens, e_coli_core):
+    headers = {"Authorization": f"Bearer {tokens['write']}"}
+    metadata = {
+        "name": "e_coli_core",
+        "organism_id": 1,
+        "project_id": 4,
+        "default_biomass_reaction": "BIOMASS_Ecoli_core_w_GAM",
+        "ec_model": False,
+    }
+    response = client.post(
+        "/models",
+        json=dict(metadata, model_serialized=e_coli_core),
+        headers=headers,
+    )
+    id = response.json["id"]
+    response = client.get(
+        f"/models/{id}",
+        headers=dict(headers, Accept="application/sbml+xml"),
+    )
+    assert response.status_code == 200
+    assert response.mimetype == "application/sbml+xml"
+    assert ModelArtifact.query.filter(ModelArtifact.format == "sbml").count()
+
+    response = client.post(
+        "/models",
+        data=response.data,
+        content_type="application/sbml+xml",
+        query_string=metadata,
+        headers=headers,
+    )
+    assert response.status_code == 201, response.json
+    response = client.get(f"/models/{response.json['id']}", headers=headers)
+    assert {
+        reaction["id"]
+        for reaction in response.json["model_serialized"]["reactions"]
+    } == {reaction["id"] for reaction in e_coli_core["reactions"]}
+
+
+def test_sbml_invalid(client, session, tokens):
+    response = client.post(
+        "/models",
+        data=b"<sbml>",
+        content_type="application/sbml+xml",
+        query_string={"name": "invalid", "organism_id": 1, "project_id": 4},
+        headers={"Authorization": f"Bearer {tokens['write']}"},
+    )
+    assert response.status_code == 422
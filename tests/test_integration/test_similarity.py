@@ -0,0 +1,44 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test finding similar models."""
+
+import copy
+
+
+def test_similar_models(client, session, tokens, create_model, e_coli_core):
+    """Find models above the threshold, most similar first."""
+    headers = {"Authorization": f"Bearer {tokens['admin']}"}
+    variant = copy.deepcopy(e_coli_core)
+    del variant["reactions"][-20:]
+    original_id = create_model(model_serialized=e_coli_core)
+    copy_id = create_model(model_serialized=e_coli_core)
+    variant_id = create_model(model_serialized=variant)
+    response = client.get(f"/models/{original_id}/similar", headers=headers)
+    assert response.status_code == 200
+    ids = [result["id"] for result in response.json]
+    assert ids[:2] == [copy_id, variant_id]
+    assert response.json[0]["similarity"] == 1
+    assert response.json[1]["similarity"] < 1
+
+    response = client.get(
+        f"/models/{original_id}/similar?threshold=0.99", headers=headers
+    )
+    assert [result["id"] for result in response.json] == [copy_id]
+
+    response = client.get(
+        f"/models/{original_id}/similar?threshold=1.5", headers=headers
+    )
+    assert response.status_code == 422
@@ -0,0 +1,93 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test serving models from the archive."""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from model_storage import blobs, tiers
+from model_storage.models import Model, ModelArtifact, ModelContent, db
+
+
+@pytest.fixture()
+def archive(app, tmp_path):
+    previous = app.extensions["archive"]
+    app.extensions["archive"] = blobs.FilesystemStore(
+        str(tmp_path), tiers.SUFFIX
+    )
+    yield app.extensions["archive"]
+    app.extensions["archive"] = previous
+
+
+def test_archived_model(
+    client, session, tokens, create_model, e_coli_core, archive
+):
+    """Documents of idle models are archived and still served."""
+    headers = {"Authorization": f"Bearer {tokens['write']}"}
+    id = create_model(model_serialized=e_coli_core)
+    hash = Model.query.get(id).content_hash
+
+    # A negative idle time considers all models as idle.
+    assert tiers.archive_contents(db, archive, -60) >= 1
+    content = ModelContent.query.get(hash)
+    assert content.archived
+    assert content.document is None
+    assert archive.exists(hash)
+    assert ModelArtifact.query.filter_by(content_hash=hash).count() == 0
+
+    response = client.get(f"/models/{id}", headers=headers)
+    assert response.status_code == 200
+    assert response.json["model_serialized"] == e_coli_core
+    response = client.get(
+        f"/models/{id}", headers=dict(headers, **{"Accept-Encoding": "gzip"})
+    )
+    assert response.status_code == 200
+
+
+def test_ancestors_kept(session, create_model, e_coli_core, archive):
+    """Parents of recently read modifications are not archived."""
+    parent_id = create_model(model_serialized=e_coli_core)
+    child_id = create_model(
+        parent_id=parent_id, modifications={"reactions": {"ACALD": None}}
+    )
+    parent_hash = Model.query.get(parent_id).content_hash
+    # Only the derived model has been read within the idle time.
+    Model.query.filter(Model.id == child_id).update(
+        {"accessed": datetime.utcnow() + timedelta(days=1)},
+        synchronize_session=False,
+    )
+    tiers.archive_contents(db, archive, -60)
+    assert not ModelContent.query.get(parent_hash).archived
+
+
+def test_record_restores_ancestors(app):
+    parent = ModelContent(hash="parent", archived=True, element_index={})
+    child = ModelContent(
+        hash="child", parent=parent, modifications={}, element_index={}
+    )
+    model = Model(
+        name="model",
+        organism_id=1,
+        project_id=4,
+        default_biomass_reaction="BIOMASS_Ecoli_core_w_GAM",
+        ec_model=False,
+        content=child,
+        version=1,
+    )
+    tracker = tiers.AccessTracker(db, app, float("inf"))
+    tracker.record(model)
+    assert tracker._restore == {"parent"}
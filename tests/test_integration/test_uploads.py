@@ -0,0 +1,125 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test chunked uploads of models."""
+
+import json
+
+
+METADATA = {
+    "name": "e_coli_core",
+    "organism_id": 1,
+    "project_id": 4,
+    "default_biomass_reaction": "BIOMASS_Ecoli_core_w_GAM",
+    "ec_model": False,
+}
+
+
+def upload(client, headers, body, parts=3, **kwargs):
+    """Upload a body in the given number of parts and return the upload ID."""
+    response = client.post("/uploads", json=kwargs, headers=headers)
+    assert response.status_code == 201
+    id = response.json["id"]
+    size = len(body) // parts + 1
+    for number in range(parts):
+        response = client.put(
+            f"/uploads/{id}/parts/{number}",
+            data=body[number * size : (number + 1) * size],
+            headers=headers,
+        )
+        assert response.status_code == 204
+    return id
+
+
+def test_upload(client, session, tokens, e_coli_core):
+    """Create a model from an upload in several parts."""
+    headers = {"Authorization": f"Bearer {tokens['write']}"}
+    body = json.dumps(e_coli_core).encode()
+    id = upload(client, headers, body, model=METADATA)
+    response = client.get(f"/uploads/{id}", headers=headers)
+    assert response.status_code == 200
+    assert sum(response.json["parts"].values()) == len(body)
+    response = client.post(f"/uploads/{id}/complete", headers=headers)
+    assert response.status_code == 201
+    response = client.get(f"/models/{response.json['id']}", headers=headers)
+    assert response.json["model_serialized"] == e_coli_core
+    assert response.json["name"] == METADATA["name"]
+
+
+def test_upload_replace(client, session, model, tokens, e_coli_core):
+    """Replace the model of an existing entry."""
+    headers = {"Authorization": f"Bearer {tokens['write']}"}
+    id = upload(
+        client,
+        headers,
+        json.dumps(e_coli_core).encode(),
+        model_id=model.id,
+        model={"default_biomass_reaction": "BIOMASS_Ecoli_core_w_GAM"},
+    )
+    response = client.post(f"/uploads/{id}/complete", headers=headers)
+    assert response.status_code == 204
+    response = client.get(f"/models/{model.id}", headers=headers)
+    assert response.json["model_serialized"] == e_coli_core
+
+
+def test_upload_replace_derived(client, session, tokens, e_coli_core):
+    """A derived model replaced by an upload no longer has a parent."""
+    headers = {"Authorization": f"Bearer {tokens['write']}"}
+    response = client.post(
+        "/models",
+        json=dict(METADATA, model_serialized=e_coli_core),
+        headers=headers,
+    )
+    parent_id = response.json["id"]
+    response = client.post(
+        "/models",
+        json=dict(
+            METADATA,
+            parent_id=parent_id,
+            modifications={"reactions": {"ACALD": None}},
+        ),
+        headers=headers,
+    )
+    assert response.status_code == 201
+    model_id = response.json["id"]
+    id = upload(
+        client, headers, json.dumps(e_coli_core).encode(), model_id=model_id
+    )
+    response = client.post(f"/uploads/{id}/complete", headers=headers)
+    assert response.status_code == 204
+    response = client.get(f"/models/{model_id}", headers=headers)
+    assert response.json["parent_id"] is None
+    assert response.json["model_serialized"] == e_coli_core
+
+
+def test_upload_invalid(client, session, tokens, e_coli_core):
+    """Reject models referring to undefined metabolites."""
+    headers = {"Authorization": f"Bearer {tokens['write']}"}
+    e_coli_core = dict(e_coli_core, metabolites=[])
+    id = upload(
+        client, headers, json.dumps(e_coli_core).encode(), model=METADATA
+    )
+    response = client.post(f"/uploads/{id}/complete", headers=headers)
+    assert response.status_code == 422
+
+
+def test_upload_no_claim(client, session, tokens):
+    """Uploads require write access to the project."""
+    response = client.post(
+        "/uploads",
+        json={"model": dict(METADATA, project_id=5)},
+        headers={"Authorization": f"Bearer {tokens['write']}"},
+    )
+    assert response.status_code == 403
@@ -0,0 +1,69 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test the version history of models."""
+
+
+def test_versions(client, session, tokens, e_coli_core):
+    """Every change of the serialized model creates an immutable version."""
+    headers = {"Authorization": f"Bearer {tokens['admin']}"}
+    response = client.post(
+        "/models",
+        json={
+            "name": "model",
+            "organism_id": 1,
+            "project_id": 4,
+            "default_biomass_reaction": "BIOMASS_Ecoli_core_w_GAM",
+            "ec_model": False,
+            "model_serialized": e_coli_core,
+        },
+        headers=headers,
+    )
+    id = response.json["id"]
+    # Changing only the metadata keeps the current version.
+    response = client.put(
+        f"/models/{id}", json={"name": "renamed"}, headers=headers
+    )
+    assert response.status_code == 204
+    response = client.put(
+        f"/models/{id}",
+        json={"modifications": {"reactions": {"ACALD": None}}},
+        headers=headers,
+    )
+    assert response.status_code == 204
+
+    response = client.get(f"/models/{id}/versions", headers=headers)
+    assert response.status_code == 200
+    assert [version["version"] for version in response.json] == [1, 2]
+    first, second = response.json
+    assert first["content_hash"] != second["content_hash"]
+
+    response = client.get(f"/models/{id}/versions/1", headers=headers)
+    assert response.status_code == 200
+    assert response.json["model_serialized"] == e_coli_core
+    assert response.headers["Cache-Control"].startswith("private")
+    assert response.headers["ETag"] == f'"{first["content_hash"]}"'
+
+    response = client.get(
+        f"/models/{id}/versions/1",
+        headers=dict(headers, **{"If-None-Match": response.headers["ETag"]}),
+    )
+    assert response.status_code == 304
+
+
+def test_version_not_found(client, session, tokens, model):
+    headers = {"Authorization": f"Bearer {tokens['read']}"}
+    response = client.get(f"/models/{model.id}/versions/2", headers=headers)
+    assert response.status_code == 404
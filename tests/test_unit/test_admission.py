@@ -0,0 +1,43 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test admission control of concurrent requests."""
+
+from model_storage.admission import Limiter, classify
+
+
+def test_classify():
+    assert classify("Models", "GET") == "listing"
+    assert classify("IndvModel", "GET") == "read"
+    assert classify("IndvModel", "PUT") == "write"
+    assert classify("Models", "POST") == "write"
+    assert classify("ModelEvents", "GET") is None
+    assert classify("metrics", "GET") is None
+    assert classify("IndvModel", "OPTIONS") is None
+
+
+def test_queue_full():
+    limiter = Limiter("read", concurrency=1, queue_size=0, timeout=0)
+    assert limiter.acquire() is None
+    assert limiter.acquire() == "queue_full"
+    limiter.release()
+    assert limiter.acquire() is None
+
+
+def test_timeout():
+    limiter = Limiter("read", concurrency=1, queue_size=1, timeout=0.01)
+    assert limiter.acquire() is None
+    assert limiter.acquire() == "timeout"
+    assert limiter.waiting == 0
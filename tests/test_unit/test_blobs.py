@@ -0,0 +1,72 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test storing serialized models outside of the database."""
+
+import io
+
+import pytest
+
+from model_storage import blobs
+
+
+class FakeS3Error(Exception):
+    response = {"Error": {"Code": "404"}}
+
+
+class FakeS3Client:
+    """Stand in for the subset of the boto3 S3 client used by the store."""
+
+    def __init__(self):
+        self.objects = {}
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise FakeS3Error()
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.objects[Bucket, Key] = Body.read()
+
+    def get_object(self, Bucket, Key):
+        return {"Body": io.BytesIO(self.objects[Bucket, Key])}
+
+
+@pytest.fixture(params=["filesystem", "s3"])
+def store(request, tmp_path):
+    if request.param == "filesystem":
+        return blobs.FilesystemStore(str(tmp_path))
+    return blobs.S3Store(FakeS3Client(), "bucket", "models/")
+
+
+def test_round_trip(store):
+    document = {"id": "model", "reactions": [{"id": "R"}] * 10000}
+    assert not store.exists("abc")
+    blobs.store_document(store, "abc", document)
+    assert store.exists("abc")
+    assert blobs.load_document(store, "abc") == document
+
+
+def test_stream_document(store, tmp_path):
+    path = tmp_path / "model.json"
+    path.write_text('{"id": "model"}')
+    blobs.store_file(store, "abc", str(path))
+    assert b"".join(blobs.stream_document(store, "abc")) == b'{"id": "model"}'
+
+
+def test_create_store(tmp_path):
+    assert blobs.create_store("") is None
+    store = blobs.create_store(f"file://{tmp_path}")
+    assert isinstance(store, blobs.FilesystemStore)
+    assert store.root == str(tmp_path)
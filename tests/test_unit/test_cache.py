@@ -0,0 +1,61 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test the in-process caches."""
+
+import threading
+import time
+
+import pytest
+
+from model_storage.cache import SingleFlight
+
+
+def test_single_flight_shares_result():
+    flights = SingleFlight()
+    started = threading.Event()
+    calls = []
+    results = []
+
+    def load():
+        calls.append(1)
+        started.set()
+        # Give the follower time to join the call in flight.
+        time.sleep(0.1)
+        return b"model"
+
+    def request():
+        results.append(flights.do(1, load))
+
+    leader = threading.Thread(target=request)
+    leader.start()
+    started.wait()
+    follower = threading.Thread(target=request)
+    follower.start()
+    leader.join()
+    follower.join()
+    assert results == [b"model", b"model"]
+    assert len(calls) == 1
+
+
+def test_single_flight_error():
+    flights = SingleFlight()
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        flights.do(1, fail)
+    assert flights.do(1, lambda: 2) == 2
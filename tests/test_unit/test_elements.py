@@ -0,0 +1,97 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test the indexing and comparison of model elements."""
+
+import copy
+
+import pytest
+from marshmallow import ValidationError
+
+from model_storage import elements
+
+
+def test_content_hash_is_deterministic(e_coli_core):
+    """Equal models have equal hashes regardless of key order."""
+    reordered = dict(reversed(list(e_coli_core.items())))
+    assert elements.content_hash(
+        elements.index_model(e_coli_core)
+    ) == elements.content_hash(elements.index_model(reordered))
+
+
+def test_compare(e_coli_core):
+    """Detect added, removed and changed elements."""
+    modified = copy.deepcopy(e_coli_core)
+    removed = modified["reactions"].pop(0)
+    modified["reactions"][0]["lower_bound"] = -42
+    modified["genes"].append({"id": "new_gene", "name": ""})
+    result = elements.compare(
+        elements.index_model(e_coli_core), elements.index_model(modified)
+    )
+    assert result["reactions"]["removed"] == [removed["id"]]
+    assert result["reactions"]["changed"] == [modified["reactions"][0]["id"]]
+    assert result["genes"]["added"] == ["new_gene"]
+    assert result["metabolites"] == {"added": [], "removed": [], "changed": []}
+
+
+def test_changes():
+    """Report changed fields and stoichiometric coefficients."""
+    old = {"id": "R", "lower_bound": 0, "metabolites": {"a": -1, "b": 1}}
+    new = {"id": "R", "lower_bound": -10, "metabolites": {"a": -2, "b": 1}}
+    assert elements.changes(old, new) == {
+        "lower_bound": [0, -10],
+        "metabolites": {"a": [-1, -2]},
+    }
+
+
+def test_validate_update(e_coli_core):
+    """Unchanged reactions referring to removed metabolites are invalid."""
+    index = elements.index_model(e_coli_core)
+    modified = copy.deepcopy(e_coli_core)
+    modified["metabolites"] = [
+        metabolite
+        for metabolite in modified["metabolites"]
+        if metabolite["id"] != "atp_c"
+    ]
+    with pytest.raises(ValidationError):
+        elements.validate_update(index, modified, "BIOMASS_Ecoli_core_w_GAM")
+    modified = copy.deepcopy(e_coli_core)
+    modified["reactions"][0]["lower_bound"] = -10
+    new_index = elements.validate_update(
+        index, modified, "BIOMASS_Ecoli_core_w_GAM"
+    )
+    assert new_index == elements.index_model(modified)
+
+
+@pytest.mark.parametrize(
+    "path, value",
+    [
+        (("reactions",), 5),
+        (("reactions", 0, "lower_bound"), "-10"),
+        (("reactions", 0, "upper_bound"), True),
+        (("reactions", 0, "metabolites"), ["atp_c"]),
+        (("reactions", 0, "gene_reaction_rule"), 42),
+    ],
+)
+def test_validate_update_malformed(e_coli_core, path, value):
+    """Elements of the wrong type are invalid rather than failing."""
+    index = elements.index_model(e_coli_core)
+    modified = copy.deepcopy(e_coli_core)
+    parent = modified
+    for key in path[:-1]:
+        parent = parent[key]
+    parent[path[-1]] = value
+    with pytest.raises(ValidationError):
+        elements.validate_update(index, modified, "BIOMASS_Ecoli_core_w_GAM")
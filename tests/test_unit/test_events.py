@@ -0,0 +1,68 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test the distribution of model changes as server-sent events."""
+
+import itertools
+
+from model_storage.events import Broadcaster, Subscription, stream
+
+
+def change(cursor, project_id=4):
+    return {
+        "cursor": cursor,
+        "model_id": 1,
+        "project_id": project_id,
+        "action": "updated",
+    }
+
+
+def test_publish_visible():
+    broadcaster = Broadcaster(engine=None, queue_size=4)
+    visible = Subscription({4}, 4)
+    invisible = Subscription({5}, 4)
+    broadcaster.subscriptions.update([visible, invisible])
+    broadcaster.publish(change(1))
+    broadcaster.publish(change(2, project_id=None))
+    assert visible.queue.qsize() == 2
+    assert invisible.queue.qsize() == 1
+
+
+def test_publish_overflow():
+    """A subscription that falls behind is closed."""
+    broadcaster = Broadcaster(engine=None, queue_size=1)
+    subscription = Subscription({4}, 1)
+    broadcaster.subscriptions.add(subscription)
+    broadcaster.publish(change(1))
+    broadcaster.publish(change(2))
+    assert subscription not in broadcaster.subscriptions
+    assert subscription.queue.get_nowait() is None
+
+
+def test_stream_skips_duplicates():
+    """Live changes already sent from the backlog are skipped."""
+    broadcaster = Broadcaster(engine=None, queue_size=4)
+    subscription = Subscription({4}, 4)
+    for item in (change(2), change(3), None):
+        subscription.queue.put_nowait(item)
+    events = list(
+        stream(broadcaster, subscription, [change(1), change(2)], 0, 1)
+    )
+    ids = [
+        line
+        for line in itertools.chain(*(event.split("\n") for event in events))
+        if line.startswith("id: ")
+    ]
+    assert ids == ["id: 1", "id: 2", "id: 3"]
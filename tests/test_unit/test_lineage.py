@@ -0,0 +1,84 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test applying and composing model modifications."""
+
+from types import SimpleNamespace
+
+import pytest
+from marshmallow import ValidationError
+
+from model_storage import elements, lineage
+
+
+MODIFICATIONS = {
+    "reactions": {"ACALD": None, "NEW": {"id": "NEW", "metabolites": {}}},
+    "attributes": {"id": "variant"},
+}
+
+
+def test_apply(e_coli_core):
+    """Remove, add and change elements and attributes."""
+    document = lineage.apply(e_coli_core, MODIFICATIONS)
+    ids = [reaction["id"] for reaction in document["reactions"]]
+    assert "ACALD" not in ids
+    assert ids[-1] == "NEW"
+    assert document["id"] == "variant"
+    assert len(document["metabolites"]) == len(e_coli_core["metabolites"])
+
+
+def test_apply_to_index(e_coli_core):
+    """The index of a modified model matches the index of its document."""
+    index = lineage.apply_to_index(
+        elements.index_model(e_coli_core), MODIFICATIONS
+    )
+    assert index == elements.index_model(
+        lineage.apply(e_coli_core, MODIFICATIONS)
+    )
+
+
+def test_compose(e_coli_core):
+    """Applying composed modifications equals applying them in turn."""
+    later = {"reactions": {"NEW": None, "ACALDt": None}}
+    assert lineage.apply(
+        e_coli_core, lineage.compose(MODIFICATIONS, later)
+    ) == lineage.apply(lineage.apply(e_coli_core, MODIFICATIONS), later)
+
+
+@pytest.mark.parametrize(
+    "modifications",
+    [
+        [],
+        {"reactions": []},
+        {"reactions": {"PFK": "removed"}},
+        {"attributes": "variant"},
+    ],
+)
+def test_check_types(modifications):
+    """Malformed modifications are rejected as invalid."""
+    with pytest.raises(ValidationError):
+        lineage.check(modifications)
+
+
+def test_derive_bounds(e_coli_core):
+    """Modified reactions need consistent bounds."""
+    parent = SimpleNamespace(element_index=elements.index_model(e_coli_core))
+    reaction = dict(e_coli_core["reactions"][0], lower_bound=10, upper_bound=0)
+    with pytest.raises(ValidationError, match="exceeds its upper bound"):
+        lineage.derive(
+            parent,
+            {"reactions": {reaction["id"]: reaction}},
+            "BIOMASS_Ecoli_core_w_GAM",
+        )
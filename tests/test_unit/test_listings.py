@@ -0,0 +1,64 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test the cache of model listings."""
+
+from model_storage.listings import ListingCache
+
+
+class Broadcaster:
+    def __init__(self):
+        self.connected = True
+        self.watchers = []
+
+    def start(self):
+        pass
+
+    def watch(self, callback):
+        self.watchers.append(callback)
+
+
+def test_cached_per_projects():
+    listings = ListingCache(Broadcaster(), maxsize=4, max_age=60)
+    first = listings.get({4, 5}, lambda: b"[1]")
+    assert listings.get({5, 4}, lambda: b"[2]") is first
+    assert listings.get({4}, lambda: b"[3]").body == b"[3]"
+
+
+def test_cached_per_replica():
+    listings = ListingCache(Broadcaster(), maxsize=4, max_age=60)
+    first = listings.get({4}, lambda: b"[1]", "replica_0")
+    assert listings.get({4}, lambda: b"[2]", "replica_0") is first
+    assert listings.get({4}, lambda: b"[3]", "replica_1").body == b"[3]"
+    assert listings.get({4}, lambda: b"[4]").body == b"[4]"
+
+
+def test_invalidated_by_changes():
+    broadcaster = Broadcaster()
+    listings = ListingCache(broadcaster, maxsize=4, max_age=60)
+    first = listings.get({4}, lambda: b"[1]")
+    for callback in broadcaster.watchers:
+        callback()
+    second = listings.get({4}, lambda: b"[2]")
+    assert second.body == b"[2]"
+    assert second.etag != first.etag
+
+
+def test_not_cached_while_disconnected():
+    broadcaster = Broadcaster()
+    broadcaster.connected = False
+    listings = ListingCache(broadcaster, maxsize=4, max_age=60)
+    listings.get({4}, lambda: b"[1]")
+    assert listings.get({4}, lambda: b"[2]").body == b"[2]"
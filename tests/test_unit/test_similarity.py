@@ -0,0 +1,53 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test estimating the similarity of models from their signatures."""
+
+from model_storage import elements, lineage, similarity
+
+
+def test_signature_deterministic(e_coli_core):
+    """Signatures only depend on the element IDs."""
+    index = elements.index_model(e_coli_core)
+    signature = similarity.signature(index)
+    assert len(signature) == similarity.PERMUTATIONS
+    assert signature == similarity.signature(index)
+    assert similarity.estimate(signature, signature) == 1
+
+
+def test_estimate(e_coli_core):
+    """The estimate is close to the Jaccard similarity of the element IDs."""
+    removed = [reaction["id"] for reaction in e_coli_core["reactions"][:10]]
+    index = elements.index_model(e_coli_core)
+    other = lineage.apply_to_index(
+        index, {"reactions": {id: None for id in removed}}
+    )
+    total = sum(len(index[collection]) for collection in elements.COLLECTIONS)
+    expected = (total - len(removed)) / total
+    estimate = similarity.estimate(
+        similarity.signature(index), similarity.signature(other)
+    )
+    assert abs(estimate - expected) < 0.1
+
+
+def test_buckets():
+    """Signatures that agree on a band share its bucket."""
+    signature = list(range(similarity.PERMUTATIONS))
+    other = [0] * similarity.ROWS + signature[similarity.ROWS :]
+    buckets = similarity.buckets(signature)
+    other_buckets = similarity.buckets(other)
+    assert len(buckets) == similarity.BANDS
+    assert buckets[0] != other_buckets[0]
+    assert buckets[1:] == other_buckets[1:]
@@ -0,0 +1,41 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test archiving serialized models and recording their reads."""
+
+from types import SimpleNamespace
+
+from model_storage import blobs, tiers
+
+
+def test_archive_round_trip(tmp_path):
+    store = blobs.create_store(f"file://{tmp_path}", suffix=tiers.SUFFIX)
+    text = '{"id": "model", "reactions": []}'
+    tiers.archive_text(store, "abc", text)
+    assert store.path("abc").endswith(".json.xz")
+    assert tiers.read_text(store, "abc") == text
+    assert tiers.load_document(store, "abc") == {"id": "model", "reactions": []}
+
+
+def test_record_batches_reads():
+    """Reads are only written once the flush interval has passed."""
+    tracker = tiers.AccessTracker(None, None, interval=60)
+    content = SimpleNamespace(hash="abc", external=False, archived=True)
+    tracker.record(SimpleNamespace(id=1, content=content))
+    tracker.record(SimpleNamespace(id=1, content=content))
+    # Not yet due, so the database is not touched.
+    tracker.flush()
+    assert list(tracker._accessed) == [1]
+    assert tracker._restore == {"abc"}
@@ -0,0 +1,82 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test sizing and recycling the gunicorn workers."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from model_storage import workers
+
+
+@pytest.mark.parametrize(
+    "files, expected",
+    [
+        ({"cpu.max": "200000 100000\n"}, 2.0),
+        (
+            {
+                "cpu/cpu.cfs_quota_us": "50000",
+                "cpu/cpu.cfs_period_us": "100000",
+            },
+            0.5,
+        ),
+    ],
+)
+def test_cpu_limit(tmp_path, files, expected):
+    for name, content in files.items():
+        (tmp_path / name).parent.mkdir(exist_ok=True)
+        (tmp_path / name).write_text(content)
+    assert workers.cpu_limit(str(tmp_path)) == expected
+
+
+def test_unlimited(tmp_path):
+    (tmp_path / "cpu.max").write_text("max 100000\n")
+    (tmp_path / "memory.max").write_text("max\n")
+    assert workers.cpu_limit(str(tmp_path)) >= 1
+    assert workers.memory_limit(str(tmp_path)) is None
+
+
+def test_memory_limit(tmp_path):
+    (tmp_path / "memory").mkdir()
+    (tmp_path / "memory" / "memory.limit_in_bytes").write_text("2147483648")
+    assert workers.memory_limit(str(tmp_path)) == 2**31
+
+
+def test_worker_count():
+    assert workers.worker_count(2, None, 3, 2**29) == 6
+    assert workers.worker_count(2, 2**30, 3, 2**29) == 2
+    assert workers.worker_count(0.1, 2**28, 3, 2**29) == 1
+
+
+def test_watchdog():
+    """A worker over its threshold stops and records why."""
+    worker = SimpleNamespace(alive=True, pid=1, log=SimpleNamespace())
+    worker.log.warning = lambda message: None
+    samples = iter([100, 200])
+    watchdog = workers.Watchdog(worker, 150, 0, sample=lambda: next(samples))
+    watchdog.run(lambda seconds: None)
+    assert not worker.alive
+    assert worker.recycle_reason == "memory"
+
+
+def test_recycled():
+    log = SimpleNamespace(info=lambda message: None)
+    worker = SimpleNamespace(pid=1, nr=10, max_requests=10, log=log)
+    assert workers.recycled(worker) == "requests"
+    worker.nr = 5
+    assert workers.recycled(worker) == "shutdown"
+    worker.recycle_reason = "memory"
+    assert workers.recycled(worker) == "memory"